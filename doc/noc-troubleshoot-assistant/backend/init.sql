@@ -4,9 +4,12 @@
 -- Enable UUID extension
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 
--- Investigations table
+-- Trigram matching for partial host name search
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Investigations table, partitioned by month of started_at (partitions are created by the backend)
 CREATE TABLE investigations (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
     started_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
     ended_at TIMESTAMP WITH TIME ZONE,
     status VARCHAR(20) NOT NULL DEFAULT 'in_progress',
@@ -17,41 +20,106 @@ CREATE TABLE investigations (
     alarm_severity VARCHAR(20) NOT NULL,
     host_name VARCHAR(255) NOT NULL,
     instance_id VARCHAR(100) NOT NULL,
+    alarm_fingerprint VARCHAR(64),
+    metrics JSONB,
+    origin VARCHAR(20) NOT NULL DEFAULT 'operator',
+    refresh_requested BOOLEAN NOT NULL DEFAULT FALSE,
+    -- Replica running the model while its claim is unexpired
+    run_holder VARCHAR(255),
+    run_expires_at TIMESTAMP WITH TIME ZONE,
+    search_vector TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', host_name), 'A') ||
+        setweight(to_tsvector('english', alarm_description), 'B')
+    ) STORED,
     
     -- Metadata
     created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
     updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
     
-    CONSTRAINT chk_status CHECK (status IN ('in_progress', 'completed', 'failed', 'cancelled'))
-);
+    PRIMARY KEY (id, started_at),
+    CONSTRAINT chk_status CHECK (status IN ('in_progress', 'completed', 'failed', 'cancelled')),
+    CONSTRAINT chk_origin CHECK (origin IN ('operator', 'auto'))
+) PARTITION BY RANGE (started_at);
 
--- Chat messages table
+-- Chat messages table, partitioned by month of timestamp
+-- (a partitioned investigations table cannot be referenced by a foreign key on id alone;
+-- deletes cascade through the delete_investigation_children trigger instead)
 CREATE TABLE chat_messages (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
-    investigation_id UUID NOT NULL REFERENCES investigations(id) ON DELETE CASCADE,
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
+    investigation_id UUID NOT NULL,
     role VARCHAR(20) NOT NULL,
     content TEXT NOT NULL,
     timestamp TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
     
+    PRIMARY KEY (id, timestamp),
     CONSTRAINT chk_role CHECK (role IN ('user', 'assistant', 'system'))
-);
+) PARTITION BY RANGE (timestamp);
 
--- Tool calls table (audit trail)
+-- Tool calls table (audit trail), partitioned by month of timestamp
 CREATE TABLE tool_calls (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
-    investigation_id UUID NOT NULL REFERENCES investigations(id) ON DELETE CASCADE,
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
+    investigation_id UUID NOT NULL,
     tool_name VARCHAR(100) NOT NULL,
     parameters JSONB,
     result JSONB,
+    result_hash VARCHAR(64),
+    result_summary JSONB,
     duration_ms INTEGER,
-    timestamp TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+    timestamp TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+-- Catch-all partitions for rows outside the monthly partitions
+CREATE TABLE investigations_default PARTITION OF investigations DEFAULT;
+CREATE TABLE chat_messages_default PARTITION OF chat_messages DEFAULT;
+CREATE TABLE tool_calls_default PARTITION OF tool_calls DEFAULT;
+
+-- Tool results stored once per distinct payload, compressed by the backend
+CREATE TABLE tool_results (
+    hash VARCHAR(64) PRIMARY KEY,
+    encoding VARCHAR(10) NOT NULL,
+    payload BYTEA NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    truncated BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    last_used_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+-- Payloads are already compressed; store them out of line without recompressing
+ALTER TABLE tool_results ALTER COLUMN payload SET STORAGE EXTERNAL;
+
+-- Leases electing the replica that runs singleton tasks (alarm polling)
+CREATE TABLE service_leases (
+    name VARCHAR(50) PRIMARY KEY,
+    holder VARCHAR(255) NOT NULL,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+-- Latest alarm list published by the polling leader for the other replicas
+CREATE TABLE alarm_state (
+    name VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL,
+    payload JSONB NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+-- Webhook events received by follower replicas, applied by the polling leader
+CREATE TABLE alarm_events (
+    id BIGSERIAL PRIMARY KEY,
+    payload JSONB NOT NULL,
+    received_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
 );
 
 -- Indexes for performance
-CREATE INDEX idx_investigations_started_at ON investigations(started_at DESC);
+CREATE INDEX idx_investigations_started_at ON investigations(started_at DESC, id DESC);
 CREATE INDEX idx_investigations_instance_id ON investigations(instance_id);
 CREATE INDEX idx_investigations_status ON investigations(status);
 CREATE INDEX idx_investigations_host_name ON investigations(host_name);
+CREATE INDEX idx_investigations_fingerprint ON investigations(alarm_fingerprint, ended_at DESC);
+CREATE INDEX idx_investigations_alarm ON investigations(instance_id, alarm_id);
+CREATE INDEX idx_investigations_search ON investigations USING gin(search_vector);
+CREATE INDEX idx_investigations_host_name_trgm ON investigations USING gin(host_name gin_trgm_ops);
 
 CREATE INDEX idx_chat_messages_investigation ON chat_messages(investigation_id);
 CREATE INDEX idx_chat_messages_timestamp ON chat_messages(timestamp DESC);
@@ -59,8 +127,10 @@ CREATE INDEX idx_chat_messages_timestamp ON chat_messages(timestamp DESC);
 CREATE INDEX idx_tool_calls_investigation ON tool_calls(investigation_id);
 CREATE INDEX idx_tool_calls_timestamp ON tool_calls(timestamp DESC);
 CREATE INDEX idx_tool_calls_tool_name ON tool_calls(tool_name);
+CREATE INDEX idx_tool_calls_result_hash ON tool_calls(result_hash);
+CREATE INDEX idx_tool_results_last_used ON tool_results(last_used_at);
 
--- Full-text search index for chat messages
+-- Full-text search index for chat messages (history search uses this exact expression)
 CREATE INDEX idx_chat_messages_content_fts ON chat_messages 
     USING gin(to_tsvector('english', content));
 
@@ -79,11 +149,40 @@ CREATE TRIGGER update_investigations_updated_at
     FOR EACH ROW
     EXECUTE FUNCTION update_updated_at_column();
 
+-- Function to delete messages and tool calls of a deleted investigation
+-- (replaces ON DELETE CASCADE, which partitioned tables cannot reference here)
+CREATE OR REPLACE FUNCTION delete_investigation_children()
+RETURNS TRIGGER AS $$
+BEGIN
+    DELETE FROM chat_messages WHERE investigation_id = OLD.id;
+    DELETE FROM tool_calls WHERE investigation_id = OLD.id;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trigger to cascade investigation deletes (dropped partitions bypass it by design)
+CREATE TRIGGER delete_investigation_children
+    AFTER DELETE ON investigations
+    FOR EACH ROW
+    EXECUTE FUNCTION delete_investigation_children();
+
 -- Comments for documentation
 COMMENT ON TABLE investigations IS 'Stores investigation sessions for network troubleshooting';
 COMMENT ON TABLE chat_messages IS 'Stores chat conversation history for each investigation';
 COMMENT ON TABLE tool_calls IS 'Audit trail of all MCP tool invocations during investigations';
+COMMENT ON TABLE investigations_default IS 'Rows outside the monthly partitions; purged by row after the retention period';
+COMMENT ON TABLE service_leases IS 'Leader election leases; the holder may extend, others take over after expires_at';
+COMMENT ON TABLE alarm_state IS 'Versioned alarm snapshot written by the polling leader';
+COMMENT ON TABLE tool_results IS 'Tool call results keyed by SHA-256 of their canonical JSON, zstd or zlib compressed';
+COMMENT ON TABLE alarm_events IS 'Queue of pushed Zabbix webhook events forwarded to the polling leader';
 
 COMMENT ON COLUMN investigations.status IS 'Current status: in_progress, completed, failed, cancelled';
+COMMENT ON COLUMN investigations.alarm_fingerprint IS 'Hash of instance, host and normalized alarm description for analysis reuse';
+COMMENT ON COLUMN investigations.metrics IS 'Model token usage and prompt cache statistics';
+COMMENT ON COLUMN investigations.origin IS 'Who started the investigation: operator or auto (background pre-investigation)';
+COMMENT ON COLUMN investigations.search_vector IS 'Weighted host name and alarm description terms for history search';
 COMMENT ON COLUMN chat_messages.role IS 'Message sender: user, assistant, system';
 COMMENT ON COLUMN tool_calls.duration_ms IS 'Tool execution time in milliseconds';
+COMMENT ON COLUMN tool_calls.result IS 'Inline result of calls recorded before tool_results; NULL for newer calls';
+COMMENT ON COLUMN tool_calls.result_hash IS 'Hash of the stored result in tool_results';
+COMMENT ON COLUMN tool_calls.result_summary IS 'Result size, item count, fields and error, readable without loading the payload';
@@ -3,6 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import List, Optional
 from api.dependencies import get_mcp_client
 from services import MCPClient, alarm_aggregator
+from services.alarm_record import alarm_to_dict
 from schemas import Alarm, AlarmAcknowledge
 
 router = APIRouter()
@@ -12,7 +13,9 @@ async def get_alarms(
     instance_id: Optional[str] = Query(None, description="Filter by instance ID"),
     severity: Optional[List[str]] = Query(None, description="Filter by severity"),
     acknowledged: Optional[bool] = Query(None, description="Filter by acknowledged status"),
-    host: Optional[str] = Query(None, description="Filter by host name")
+    host: Optional[str] = Query(None, description="Filter by host name"),
+    roots_only: bool = Query(False, description="Hide alarms caused by a firing upstream trigger"),
+    include_maintenance: bool = Query(True, description="Include alarms on hosts under maintenance")
 ):
     """Get all alarms from all instances."""
     alarms = alarm_aggregator.get_all_alarms()
@@ -31,7 +34,13 @@ async def get_alarms(
         host_lower = host.lower()
         alarms = [a for a in alarms if host_lower in a['host'].lower()]
     
-    return alarms
+    if roots_only:
+        alarms = [a for a in alarms if not a.get('is_dependent')]
+    
+    if not include_maintenance:
+        alarms = [a for a in alarms if not a.get('in_maintenance')]
+    
+    return [alarm_to_dict(a) for a in alarms]
 
 @router.post("/{alarm_id}/acknowledge")
 async def acknowledge_alarm(
@@ -1,19 +1,23 @@
 """Chat and investigation routes with two-step approach."""
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Header
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Dict, Any, Optional
 from uuid import UUID, UUID as parse_uuid
+import asyncio
 import json
 import logging
 
-from models import get_db, SessionLocal
+from config import config
+from models import get_async_db, async_session
 from schemas import InvestigateRequest, ChatMessageCreate, ChatMessageResponse
-from services.bedrock_agent import get_agent
 from services.investigation_service import InvestigationService
-from services import alarm_aggregator
+from services.investigation_stream import InvestigationStream, stream_registry
+from services.investigation_runner import run_investigation, new_response_buffer, claim_run
+from services.investigation_scheduler import investigation_scheduler
+from services.alarm_record import alarm_to_dict, alarm_from_investigation
+from services import alarm_aggregator, analysis_cache, incident_correlator
 from api.dependencies import get_mcp_client
-from config import config
 
 logger = logging.getLogger(__name__)
 
@@ -22,7 +26,7 @@ router = APIRouter()
 @router.post("/investigation/create")
 async def create_investigation(
     request: InvestigateRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new investigation for an alarm."""
     try:
@@ -31,88 +35,148 @@ async def create_investigation(
         if not alarm:
             raise HTTPException(status_code=404, detail="Alarm not found")
         
-        # Create investigation
+        requested = alarm
+        redirect_reason = None
+        
+        # Dependent alarms are investigated through the firing upstream (root) alarm
+        if alarm.get('root_alarm_id'):
+            root = alarm_aggregator.get_alarm_by_id(alarm['root_alarm_id'], alarm['instance_id'])
+            if root is not None:
+                alarm, redirect_reason = root, "dependency"
+        
+        # Alarms of a storm converge on one investigation of the incident's root alarm
+        incident = incident_correlator.get_incident_for_alarm(alarm['id'], alarm['instance_id'])
+        if incident is not None and len(incident) > 1:
+            root = incident_correlator.root_alarm(incident)
+            if root['id'] != alarm['id'] or root['instance_id'] != alarm['instance_id']:
+                alarm, redirect_reason = root, redirect_reason or "incident"
+        
+        # Tell the client which alarm it clicked when another one is investigated instead
+        target = {
+            "alarm": alarm_to_dict(alarm),
+            "redirected_from": alarm_to_dict(requested) if redirect_reason else None,
+            "redirect_reason": redirect_reason
+        }
+        
         inv_service = InvestigationService(db)
-        investigation_id_str = inv_service.create_investigation(alarm)
         
-        # Add system message
-        inv_service.add_message(
-            parse_uuid(investigation_id_str), 
-            "system", 
-            f"Starting investigation for: {alarm['description']}"
-        )
+        # Identical concurrent requests share one model run
+        running = await inv_service.find_running_investigation(alarm)
+        if running is not None:
+            return {
+                "investigation_id": str(running.id),
+                **target,
+                "cached": False,
+                "deduplicated": True
+            }
         
-        db.commit()
+        # Reuse a fresh analysis of the same recurring alarm unless a refresh is requested
+        if request.refresh:
+            analysis_cache.invalidate(alarm)
+        else:
+            # A background pre-investigation of this alarm is attached to directly
+            auto = await inv_service.find_investigation_for_alarm(alarm, origin="auto")
+            if auto is not None:
+                return {
+                    "investigation_id": str(auto.id),
+                    **target,
+                    "cached": False,
+                    "pre_investigated": True
+                }
+            
+            cached = await analysis_cache.lookup(db, alarm)
+            if cached is not None:
+                investigation_id_str = await inv_service.create_from_cache(alarm, cached)
+                return {
+                    "investigation_id": investigation_id_str,
+                    **target,
+                    "cached": True,
+                    "cached_from": str(cached.investigation_id),
+                    "cached_at": cached.completed_at.isoformat() if cached.completed_at else None
+                }
+        
+        # Shed load when the run queue is full instead of timing out later
+        if not investigation_scheduler.has_capacity():
+            raise _busy()
+        
+        # Create investigation with its system message in one transaction
+        investigation_id_str = await inv_service.create_investigation(
+            alarm,
+            refresh=request.refresh,
+            system_message=f"Starting investigation for: {alarm['description']}"
+        )
         
         return {
             "investigation_id": investigation_id_str,
-            "alarm": alarm
+            **target,
+            "cached": False
         }
     
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Failed to create investigation: {e}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/investigation/{investigation_id}/stream")
 async def stream_investigation(
     investigation_id: str,
+    offset: int = Query(0, ge=0, description="Resume from this character offset"),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
     mcp_client = Depends(get_mcp_client),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Stream AI investigation response."""
+    """Stream AI investigation response.
+    
+    The model runs in the background and checkpoints its answer to the
+    database. Reconnecting clients (EventSource sends Last-Event-ID) resume
+    from their offset instead of restarting the run. A run claimed by another
+    replica is followed through its database checkpoints.
+    """
     try:
-        # Get investigation
-        inv_service = InvestigationService(db)
-        investigation = inv_service.get_investigation(parse_uuid(investigation_id))
-        if not investigation:
-            raise HTTPException(status_code=404, detail="Investigation not found")
-        
-        # Build alarm dict from investigation
-        alarm = {
-            "id": investigation.alarm_id,
-            "description": investigation.alarm_description,
-            "severity": investigation.alarm_severity,
-            "host": investigation.host_name,
-            "instance_id": investigation.instance_id,
-        }
+        inv_uuid = parse_uuid(investigation_id)
+        if last_event_id and last_event_id.isdigit():
+            offset = max(offset, int(last_event_id))
         
-        # Build context
-        context = await _build_context(alarm, mcp_client)
+        stream = stream_registry.get(inv_uuid)
+        if stream is None:
+            # Get investigation
+            inv_service = InvestigationService(db)
+            investigation = await inv_service.get_investigation(inv_uuid)
+            if not investigation:
+                raise HTTPException(status_code=404, detail="Investigation not found")
+            
+            # Finished runs are replayed from the persisted answer
+            if investigation.status != "in_progress":
+                message = await inv_service.get_last_message(inv_uuid, "assistant")
+                content = message.content if message else ""
+                return StreamingResponse(
+                    _replay(content, offset, investigation.status),
+                    media_type="text/event-stream"
+                )
+            
+            # Build alarm dict from investigation
+            alarm = alarm_from_investigation(investigation)
+            
+            if not investigation_scheduler.has_capacity():
+                raise _busy()
+            
+            # Replicas do not share streams; only the claim holder runs the model
+            if not await claim_run(inv_uuid):
+                return StreamingResponse(
+                    _follow_checkpoints(inv_uuid, alarm, offset, mcp_client),
+                    media_type="text/event-stream"
+                )
+            
+            stream = stream_registry.start(
+                inv_uuid,
+                lambda s: run_investigation(s, alarm, mcp_client),
+                new_response_buffer()
+            )
         
-        # Get agent
-        mcp_url = config.mcp_server_url
-        agent = get_agent(mcp_url)
-        
-        # Stream response
-        async def generate():
-            try:
-                logger.info(f"Streaming investigation {investigation_id}")
-                
-                full_response = ""
-                async for chunk in agent.stream_investigate(alarm, context):
-                    full_response += chunk
-                    yield f"data: {json.dumps({'type': 'content', 'text': chunk})}\n\n"
-                
-                # Save response
-                db2 = SessionLocal()
-                try:
-                    inv_service2 = InvestigationService(db2)
-                    inv_service2.add_message(parse_uuid(investigation_id), "assistant", full_response)
-                    db2.commit()
-                finally:
-                    db2.close()
-                
-                yield f"data: {json.dumps({'type': 'done'})}\n\n"
-                
-            except Exception as e:
-                import traceback
-                logger.error(f"Stream error: {e}\n{traceback.format_exc()}")
-                yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
-        
-        return StreamingResponse(generate(), media_type="text/event-stream")
+        logger.info(f"Streaming investigation {investigation_id} from offset {offset}")
+        return StreamingResponse(_follow(stream, offset), media_type="text/event-stream")
     
     except HTTPException:
         raise
@@ -123,29 +187,105 @@ async def stream_investigation(
 @router.get("/history/{investigation_id}", response_model=List[ChatMessageResponse])
 async def get_chat_history(
     investigation_id: UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get chat history for investigation."""
     inv_service = InvestigationService(db)
-    messages = inv_service.get_messages(investigation_id)
+    messages = await inv_service.get_messages(investigation_id)
     return messages
 
-async def _build_context(alarm: Dict[str, Any], mcp_client) -> Dict[str, Any]:
-    """Build investigation context from Zabbix data."""
-    context = {"alarm": alarm}
-    
+def _busy() -> HTTPException:
+    """Build 503 response for a full investigation queue."""
+    return HTTPException(
+        status_code=503,
+        detail="Too many investigations in progress, please retry shortly",
+        headers={"Retry-After": str(investigation_scheduler.retry_after())}
+    )
+
+def _sse(payload: Dict[str, Any], event_id: Optional[int] = None) -> str:
+    """Format server-sent event."""
+    prefix = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{prefix}data: {json.dumps(payload)}\n\n"
+
+async def _follow(stream: InvestigationStream, offset: int):
+    """Relay live stream output starting at offset."""
     try:
-        # Get host information
-        host_result = await mcp_client.get_hosts(
-            alarm['instance_id'],
-            search={"name": alarm['host']},
-            output="extend"
-        )
+        if offset > len(stream.buffer):
+            # Client holds output from a run that no longer exists
+            yield _sse({'type': 'reset'})
+            offset = 0
+        
+        # Waiting for a run slot: report queue position until the run starts
+        queued = False
+        async for position in stream.follow_queue():
+            queued = True
+            yield _sse({'type': 'queued', 'position': position})
+        if queued:
+            yield _sse({'type': 'started'})
+        
+        async for end_offset, text in stream.follow(offset):
+            yield _sse({'type': 'content', 'text': text}, end_offset)
         
-        if host_result.get('success') and host_result.get('data'):
-            context['host_data'] = host_result['data'][0] if host_result['data'] else None
+        if stream.status == "failed":
+            yield _sse({'type': 'error', 'message': stream.error})
+        else:
+            yield _sse({'type': 'done'})
     
     except Exception as e:
-        logger.error(f"Failed to build context: {e}")
+        logger.error(f"Stream error: {e}")
+        yield _sse({'type': 'error', 'message': str(e)})
+
+async def _follow_checkpoints(investigation_id: UUID, alarm: Dict[str, Any], offset: int, mcp_client):
+    """Relay the checkpointed answer of a run held by another replica.
+    
+    Takes the run over once the holder's claim lapses (e.g. its pod stopped).
+    """
+    try:
+        while True:
+            async with async_session() as db:
+                inv_service = InvestigationService(db)
+                investigation = await inv_service.get_investigation(investigation_id)
+                message = await inv_service.get_last_message(investigation_id, "assistant")
+            content = message.content if message else ""
+            
+            if investigation is None or investigation.status != "in_progress":
+                async for event in _replay(content, offset, investigation.status if investigation else "failed"):
+                    yield event
+                return
+            
+            # Checkpoints trail the live output, so an offset past them just waits
+            if offset < len(content):
+                yield _sse({'type': 'content', 'text': content[offset:]}, len(content))
+                offset = len(content)
+            
+            if await claim_run(investigation_id):
+                stream = stream_registry.start(
+                    investigation_id,
+                    lambda s: run_investigation(s, alarm, mcp_client),
+                    new_response_buffer()
+                )
+                async for event in _follow(stream, offset):
+                    yield event
+                return
+            
+            await asyncio.sleep(config.stream_checkpoint_seconds)
+    
+    except Exception as e:
+        logger.error(f"Checkpoint stream error: {e}")
+        yield _sse({'type': 'error', 'message': str(e)})
+
+async def _replay(content: str, offset: int, status: str):
+    """Replay a persisted answer starting at offset."""
+    if offset > len(content):
+        yield _sse({'type': 'reset'})
+        offset = 0
+    
+    if offset < len(content):
+        yield _sse({'type': 'content', 'text': content[offset:]}, len(content))
     
-    return context
+    if status == "failed":
+        yield _sse({'type': 'error', 'message': 'Investigation failed before completion'})
+    elif status == "cancelled":
+        yield _sse({'type': 'error', 'message': 'Investigation was not run because the queue was full, please retry'})
+    else:
+        yield _sse({'type': 'done'})
@@ -1,7 +1,7 @@
 """Health check routes."""
 from fastapi import APIRouter
-from models import check_connection
-from services import alarm_aggregator
+from models import check_liveness, get_pool_stats
+from services import alarm_aggregator, alarm_state, investigation_scheduler, history_retention, tool_result_store, tool_call_recorder
 from config import config
 import httpx
 
@@ -10,8 +10,8 @@ router = APIRouter()
 @router.get("/health")
 async def health_check():
     """Health check endpoint."""
-    # Check database
-    db_status = "connected" if check_connection() else "disconnected"
+    # Check database (cached, so frequent probes do not take pool connections)
+    db_status = "connected" if await check_liveness() else "disconnected"
     
     # Check MCP server
     mcp_status = "disconnected"
@@ -33,5 +33,11 @@ async def health_check():
             "database": db_status,
             "mcp_server": mcp_status
         },
-        "alarm_stats": alarm_aggregator.get_stats()
+        "alarm_stats": alarm_aggregator.get_stats(),
+        "alarm_state": alarm_state.get_stats(),
+        "investigation_stats": investigation_scheduler.get_stats(),
+        "history_retention": history_retention.get_stats(),
+        "tool_results": tool_result_store.get_stats(),
+        "tool_calls": tool_call_recorder.get_stats(),
+        "database_pools": get_pool_stats()
     }
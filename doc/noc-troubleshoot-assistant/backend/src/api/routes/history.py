@@ -1,14 +1,22 @@
 """Investigation history routes."""
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, func
-from typing import List, Optional
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, tuple_
+from typing import Any, Dict, List, Optional
 from uuid import UUID
 from datetime import datetime
+from collections import defaultdict
+from itertools import chain
 import json
 
-from models import get_db, Investigation, ChatMessage, ToolCall
+from models import get_async_db, async_session, Investigation, ChatMessage, ToolCall
 from schemas import InvestigationResponse, InvestigationDetail, HistoryFilter, HistoryListResponse
+from services.history_pagination import (
+    encode_cursor, decode_cursor, encode_offset_cursor, decode_offset_cursor, history_counts
+)
+from services.history_search import history_search
+from services.tool_results import tool_result_store
 
 router = APIRouter()
 
@@ -19,68 +27,109 @@ async def list_investigations(
     severity: Optional[List[str]] = Query(None),
     from_date: Optional[datetime] = Query(None),
     to_date: Optional[datetime] = Query(None),
-    page: int = Query(1, ge=1),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    page: int = Query(1, ge=1, description="Offset page, used when no cursor is given"),
     limit: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db)
+    count: str = Query("estimate", pattern="^(estimate|exact|none)$", description="How to compute total"),
+    sort: Optional[str] = Query(None, pattern="^(recent|relevance)$", description="Defaults to relevance when searching"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """List investigation history with filtering."""
-    query = db.query(Investigation)
+    """List investigation history with filtering.
+    
+    Pages are addressed by an opaque cursor on (started_at, id), so each page
+    costs the same however deep it is; offset pages remain for old clients.
+    Searches are ordered by relevance unless sort=recent, with a highlighted
+    snippet of the best matching answer.
+    """
+    query = select(Investigation)
     
     # Apply filters
     if instance_id:
-        query = query.filter(Investigation.instance_id == instance_id)
+        query = query.where(Investigation.instance_id == instance_id)
     
     if severity:
-        query = query.filter(Investigation.alarm_severity.in_(severity))
+        query = query.where(Investigation.alarm_severity.in_(severity))
     
     if from_date:
-        query = query.filter(Investigation.started_at >= from_date)
+        query = query.where(Investigation.started_at >= from_date)
     
     if to_date:
-        query = query.filter(Investigation.started_at <= to_date)
+        query = query.where(Investigation.started_at <= to_date)
+    
+    searcher = history_search(search, db)
+    if searcher is not None:
+        # Full-text search across alarm description, host and answers
+        query = query.where(Investigation.id.in_(searcher.matching_ids()))
     
-    if search:
-        # Full-text search across alarm description and host
-        query = query.filter(
-            or_(
-                Investigation.alarm_description.ilike(f"%{search}%"),
-                Investigation.host_name.ilike(f"%{search}%")
-            )
-        )
+    # Get total count (cached per filter, or estimated when unfiltered)
+    filters = (searcher.text if searcher else None, instance_id, tuple(sorted(severity or ())), from_date, to_date)
+    total, estimated = await history_counts.count(
+        db, query, filters if any(filters) else None, count
+    )
     
-    # Get total count
-    total = query.count()
+    ranked = searcher is not None and searcher.full_text and sort != "recent"
+    try:
+        if ranked:
+            # Relevance has no unique sort key to seek on; its cursor carries an offset
+            offset = decode_offset_cursor(cursor) if cursor else (page - 1) * limit
+            rank = searcher.rank().label("rank")
+            query = query.add_columns(rank).order_by(rank.desc()).offset(offset)
+        elif cursor:
+            # Seek past the last row of the previous page
+            after_started_at, after_id = decode_cursor(cursor)
+            query = query.where(tuple_(Investigation.started_at, Investigation.id) < tuple_(after_started_at, after_id))
+        elif page > 1:
+            query = query.offset((page - 1) * limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    # Paginate
-    offset = (page - 1) * limit
-    investigations = query.order_by(Investigation.started_at.desc()).offset(offset).limit(limit).all()
+    # One extra row tells whether another page follows
+    rows = (await db.execute(
+        query.order_by(Investigation.started_at.desc(), Investigation.id.desc()).limit(limit + 1)
+    )).all()
+    investigations = [row[0] for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = investigations[-1]
+        next_cursor = encode_offset_cursor(offset + limit) if ranked else encode_cursor(last.started_at, last.id)
     
+    snippets = await searcher.snippets(db, [inv.id for inv in investigations]) if searcher else {}
     return {
-        "investigations": investigations,
+        "investigations": [
+            {
+                **InvestigationResponse.model_validate(inv).model_dump(),
+                "rank": rows[i][1] if ranked else None,
+                "snippet": snippets.get(inv.id)
+            }
+            for i, inv in enumerate(investigations)
+        ],
         "total": total,
+        "total_estimated": estimated,
         "page": page,
-        "limit": limit
+        "limit": limit,
+        "next_cursor": next_cursor
     }
 
 @router.get("/{investigation_id}", response_model=InvestigationDetail)
 async def get_investigation_detail(
     investigation_id: UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get detailed investigation with messages and tool calls."""
-    investigation = db.query(Investigation).filter_by(id=investigation_id).first()
+    investigation = await db.get(Investigation, investigation_id)
     if not investigation:
         raise HTTPException(status_code=404, detail="Investigation not found")
     
     # Get messages
-    messages = db.query(ChatMessage).filter_by(
-        investigation_id=investigation_id
-    ).order_by(ChatMessage.timestamp).all()
+    messages = (await db.scalars(select(ChatMessage).where(
+        ChatMessage.investigation_id == investigation_id
+    ).order_by(ChatMessage.timestamp))).all()
     
     # Get tool calls
-    tool_calls = db.query(ToolCall).filter_by(
-        investigation_id=investigation_id
-    ).order_by(ToolCall.timestamp).all()
+    tool_calls = (await db.scalars(select(ToolCall).where(
+        ToolCall.investigation_id == investigation_id
+    ).order_by(ToolCall.timestamp))).all()
+    results = await tool_result_store.results_for(db, tool_calls)
     
     return {
         **investigation.__dict__,
@@ -90,7 +139,8 @@ async def get_investigation_detail(
                 "id": str(tc.id),
                 "tool_name": tc.tool_name,
                 "parameters": tc.parameters,
-                "result": tc.result,
+                "result": results[tc.id],
+                "result_summary": tc.result_summary,
                 "duration_ms": tc.duration_ms,
                 "timestamp": tc.timestamp
             }
@@ -101,72 +151,133 @@ async def get_investigation_detail(
 @router.delete("/{investigation_id}")
 async def delete_investigation(
     investigation_id: UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete an investigation."""
-    investigation = db.query(Investigation).filter_by(id=investigation_id).first()
+    investigation = await db.get(Investigation, investigation_id)
     if not investigation:
         raise HTTPException(status_code=404, detail="Investigation not found")
     
-    db.delete(investigation)
-    db.commit()
+    await db.delete(investigation)
+    await db.commit()
+    history_counts.clear()
     
     return {"success": True, "message": "Investigation deleted"}
 
+EXPORT_BATCH_SIZE = 200
+
 @router.get("/export/json")
 async def export_investigations(
     from_date: Optional[datetime] = Query(None),
-    to_date: Optional[datetime] = Query(None),
-    db: Session = Depends(get_db)
+    to_date: Optional[datetime] = Query(None)
 ):
-    """Export investigations as JSON."""
-    query = db.query(Investigation)
-    
+    """Export investigations as a streamed JSON document."""
+    return _export_response(_export_json(from_date, to_date), "application/json", "json")
+
+@router.get("/export/ndjson")
+async def export_investigations_ndjson(
+    from_date: Optional[datetime] = Query(None),
+    to_date: Optional[datetime] = Query(None)
+):
+    """Export investigations as newline-delimited JSON, one investigation per line."""
+    return _export_response(_export_ndjson(from_date, to_date), "application/x-ndjson", "ndjson")
+
+def _export_response(body, media_type: str, extension: str) -> StreamingResponse:
+    filename = f"investigations-{datetime.utcnow():%Y%m%d-%H%M%S}.{extension}"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+async def _export_json(from_date: Optional[datetime], to_date: Optional[datetime]):
+    """Stream the export document without building it in memory."""
+    yield f'{{"export_date": {json.dumps(datetime.utcnow().isoformat())}, "investigations": ['
+    separator = ""
+    async with async_session() as db:
+        async for record in export_records(db, from_date, to_date):
+            yield separator + json.dumps(record)
+            separator = ","
+    yield "]}"
+
+async def _export_ndjson(from_date: Optional[datetime], to_date: Optional[datetime]):
+    async with async_session() as db:
+        async for record in export_records(db, from_date, to_date):
+            yield json.dumps(record) + "\n"
+
+async def export_records(
+    db: AsyncSession,
+    from_date: Optional[datetime] = None,
+    to_date: Optional[datetime] = None,
+    batch_size: int = EXPORT_BATCH_SIZE
+):
+    """Yield export records of investigations, newest first.
+
+    Investigations are read through a server-side cursor in batches; the
+    messages, tool calls and stored tool results of each batch are loaded
+    with one IN query per table, so the query count does not grow with the number of
+    investigations and only one batch is held in memory.
+    """
+    query = select(Investigation)
     if from_date:
-        query = query.filter(Investigation.started_at >= from_date)
+        query = query.where(Investigation.started_at >= from_date)
     if to_date:
-        query = query.filter(Investigation.started_at <= to_date)
-    
-    investigations = query.order_by(Investigation.started_at.desc()).all()
-    
-    export_data = []
-    for inv in investigations:
-        messages = db.query(ChatMessage).filter_by(investigation_id=inv.id).all()
-        tool_calls = db.query(ToolCall).filter_by(investigation_id=inv.id).all()
-        
-        export_data.append({
-            "id": str(inv.id),
-            "started_at": inv.started_at.isoformat(),
-            "ended_at": inv.ended_at.isoformat() if inv.ended_at else None,
-            "status": inv.status,
-            "alarm": {
-                "id": inv.alarm_id,
-                "description": inv.alarm_description,
-                "severity": inv.alarm_severity,
-                "host": inv.host_name,
-                "instance_id": inv.instance_id
-            },
-            "messages": [
-                {
-                    "role": msg.role,
-                    "content": msg.content,
-                    "timestamp": msg.timestamp.isoformat()
-                }
-                for msg in messages
-            ],
-            "tool_calls": [
-                {
-                    "tool_name": tc.tool_name,
-                    "parameters": tc.parameters,
-                    "result": tc.result,
-                    "duration_ms": tc.duration_ms,
-                    "timestamp": tc.timestamp.isoformat()
-                }
-                for tc in tool_calls
-            ]
-        })
+        query = query.where(Investigation.started_at <= to_date)
+    query = query.order_by(Investigation.started_at.desc()).execution_options(yield_per=batch_size)
     
+    result = await db.stream_scalars(query)
+    async for batch in result.partitions():
+        ids = [inv.id for inv in batch]
+        messages = await _children_by_investigation(db, ChatMessage, ids)
+        tool_calls = await _children_by_investigation(db, ToolCall, ids)
+        results = await tool_result_store.results_for(db, list(chain.from_iterable(tool_calls.values())))
+        for inv in batch:
+            yield _export_record(inv, messages.get(inv.id, []), tool_calls.get(inv.id, []), results)
+        # Exported rows are not needed again; keep the identity map to one batch
+        for obj in [*batch, *chain.from_iterable(messages.values()), *chain.from_iterable(tool_calls.values())]:
+            db.expunge(obj)
+
+async def _children_by_investigation(db: AsyncSession, model, ids: List[UUID]) -> Dict[UUID, list]:
+    """Load messages or tool calls of several investigations in one query."""
+    rows = await db.scalars(
+        select(model).where(model.investigation_id.in_(ids)).order_by(model.timestamp)
+    )
+    children: Dict[UUID, list] = defaultdict(list)
+    for row in rows:
+        children[row.investigation_id].append(row)
+    return children
+
+def _export_record(inv: Investigation, messages: list, tool_calls: list, results: Dict[UUID, Any]) -> Dict[str, Any]:
     return {
-        "export_date": datetime.utcnow().isoformat(),
-        "investigations": export_data
+        "id": str(inv.id),
+        "started_at": inv.started_at.isoformat(),
+        "ended_at": inv.ended_at.isoformat() if inv.ended_at else None,
+        "status": inv.status,
+        "metrics": inv.metrics,
+        "origin": inv.origin,
+        "alarm": {
+            "id": inv.alarm_id,
+            "description": inv.alarm_description,
+            "severity": inv.alarm_severity,
+            "host": inv.host_name,
+            "instance_id": inv.instance_id
+        },
+        "messages": [
+            {
+                "role": msg.role,
+                "content": msg.content,
+                "timestamp": msg.timestamp.isoformat()
+            }
+            for msg in messages
+        ],
+        "tool_calls": [
+            {
+                "tool_name": tc.tool_name,
+                "parameters": tc.parameters,
+                "result": results[tc.id],
+                "duration_ms": tc.duration_ms,
+                "timestamp": tc.timestamp.isoformat()
+            }
+            for tc in tool_calls
+        ]
     }
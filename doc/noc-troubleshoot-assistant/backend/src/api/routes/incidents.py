@@ -0,0 +1,31 @@
+"""Correlated incident routes."""
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Optional
+from services import incident_correlator
+from schemas import Incident, IncidentDetail
+
+router = APIRouter()
+
+@router.get("", response_model=List[Incident])
+async def get_incidents(
+    instance_id: Optional[str] = Query(None, description="Filter by instance ID"),
+    min_alarms: int = Query(2, ge=1, description="Minimum correlated alarms per incident")
+):
+    """Get alarm storms grouped into incidents."""
+    incidents = incident_correlator.get_incidents(min_alarms)
+    if instance_id:
+        incidents = [i for i in incidents if i['instance_id'] == instance_id]
+    return incidents
+
+@router.get("/stats")
+async def get_incident_stats():
+    """Get correlation statistics."""
+    return incident_correlator.get_stats()
+
+@router.get("/{incident_id}", response_model=IncidentDetail)
+async def get_incident(incident_id: str):
+    """Get incident with its correlated alarms."""
+    incident = incident_correlator.incidents.get(incident_id)
+    if incident is None:
+        raise HTTPException(status_code=404, detail="Incident not found")
+    return incident_correlator.to_dict(incident, include_alarms=True)
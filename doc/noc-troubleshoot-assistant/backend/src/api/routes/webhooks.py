@@ -0,0 +1,50 @@
+"""Zabbix webhook ingestion routes."""
+from fastapi import APIRouter, Header, HTTPException
+from typing import Optional
+import hmac
+from services import alarm_state, webhook_ingestor
+from schemas import ZabbixWebhookEvent
+from config import config
+
+router = APIRouter()
+
+@router.post("/zabbix", status_code=202)
+async def receive_zabbix_event(
+    event: ZabbixWebhookEvent,
+    x_webhook_token: Optional[str] = Header(None)
+):
+    """Apply a pushed Zabbix problem or recovery event to the alarm list."""
+    settings = config.webhook_config
+    if not settings['enabled']:
+        raise HTTPException(status_code=404, detail="Webhook ingestion is disabled")
+    # Without a token anyone reaching the endpoint could inject or clear alarms
+    if not settings['token']:
+        raise HTTPException(status_code=503, detail="Webhook token is not configured")
+    if not hmac.compare_digest(x_webhook_token or '', settings['token']):
+        raise HTTPException(status_code=401, detail="Invalid webhook token")
+    
+    data = event.model_dump()
+    if webhook_ingestor.is_duplicate(data):
+        return {"status": "duplicate"}
+    
+    try:
+        # Only the polling leader owns the alarm list; followers queue the event for it
+        if not alarm_state.is_leader:
+            await alarm_state.forward_event(data)
+            return {"status": "forwarded"}
+        
+        applied = await webhook_ingestor.apply(data)
+    except Exception:
+        # Zabbix retries failed deliveries; the retry must not be dropped as a duplicate
+        webhook_ingestor.forget(data)
+        raise
+    
+    if not applied:
+        return {"status": "ignored"}
+    await alarm_state.publish()
+    return {"status": "applied"}
+
+@router.get("/stats")
+async def get_webhook_stats():
+    """Get webhook ingestion statistics."""
+    return webhook_ingestor.get_stats()
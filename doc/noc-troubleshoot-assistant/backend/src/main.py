@@ -2,16 +2,25 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 import os
 import sys
+from pathlib import Path
 
 # Add src to path
 sys.path.insert(0, os.path.dirname(__file__))
 
 from config import config
-from services import MCPClient, alarm_aggregator, AlarmPoller, InstanceMonitor
-from models import check_connection
+from services.alarm_record import SEVERITY_MAP
+from services import (
+    MCPClient, alarm_aggregator, AlarmPoller, InstanceMonitor, PreInvestigator,
+    stream_registry, analysis_cache, case_index, runbook_index, model_router,
+    investigation_scheduler, incident_correlator, trigger_dependencies, maintenance_index,
+    alarm_state, PostgresAlarmStore, webhook_ingestor, history_retention,
+    tool_result_store, tool_call_recorder
+)
+from models import check_connection, configure_pools, SessionLocal, dispose_async_engine
 from api.dependencies import set_mcp_client
 
 # Configure logging
@@ -24,15 +33,27 @@ logger = logging.getLogger(__name__)
 # Global services
 alarm_poller = None
 instance_monitor = None
+pre_investigator = None
+
+def _sync_case_index():
+    """Catch the case index up with the database (blocking, run in a thread)."""
+    db = SessionLocal()
+    try:
+        case_index.sync(db)
+    finally:
+        db.close()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager."""
-    global alarm_poller, instance_monitor
+    global alarm_poller, instance_monitor, pre_investigator
     
     # Startup
     logger.info("Starting application...")
     
+    # Size the database pools from app.yaml before anything connects
+    configure_pools(**config.database_pool_config)
+    
     # Check database connection
     if not check_connection():
         logger.error("Database connection failed!")
@@ -44,30 +65,152 @@ async def lifespan(app: FastAPI):
     set_mcp_client(mcp_client)
     logger.info(f"MCP client initialized: {mcp_url}")
     
+    # Keep finished investigation streams around for reconnecting clients
+    stream_registry.retention_seconds = config.stream_retention_seconds
+    
+    # Reuse completed analyses for recurring alarms
+    analysis_cache.enabled = config.analysis_cache_enabled
+    analysis_cache.freshness_minutes = config.analysis_cache_freshness_minutes
+    
+    # Correlate alarm storms into incidents after each poll
+    correlation = config.correlation_config
+    incident_correlator.time_window_seconds = correlation['time_window_seconds']
+    incident_correlator.similarity_threshold = correlation['similarity_threshold']
+    
+    # Bound concurrent model runs globally and per Zabbix instance
+    scheduler = config.scheduler_config
+    investigation_scheduler.max_concurrent = scheduler['max_concurrent']
+    investigation_scheduler.max_per_instance = scheduler['max_per_instance']
+    investigation_scheduler.max_queue = scheduler['max_queue']
+    
+    # Route investigations between the fast and strong model tiers
+    routing = config.model_routing_config
+    model_router.enabled = routing['enabled']
+    model_router.escalate_severities = routing['escalate_severities']
+    model_router.fast_severities = routing['fast_severities']
+    model_router.well_known_similarity = routing['well_known_similarity']
+    model_router.failure_lookback_hours = routing['failure_lookback_hours']
+    
+    # Index runbooks (reloaded in the background when files change)
+    runbooks = config.runbooks_config
+    runbook_index.reload_interval = runbooks['reload_interval_seconds']
+    runbook_index.prefetch_min_score = runbooks['prefetch_min_score']
+    await asyncio.to_thread(runbook_index.load, runbooks['path'])
+    await runbook_index.start()
+    
+    # Load similar-case index and catch up with investigations completed since last save
+    retrieval = config.retrieval_config
+    case_index.enabled = retrieval['enabled']
+    case_index.top_k = retrieval['top_k']
+    case_index.min_score = retrieval['min_score']
+    case_index.index_path = Path(retrieval['index_path'])
+    if case_index.enabled:
+        case_index.load()
+        try:
+            await asyncio.to_thread(_sync_case_index)
+        except Exception as e:
+            logger.error(f"Failed to sync case index: {e}")
+    
     # Initialize and start alarm poller
+    trigger_dependencies.ttl_seconds = config.trigger_dependency_ttl
+    maintenance = config.maintenance_config
+    maintenance_index.refresh_interval = maintenance['refresh_interval_seconds']
     poll_interval = config.polling_interval
-    alarm_poller = AlarmPoller(mcp_client, alarm_aggregator, poll_interval)
-    await alarm_poller.start()
-    logger.info(f"Alarm poller started (interval: {poll_interval}s)")
+    bounds = config.polling_bounds
+    webhook = config.webhook_config
+    if webhook['enabled'] and not webhook['token']:
+        # The endpoint rejects events without a token, so keep polling at full rate
+        logger.error("Webhook ingestion is enabled but ZABBIX_WEBHOOK_TOKEN is not set; pushed events will be refused")
+    elif webhook['enabled']:
+        # Pushed events keep alarms fresh; polling only reconciles missed events
+        reconcile = webhook['reconcile_interval_seconds']
+        bounds = {
+            "min_interval_seconds": max(bounds['min_interval_seconds'], reconcile),
+            "max_interval_seconds": max(bounds['max_interval_seconds'], reconcile)
+        }
+    alarm_poller = AlarmPoller(
+        mcp_client,
+        alarm_aggregator,
+        poll_interval,
+        suppress_maintenance=maintenance['suppress_alarms'],
+        min_interval=bounds['min_interval_seconds'],
+        max_interval=bounds['max_interval_seconds']
+    )
+    
+    # Only the lease holder polls Zabbix; other replicas load its published alarms
+    state = config.alarm_state_config
+    if state['backend'] == 'postgres':
+        alarm_state.store = PostgresAlarmStore()
+    alarm_state.lease_seconds = max(state['lease_seconds'], 2 * bounds['min_interval_seconds'])
+    alarm_state.sync_interval = state['sync_interval_seconds']
+    webhook_ingestor.poller = alarm_poller
+    webhook_ingestor.dedupe_seconds = webhook['dedupe_seconds']
+    alarm_state.event_handler = webhook_ingestor.apply
+    await alarm_state.start(alarm_poller, alarm_aggregator)
+    logger.info(f"Alarm polling started (interval: {poll_interval}s, state: {state['backend']})")
     
     # Initialize and start instance monitor
-    instance_monitor = InstanceMonitor(mcp_client, alarm_aggregator, poll_interval)
+    instance_monitor = InstanceMonitor(
+        mcp_client,
+        alarm_aggregator,
+        poll_interval,
+        min_interval=config.polling_bounds['min_interval_seconds']
+    )
     await instance_monitor.start()
     logger.info("Instance monitor started")
     
-    # Do initial poll
-    await alarm_poller.poll_all_instances()
+    # Keep monthly history partitions ahead of time and drop expired months
+    history = config.history_config
+    history_retention.retention_days = history['retention_days']
+    history_retention.months_ahead = history['partition_months_ahead']
+    history_retention.check_interval = history['retention_check_interval_seconds']
+    history_retention.archive_path = Path(history['archive_path']) if history['archive_enabled'] else None
+    await history_retention.start()
+    
+    # Deduplicated, compressed tool call results
+    tool_results = config.tool_results_config
+    tool_result_store.max_result_bytes = tool_results['max_result_bytes']
+    tool_result_store.compression = tool_results['compression']
+    tool_result_store.level = tool_results['compression_level']
+    
+    # Buffer agent tool calls and write them in batches
+    tool_calls = config.tool_calls_config
+    tool_call_recorder.flush_interval = tool_calls['flush_interval_seconds']
+    tool_call_recorder.max_batch_size = tool_calls['max_batch_size']
+    tool_call_recorder.max_pending = tool_calls['max_pending']
+    await tool_call_recorder.start()
+    
+    # Optionally pre-investigate severe alarms in the background
+    pre = config.pre_investigation_config
+    if pre['enabled']:
+        severity_codes = dict(SEVERITY_MAP.values())
+        pre_investigator = PreInvestigator(
+            mcp_client,
+            alarm_aggregator,
+            min_severity_code=severity_codes.get(pre['min_severity'], 4),
+            max_concurrent=pre['max_concurrent'],
+            max_per_hour=pre['max_per_hour'],
+            check_interval=pre['check_interval_seconds']
+        )
+        await pre_investigator.start()
     
     yield
     
     # Shutdown
     logger.info("Shutting down application...")
-    if alarm_poller:
-        await alarm_poller.stop()
+    if pre_investigator:
+        await pre_investigator.stop()
+    await history_retention.stop()
+    await runbook_index.stop()
+    await alarm_state.stop()
     if instance_monitor:
         await instance_monitor.stop()
     if mcp_client:
         await mcp_client.close()
+    if case_index.enabled:
+        case_index.save()
+    await tool_call_recorder.stop()
+    await dispose_async_engine()
 
 # Create FastAPI app
 app = FastAPI(
@@ -87,14 +230,16 @@ app.add_middleware(
 )
 
 # Import routes
-from api.routes import instances, alarms, health, chat, history
+from api.routes import instances, alarms, incidents, health, chat, history, webhooks
 
 # Register routes
 app.include_router(health.router, tags=["health"])
 app.include_router(instances.router, prefix="/api/instances", tags=["instances"])
 app.include_router(alarms.router, prefix="/api/alarms", tags=["alarms"])
+app.include_router(incidents.router, prefix="/api/incidents", tags=["incidents"])
 app.include_router(chat.router, prefix="/api/chat", tags=["chat"])
 app.include_router(history.router, prefix="/api/history", tags=["history"])
+app.include_router(webhooks.router, prefix="/api/webhooks", tags=["webhooks"])
 
 @app.get("/")
 async def root():
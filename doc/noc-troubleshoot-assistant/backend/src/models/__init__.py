@@ -1,15 +1,32 @@
 """Models package initialization."""
-from .database import Base, engine, SessionLocal, get_db, init_db, check_connection
-from .investigation import Investigation, ChatMessage, ToolCall
+from .database import (
+    Base, SessionLocal, get_engine, get_db, init_db, check_connection,
+    AsyncSessionLocal, async_session, get_async_db, get_async_engine, dispose_async_engine,
+    configure_pools, get_pool_stats, check_liveness
+)
+from .investigation import Investigation, ChatMessage, ToolCall, ToolResult
+from .service_state import ServiceLease, AlarmSnapshot, AlarmEvent
 
 __all__ = [
     "Base",
-    "engine",
     "SessionLocal",
+    "get_engine",
     "get_db",
+    "AsyncSessionLocal",
+    "async_session",
+    "get_async_db",
+    "get_async_engine",
+    "dispose_async_engine",
     "init_db",
     "check_connection",
+    "check_liveness",
+    "configure_pools",
+    "get_pool_stats",
     "Investigation",
     "ChatMessage",
     "ToolCall",
+    "ToolResult",
+    "ServiceLease",
+    "AlarmSnapshot",
+    "AlarmEvent",
 ]
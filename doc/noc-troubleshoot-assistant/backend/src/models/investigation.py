@@ -1,5 +1,5 @@
 """SQLAlchemy models for investigations, chat messages, and tool calls."""
-from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Integer, CheckConstraint
+from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Integer, Boolean, LargeBinary, CheckConstraint
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -22,6 +22,19 @@ class Investigation(Base):
     alarm_severity = Column(String(20), nullable=False)
     host_name = Column(String(255), nullable=False)
     instance_id = Column(String(100), nullable=False)
+    alarm_fingerprint = Column(String(64), nullable=True)
+    origin = Column(String(20), default="operator", nullable=False)
+    # Operator rejected a cached analysis; routes the run to the stronger model
+    refresh_requested = Column(Boolean, default=False, nullable=False)
+    
+    # Replica running the model; claimed so replicas never run one investigation twice
+    run_holder = Column(String(255), nullable=True)
+    run_expires_at = Column(DateTime(timezone=True), nullable=True)
+    
+    # Model usage (tokens, prompt cache statistics)
+    metrics = Column(JSONB, nullable=True)
+    
+    # search_vector is generated by the database (see init.sql) and read by services.history_search
     
     # Metadata
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -37,6 +50,10 @@ class Investigation(Base):
             "status IN ('in_progress', 'completed', 'failed', 'cancelled')",
             name="chk_status"
         ),
+        CheckConstraint(
+            "origin IN ('operator', 'auto')",
+            name="chk_origin"
+        ),
     )
     
     def __repr__(self):
@@ -47,6 +64,7 @@ class ChatMessage(Base):
     __tablename__ = "chat_messages"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    # In PostgreSQL the tables are partitioned and a trigger cascades deletes instead of this key
     investigation_id = Column(UUID(as_uuid=True), ForeignKey("investigations.id", ondelete="CASCADE"), nullable=False)
     role = Column(String(20), nullable=False)
     content = Column(Text, nullable=False)
@@ -74,7 +92,10 @@ class ToolCall(Base):
     investigation_id = Column(UUID(as_uuid=True), ForeignKey("investigations.id", ondelete="CASCADE"), nullable=False)
     tool_name = Column(String(100), nullable=False)
     parameters = Column(JSONB, nullable=True)
+    # Inline result of rows written before results were stored in tool_results
     result = Column(JSONB, nullable=True)
+    result_hash = Column(String(64), nullable=True)
+    result_summary = Column(JSONB, nullable=True)
     duration_ms = Column(Integer, nullable=True)
     timestamp = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     
@@ -83,3 +104,18 @@ class ToolCall(Base):
     
     def __repr__(self):
         return f"<ToolCall(id={self.id}, tool={self.tool_name}, investigation_id={self.investigation_id})>"
+
+class ToolResult(Base):
+    """Tool result payload stored once per distinct content."""
+    __tablename__ = "tool_results"
+    
+    hash = Column(String(64), primary_key=True)
+    encoding = Column(String(10), nullable=False)
+    payload = Column(LargeBinary, nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    truncated = Column(Boolean, default=False, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    
+    def __repr__(self):
+        return f"<ToolResult(hash={self.hash}, size={self.size_bytes})>"
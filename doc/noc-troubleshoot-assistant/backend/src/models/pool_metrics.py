@@ -0,0 +1,105 @@
+"""Connection pool instrumentation."""
+from typing import Dict, Any, Optional
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+class PoolMetrics:
+    """Usage counters of one engine's connection pool.
+
+    Checkout wait is measured inside the pool (time to get a connection,
+    including opening a new one); the other counters come from pool events.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool = None
+        self.last_checkout: Optional[float] = None
+        self.stats = {
+            "checkouts": 0,
+            "connects": 0,
+            "invalidated": 0,
+            "pre_ping_failures": 0,
+            "timeouts": 0,
+            "wait_ms_total": 0.0,
+            "wait_ms_max": 0.0,
+            "overflow_peak": 0,
+        }
+
+    def attach(self, engine):
+        """Collect metrics of an engine created with an instrumented pool class."""
+        self.pool = engine.pool
+        self.pool.metrics = self
+        event.listen(engine.pool, "connect", self._on_connect)
+        event.listen(engine.pool, "checkout", self._on_checkout)
+        event.listen(engine.pool, "invalidate", self._on_invalidate)
+
+    def record_wait(self, seconds: float):
+        wait_ms = seconds * 1000
+        self.stats["wait_ms_total"] += wait_ms
+        self.stats["wait_ms_max"] = max(self.stats["wait_ms_max"], wait_ms)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self.stats["connects"] += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        # Checkout only succeeds on a live connection (pre-ping), so it doubles as a liveness signal
+        self.stats["checkouts"] += 1
+        self.last_checkout = time.monotonic()
+        self.stats["overflow_peak"] = max(self.stats["overflow_peak"], self.pool.overflow())
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        self.stats["invalidated"] += 1
+        # Failed pre-pings invalidate the connection with a DisconnectionError
+        if isinstance(exception, exc.DisconnectionError):
+            self.stats["pre_ping_failures"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pool configuration, current usage and counters."""
+        checkouts = self.stats["checkouts"]
+        live = {}
+        if self.pool is not None:
+            live = {
+                "pool_size": self.pool.size(),
+                "checked_out": self.pool.checkedout(),
+                "idle": self.pool.checkedin(),
+                "overflow": max(self.pool.overflow(), 0),
+                "max_overflow": self.pool._max_overflow,
+            }
+        return {
+            **live,
+            **self.stats,
+            "wait_ms_avg": round(self.stats["wait_ms_total"] / checkouts, 2) if checkouts else 0.0
+        }
+
+class _TimedCheckout:
+    """Pool mixin timing how long a checkout waits for a connection."""
+
+    metrics: Optional[PoolMetrics] = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            if self.metrics is not None:
+                self.metrics.stats["timeouts"] += 1
+            raise
+        finally:
+            if self.metrics is not None:
+                self.metrics.record_wait(time.perf_counter() - started)
+
+    def recreate(self):
+        # engine.dispose() replaces the pool; keep reporting to the same metrics
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        if self.metrics is not None:
+            self.metrics.pool = pool
+        return pool
+
+class InstrumentedQueuePool(_TimedCheckout, QueuePool):
+    """QueuePool reporting checkout wait time."""
+
+class InstrumentedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool reporting checkout wait time."""
@@ -0,0 +1,40 @@
+"""SQLAlchemy models for state shared between backend replicas."""
+from sqlalchemy import Column, String, DateTime, BigInteger
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+
+from .database import Base
+
+class ServiceLease(Base):
+    """Time-limited lease naming the replica that runs a singleton task."""
+    __tablename__ = "service_leases"
+
+    name = Column(String(50), primary_key=True)
+    holder = Column(String(255), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self):
+        return f"<ServiceLease(name={self.name}, holder={self.holder})>"
+
+class AlarmSnapshot(Base):
+    """Latest polled alarm list published by the polling leader."""
+    __tablename__ = "alarm_state"
+
+    name = Column(String(50), primary_key=True)
+    version = Column(BigInteger, nullable=False)
+    payload = Column(JSONB, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<AlarmSnapshot(name={self.name}, version={self.version})>"
+
+class AlarmEvent(Base):
+    """Webhook event received by a follower, queued for the polling leader."""
+    __tablename__ = "alarm_events"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    payload = Column(JSONB, nullable=False)
+    received_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<AlarmEvent(id={self.id})>"
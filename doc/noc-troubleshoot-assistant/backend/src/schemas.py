@@ -20,6 +20,7 @@ class Alarm(BaseModel):
     instance_id: str
     instance_name: str
     host: str
+    hostids: List[str] = []
     description: str
     severity: str
     severity_code: int
@@ -28,11 +29,55 @@ class Alarm(BaseModel):
     event_id: str
     is_synthetic: bool = False
     started_at: Optional[str] = None
+    trigger_id: Optional[str] = None
+    depends_on: List[str] = []
+    is_dependent: bool = False
+    root_alarm_id: Optional[str] = None
+    in_maintenance: bool = False
+    maintenance: Optional[Dict[str, Any]] = None
+    incident_id: Optional[str] = None
+    incident_size: int = 1
+
+# Incident schemas
+class Incident(BaseModel):
+    id: str
+    instance_id: str
+    title: str
+    root_alarm_id: str
+    root_host: str
+    severity: str
+    severity_code: int
+    alarm_count: int
+    hosts: List[str]
+    started_at: str
+
+class IncidentDetail(Incident):
+    alarms: List[Alarm]
 
 class AlarmAcknowledge(BaseModel):
     instance_id: str
     message: Optional[str] = ""
 
+class ZabbixWebhookEvent(BaseModel):
+    """Problem or recovery event sent by the Zabbix webhook media type.
+
+    Media type parameters map to Zabbix macros: event_id={EVENT.ID},
+    event_value={EVENT.VALUE}, trigger_id={TRIGGER.ID}, host={HOST.NAME},
+    host_id={HOST.ID}, name={EVENT.NAME}, severity={EVENT.NSEVERITY},
+    acknowledged={EVENT.ACK.STATUS}; instance_id is the backend's id of the
+    sending Zabbix instance.
+    """
+    instance_id: str = Field(..., min_length=1)
+    event_id: str = Field(..., min_length=1)
+    event_value: int = Field(..., ge=0, le=1, description="1 = problem, 0 = recovery")
+    trigger_id: Optional[str] = None
+    host: Optional[str] = None
+    host_id: Optional[str] = None
+    name: str = ""
+    severity: int = Field(0, ge=0, le=5)
+    clock: Optional[int] = Field(None, description="Problem start (unix time), defaults to receipt time")
+    acknowledged: bool = False
+
 # Chat schemas
 class ChatMessageCreate(BaseModel):
     investigation_id: UUID
@@ -50,6 +95,7 @@ class ChatMessageResponse(BaseModel):
 class InvestigateRequest(BaseModel):
     alarm_id: str
     instance_id: str
+    refresh: bool = False
 
 # Investigation schemas
 class InvestigationResponse(BaseModel):
@@ -62,6 +108,11 @@ class InvestigationResponse(BaseModel):
     alarm_severity: str
     host_name: str
     instance_id: str
+    metrics: Optional[Dict[str, Any]] = None
+    origin: str = "operator"
+    # Set on search results
+    rank: Optional[float] = None
+    snippet: Optional[str] = None
     
     class Config:
         from_attributes = True
@@ -77,11 +128,16 @@ class HistoryFilter(BaseModel):
     severity: Optional[List[str]] = None
     from_date: Optional[datetime] = None
     to_date: Optional[datetime] = None
+    cursor: Optional[str] = None
     page: int = 1
     limit: int = 20
+    count: str = "estimate"
+    sort: Optional[str] = None
 
 class HistoryListResponse(BaseModel):
     investigations: List[InvestigationResponse]
-    total: int
+    total: Optional[int] = None
+    total_estimated: bool = False
     page: int
     limit: int
+    next_cursor: Optional[str] = None
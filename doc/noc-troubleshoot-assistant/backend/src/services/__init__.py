@@ -2,16 +2,47 @@
 from .mcp_client import MCPClient
 from .alarm_aggregator import alarm_aggregator
 from .alarm_poller import AlarmPoller
+from .alarm_state import alarm_state, PostgresAlarmStore
+from .webhook_ingest import webhook_ingestor
+from .incident_correlator import incident_correlator
+from .trigger_dependencies import trigger_dependencies
+from .maintenance_index import maintenance_index
 from .instance_monitor import InstanceMonitor
 from .bedrock_agent import get_agent, NetworkTroubleshootAgent
 from .investigation_service import InvestigationService
+from .investigation_stream import stream_registry
+from .analysis_cache import analysis_cache
+from .case_index import case_index
+from .runbook_index import runbook_index
+from .model_router import model_router
+from .pre_investigator import PreInvestigator
+from .investigation_scheduler import investigation_scheduler
+from .history_retention import history_retention
+from .tool_results import tool_result_store
+from .tool_call_recorder import tool_call_recorder
 
 __all__ = [
     "MCPClient",
     "alarm_aggregator",
     "AlarmPoller",
+    "alarm_state",
+    "PostgresAlarmStore",
+    "webhook_ingestor",
+    "incident_correlator",
+    "trigger_dependencies",
+    "maintenance_index",
     "InstanceMonitor",
     "get_agent",
     "NetworkTroubleshootAgent",
     "InvestigationService",
+    "stream_registry",
+    "analysis_cache",
+    "case_index",
+    "runbook_index",
+    "model_router",
+    "PreInvestigator",
+    "investigation_scheduler",
+    "history_retention",
+    "tool_result_store",
+    "tool_call_recorder",
 ]
@@ -71,6 +71,8 @@ class AlarmAggregator:
             "total": len(all_alarms),
             "by_severity": severity_counts,
             "synthetic": len(self.synthetic_alarms),
+            "dependent": sum(1 for alarm in all_alarms if alarm.get('is_dependent')),
+            "in_maintenance": sum(1 for alarm in all_alarms if alarm.get('in_maintenance')),
             "zabbix": len(self.zabbix_alarms),
             "last_poll": self.last_poll.isoformat() if self.last_poll else None
         }
@@ -1,27 +1,43 @@
 """Alarm polling service."""
 import asyncio
-from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 import logging
+import time
 
-logger = logging.getLogger(__name__)
+from .alarm_record import AlarmRecord
+from .incident_correlator import incident_correlator
+from .trigger_dependencies import trigger_dependencies
+from .maintenance_index import maintenance_index
+from .poll_schedule import PollSchedule
 
-SEVERITY_MAP = {
-    "0": ("not_classified", 0),
-    "1": ("information", 1),
-    "2": ("warning", 2),
-    "3": ("average", 3),
-    "4": ("high", 4),
-    "5": ("disaster", 5)
-}
+logger = logging.getLogger(__name__)
 
 class AlarmPoller:
     """Poll Zabbix instances for active problems."""
     
-    def __init__(self, mcp_client, alarm_aggregator, poll_interval: int = 30):
+    def __init__(
+        self,
+        mcp_client,
+        alarm_aggregator,
+        poll_interval: int = 30,
+        suppress_maintenance: bool = False,
+        min_interval: Optional[int] = None,
+        max_interval: Optional[int] = None
+    ):
         self.mcp_client = mcp_client
         self.alarm_aggregator = alarm_aggregator
         self.poll_interval = poll_interval
+        self.suppress_maintenance = suppress_maintenance
+        # Without bounds every instance is polled at the fixed interval
+        self.schedule = PollSchedule(
+            poll_interval,
+            min_interval or poll_interval,
+            max_interval or poll_interval
+        )
+        self.instance_alarms: Dict[str, List[AlarmRecord]] = {}
+        self.instance_names: Dict[str, str] = {}
+        # Pushed events per instance, replayed over poll results that started before them
+        self.pushed: Dict[str, List[Tuple[float, str, Optional[AlarmRecord]]]] = {}
         self.running = False
         self.task = None
     
@@ -53,29 +69,137 @@ class AlarmPoller:
             except Exception as e:
                 logger.error(f"Error in poll loop: {e}")
             
-            await asyncio.sleep(self.poll_interval)
+            await asyncio.sleep(self.seconds_until_due())
+    
+    def is_due(self) -> bool:
+        """Check whether any instance poll is due."""
+        return self.schedule.seconds_until_due() <= 0
+    
+    def seconds_until_due(self) -> float:
+        """Get seconds until the next instance poll is due (at least one second)."""
+        if not self.schedule.intervals:
+            # No connected instance yet; look for one at the base interval
+            return float(self.poll_interval)
+        return max(1.0, self.schedule.seconds_until_due())
     
-    async def poll_all_instances(self):
-        """Poll all instances for problems."""
+    async def poll_all_instances(self, force: bool = False) -> int:
+        """Poll instances whose adaptive interval has elapsed.
+        
+        Args:
+            force: Poll every connected instance regardless of its schedule
+        
+        Returns:
+            Number of instances polled
+        """
         try:
             instances = await self.mcp_client.get_instances()
-            all_alarms = []
+            connected = {i['id']: i for i in instances if i.get('status') == 'connected'}
+            self.instance_names = {instance_id: i['name'] for instance_id, i in connected.items()}
+            due = list(connected) if force else self.schedule.due(connected)
             
-            for instance in instances:
-                if instance.get('status') != 'connected':
-                    continue
-                
+            # Alarms of instances that went away disappear with them
+            dropped = [i for i in self.instance_alarms if i not in connected]
+            for instance_id in dropped:
+                del self.instance_alarms[instance_id]
+            self.schedule.forget(connected)
+            if not due and not dropped:
+                return 0
+            
+            for instance_id in due:
+                previous = {a['id'] for a in self.instance_alarms.get(instance_id, [])}
+                started = time.monotonic()
                 try:
-                    alarms = await self._poll_instance(instance)
-                    all_alarms.extend(alarms)
+                    alarms = await self._poll_instance(connected[instance_id])
                 except Exception as e:
-                    logger.error(f"Failed to poll {instance['id']}: {e}")
+                    logger.error(f"Failed to poll {instance_id}: {e}")
+                    alarms = []
+                
+                self.instance_alarms[instance_id] = alarms
+                latency = time.monotonic() - started
+                
+                # Events pushed while the poll was in flight are newer than its result
+                pushes = [p for p in self.pushed.pop(instance_id, []) if p[0] >= started]
+                if pushes:
+                    self.pushed[instance_id] = pushes
+                for _, event_id, record in pushes:
+                    self._apply(instance_id, event_id, record)
+                
+                changes = len(previous ^ {a['id'] for a in self.instance_alarms[instance_id]})
+                self.schedule.record(instance_id, changes, latency)
             
-            self.alarm_aggregator.set_zabbix_alarms(all_alarms)
-            logger.info(f"Polled {len(all_alarms)} alarms from {len(instances)} instances")
+            self._publish()
+            logger.info(f"Polled {len(due)} of {len(instances)} instances")
+            return len(due)
         
         except Exception as e:
             logger.error(f"Failed to poll instances: {e}")
+            return 0
+    
+    def _publish(self):
+        """Correlate the alarms of all instances and hand them to the aggregator."""
+        all_alarms = [alarm for alarms in self.instance_alarms.values() for alarm in alarms]
+        
+        # Group storm alarms into incidents before publishing them
+        try:
+            incident_correlator.update(all_alarms)
+        except Exception as e:
+            logger.error(f"Failed to correlate alarms: {e}")
+        
+        self.alarm_aggregator.set_zabbix_alarms(all_alarms)
+    
+    def _apply(self, instance_id: str, event_id: str, record: Optional[AlarmRecord]) -> bool:
+        """Replace or remove one alarm of an instance."""
+        current = self.instance_alarms.get(instance_id, [])
+        alarms = [a for a in current if a['id'] != event_id]
+        if record is not None and not (self.suppress_maintenance and record.in_maintenance):
+            alarms.append(record)
+        elif len(alarms) == len(current):
+            return False
+        
+        trigger_dependencies.annotate(instance_id, alarms)
+        self.instance_alarms[instance_id] = alarms
+        return True
+    
+    async def apply_push(self, instance_id: str, event_id: str, record: Optional[AlarmRecord] = None) -> bool:
+        """Apply a pushed problem, or the recovery of an event when no record is given.
+        
+        Returns:
+            Whether the alarm list changed
+        """
+        if instance_id not in self.instance_alarms:
+            # Only instances the poller knows are reconciled later
+            return False
+        
+        if record is not None:
+            record.instance_name = self.instance_names.get(instance_id, record.instance_name)
+            try:
+                await trigger_dependencies.refresh(self.mcp_client, instance_id, [record.trigger_id])
+            except Exception as e:
+                logger.error(f"Failed to refresh trigger cache for {instance_id}: {e}")
+            trigger_hosts = trigger_dependencies.hosts_for(instance_id, record.trigger_id)
+            if not record.hostids:
+                record.hostids = [h['hostid'] for h in trigger_hosts]
+            if not record.host:
+                record.host = (
+                    trigger_hosts[0].get('name') or trigger_hosts[0].get('host')
+                    if trigger_hosts else self._host_from_name(record.description)
+                )
+            record.host_groups = trigger_dependencies.groups_for(instance_id, record.trigger_id)
+            maintenance_index.annotate(instance_id, [record])
+        
+        self.pushed.setdefault(instance_id, []).append((time.monotonic(), event_id, record))
+        if not self._apply(instance_id, event_id, record):
+            return False
+        self._publish()
+        return True
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get polling statistics."""
+        return {
+            "min_interval_seconds": self.schedule.floor,
+            "max_interval_seconds": self.schedule.ceiling,
+            "instances": self.schedule.get_stats()
+        }
     
     async def _poll_instance(self, instance: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Poll single instance for problems."""
@@ -93,45 +217,44 @@ class AlarmPoller:
             return []
         
         problems = result.get('data', [])
-        alarms = []
         
+        # One batched trigger.get for triggers not cached yet gives hosts and dependencies
+        try:
+            await trigger_dependencies.refresh(
+                self.mcp_client, instance_id, [p.get('objectid') for p in problems]
+            )
+        except Exception as e:
+            logger.error(f"Failed to refresh trigger cache for {instance_id}: {e}")
+        
+        alarms = []
         for problem in problems:
-            severity_str = problem.get('severity', '0')
-            severity_name, severity_code = SEVERITY_MAP.get(severity_str, ("not_classified", 0))
+            trigger_hosts = trigger_dependencies.hosts_for(instance_id, problem.get('objectid'))
+            if trigger_hosts:
+                host = trigger_hosts[0].get('name') or trigger_hosts[0].get('host')
+            else:
+                host = self._host_from_name(problem.get('name', ''))
             
-            # Calculate duration
-            clock = int(problem.get('clock', 0))
-            duration = self._format_duration(datetime.utcnow().timestamp() - clock)
-            
-            alarm = {
-                "id": problem.get('eventid'),
-                "instance_id": instance_id,
-                "instance_name": instance_name,
-                "host": problem.get('name', '').split(':')[0].strip() if ':' in problem.get('name', '') else 'Unknown',
-                "description": problem.get('name', 'Unknown problem'),
-                "severity": severity_name,
-                "severity_code": severity_code,
-                "duration": duration,
-                "acknowledged": problem.get('acknowledged') == '1',
-                "event_id": problem.get('eventid'),
-                "is_synthetic": False,
-                "started_at": datetime.fromtimestamp(clock).isoformat() if clock else None
-            }
+            alarm = AlarmRecord.from_problem(problem, instance_id, instance_name, host)
+            alarm.hostids = [h['hostid'] for h in trigger_hosts]
+            alarm.host_groups = trigger_dependencies.groups_for(instance_id, problem.get('objectid'))
             alarms.append(alarm)
         
+        # Mark alarms caused by a firing upstream trigger so pipelines focus on roots
+        trigger_dependencies.annotate(instance_id, alarms)
+        
+        # Flag alarms on hosts under planned maintenance
+        try:
+            await maintenance_index.refresh_if_due(self.mcp_client, instance_id)
+            maintenance_index.annotate(instance_id, alarms)
+        except Exception as e:
+            logger.error(f"Failed to check maintenance windows for {instance_id}: {e}")
+        
+        if self.suppress_maintenance:
+            alarms = [a for a in alarms if not a.get('in_maintenance')]
+        
         return alarms
     
-    def _format_duration(self, seconds: float) -> str:
-        """Format duration in human-readable format."""
-        if seconds < 60:
-            return f"{int(seconds)}s"
-        elif seconds < 3600:
-            return f"{int(seconds / 60)}m"
-        elif seconds < 86400:
-            hours = int(seconds / 3600)
-            minutes = int((seconds % 3600) / 60)
-            return f"{hours}h {minutes}m"
-        else:
-            days = int(seconds / 86400)
-            hours = int((seconds % 86400) / 3600)
-            return f"{days}d {hours}h"
+    @staticmethod
+    def _host_from_name(name: str) -> str:
+        """Guess host from a 'host: problem' name when Zabbix host data is unavailable."""
+        return name.split(':')[0].strip() if ':' in name else 'Unknown'
@@ -0,0 +1,179 @@
+"""Compact alarm records built from Zabbix problems."""
+from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional
+import time
+
+SEVERITY_MAP = {
+    "0": ("not_classified", 0),
+    "1": ("information", 1),
+    "2": ("warning", 2),
+    "3": ("average", 3),
+    "4": ("high", 4),
+    "5": ("disaster", 5)
+}
+
+SEVERITY_CODES = {name: code for name, code in SEVERITY_MAP.values()}
+
+def format_duration(seconds: float) -> str:
+    """Format duration in human-readable format."""
+    if seconds < 60:
+        return f"{int(seconds)}s"
+    elif seconds < 3600:
+        return f"{int(seconds / 60)}m"
+    elif seconds < 86400:
+        hours = int(seconds / 3600)
+        minutes = int((seconds % 3600) / 60)
+        return f"{hours}h {minutes}m"
+    else:
+        days = int(seconds / 86400)
+        hours = int((seconds % 86400) / 3600)
+        return f"{days}d {hours}h"
+
+class AlarmRecord:
+    """Zabbix problem stored with its raw start timestamp.
+
+    Records behave like the alarm dicts used across the services (item
+    access, get, assignment of annotation fields), but keep only slots and
+    derive 'duration' and 'started_at' from the raw clock when read, so the
+    duration is never stale.
+    """
+
+    __slots__ = (
+        "id", "instance_id", "instance_name", "host", "description",
+        "severity", "severity_code", "clock", "acknowledged", "trigger_id",
+        "in_maintenance", "maintenance", "depends_on", "is_dependent",
+        "root_alarm_id", "incident_id", "incident_size", "hostids", "host_groups"
+    )
+
+    # Fields included when serializing, in API order
+    FIELDS = (
+        "id", "instance_id", "instance_name", "host", "hostids", "description",
+        "severity", "severity_code", "duration", "acknowledged", "event_id",
+        "is_synthetic", "started_at", "trigger_id", "depends_on", "is_dependent",
+        "root_alarm_id", "in_maintenance", "maintenance", "incident_id", "incident_size"
+    )
+
+    is_synthetic = False
+
+    def __init__(
+        self,
+        event_id: str,
+        instance_id: str,
+        instance_name: str,
+        host: str,
+        description: str,
+        severity_code: int,
+        clock: int,
+        acknowledged: bool = False,
+        trigger_id: Optional[str] = None,
+        in_maintenance: bool = False
+    ):
+        self.id = event_id
+        self.instance_id = instance_id
+        self.instance_name = instance_name
+        self.host = host
+        self.description = description
+        self.severity, self.severity_code = SEVERITY_MAP.get(str(severity_code), ("not_classified", 0))
+        self.clock = clock
+        self.acknowledged = acknowledged
+        self.trigger_id = trigger_id
+        self.in_maintenance = in_maintenance
+        self.maintenance = None
+        self.depends_on: List[str] = []
+        self.is_dependent = False
+        self.root_alarm_id = None
+        self.incident_id = None
+        self.incident_size = 1
+        self.hostids: List[str] = []
+        self.host_groups: List[str] = []
+
+    @classmethod
+    def from_problem(cls, problem: Dict[str, Any], instance_id: str, instance_name: str, host: str) -> "AlarmRecord":
+        """Build record from a problem.get result."""
+        return cls(
+            event_id=problem.get('eventid'),
+            instance_id=instance_id,
+            instance_name=instance_name,
+            host=host,
+            description=problem.get('name', 'Unknown problem'),
+            severity_code=problem.get('severity', '0'),
+            clock=int(problem.get('clock', 0)),
+            acknowledged=problem.get('acknowledged') == '1',
+            trigger_id=problem.get('objectid'),
+            # Zabbix suppresses problems of hosts in maintenance
+            in_maintenance=problem.get('suppressed') == '1'
+        )
+
+    @property
+    def event_id(self) -> str:
+        return self.id
+
+    @property
+    def duration(self) -> str:
+        return format_duration(time.time() - self.clock)
+
+    @property
+    def started_at(self) -> Optional[str]:
+        return datetime.fromtimestamp(self.clock).isoformat() if self.clock else None
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key: str, value: Any):
+        try:
+            setattr(self, key, value)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key: str) -> bool:
+        return hasattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+    def keys(self) -> Iterator[str]:
+        return iter(self.FIELDS)
+
+    def to_state(self) -> Dict[str, Any]:
+        """Get all stored fields, for sharing the record with other replicas."""
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "AlarmRecord":
+        """Rebuild record from to_state() output."""
+        record = cls(
+            event_id=state['id'],
+            instance_id=state['instance_id'],
+            instance_name=state['instance_name'],
+            host=state['host'],
+            description=state['description'],
+            severity_code=state.get('severity_code', 0),
+            clock=state.get('clock', 0)
+        )
+        for slot in cls.__slots__:
+            if slot in state and slot not in ('severity', 'severity_code'):
+                setattr(record, slot, state[slot])
+        return record
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize for the API, computing the duration now."""
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+def alarm_to_dict(alarm) -> Dict[str, Any]:
+    """Serialize an alarm record or a synthetic alarm dict."""
+    return alarm.to_dict() if isinstance(alarm, AlarmRecord) else alarm
+
+def alarm_from_investigation(investigation) -> Dict[str, Any]:
+    """Rebuild the alarm of a stored investigation (e.g. to resume its run)."""
+    return {
+        "id": investigation.alarm_id,
+        "description": investigation.alarm_description,
+        "severity": investigation.alarm_severity,
+        # Queue priority of the run is ordered by severity code
+        "severity_code": SEVERITY_CODES.get(investigation.alarm_severity, 0),
+        "host": investigation.host_name,
+        "instance_id": investigation.instance_id,
+    }
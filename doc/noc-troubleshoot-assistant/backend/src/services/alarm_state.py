@@ -0,0 +1,312 @@
+"""Alarm state shared between backend replicas, with leader-elected polling."""
+import asyncio
+from datetime import timedelta
+from typing import Dict, Any, List, Optional, Tuple
+import logging
+import os
+import socket
+import time
+
+from sqlalchemy import select, exists, update, delete, func
+from sqlalchemy.dialects.postgresql import insert
+
+from models import SessionLocal, ServiceLease, AlarmSnapshot, AlarmEvent
+from .alarm_record import AlarmRecord
+from .incident_correlator import incident_correlator
+
+logger = logging.getLogger(__name__)
+
+POLLER_LEASE = "alarm-poller"
+SNAPSHOT_NAME = "zabbix"
+
+Snapshot = Tuple[int, List[Dict[str, Any]]]
+
+class MemoryAlarmStore:
+    """Process-local store for a single replica (or tests).
+
+    Implements the same lease and snapshot semantics as the shared store,
+    so replicas sharing one instance behave like replicas sharing Postgres.
+    """
+
+    shared = False
+
+    def __init__(self):
+        self.leases: Dict[str, Tuple[str, float]] = {}
+        self.version = 0
+        self.alarms: List[Dict[str, Any]] = []
+        self.events: List[Dict[str, Any]] = []
+
+    def acquire_lease(self, name: str, holder: str, lease_seconds: int) -> bool:
+        current = self.leases.get(name)
+        now = time.monotonic()
+        if current is not None and current[0] != holder and current[1] > now:
+            return False
+        self.leases[name] = (holder, now + lease_seconds)
+        return True
+
+    def release_lease(self, name: str, holder: str):
+        if self.leases.get(name, (None, 0))[0] == holder:
+            del self.leases[name]
+
+    def _holds(self, holder: str) -> bool:
+        current = self.leases.get(POLLER_LEASE)
+        return current is not None and current[0] == holder and current[1] > time.monotonic()
+
+    def save(self, alarms: List[Dict[str, Any]], holder: str) -> Optional[int]:
+        if not self._holds(holder):
+            return None
+        self.version += 1
+        self.alarms = list(alarms)
+        return self.version
+
+    def load(self, since_version: int) -> Optional[Snapshot]:
+        if self.version <= since_version:
+            return None
+        return self.version, list(self.alarms)
+
+    def push_event(self, event: Dict[str, Any]):
+        self.events.append(event)
+
+    def take_events(self) -> List[Dict[str, Any]]:
+        events, self.events = self.events, []
+        return events
+
+class PostgresAlarmStore:
+    """Store in the application database, shared by all replicas.
+
+    Leases are rows whose expiry only the holder can extend; another replica
+    takes over once the lease lapses. The alarm list is one JSONB snapshot
+    row with a version that followers compare before loading the payload.
+    Webhook events received by followers are queued for the leader.
+    """
+
+    shared = True
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+
+    def acquire_lease(self, name: str, holder: str, lease_seconds: int) -> bool:
+        expires_at = func.now() + timedelta(seconds=lease_seconds)
+        stmt = insert(ServiceLease).values(name=name, holder=holder, expires_at=expires_at)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ServiceLease.name],
+            set_={"holder": holder, "expires_at": expires_at},
+            where=(ServiceLease.holder == holder) | (ServiceLease.expires_at < func.now())
+        ).returning(ServiceLease.holder)
+        db = self.session_factory()
+        try:
+            acquired = db.execute(stmt).first() is not None
+            db.commit()
+            return acquired
+        finally:
+            db.close()
+
+    def release_lease(self, name: str, holder: str):
+        db = self.session_factory()
+        try:
+            db.execute(
+                update(ServiceLease)
+                .where(ServiceLease.name == name, ServiceLease.holder == holder)
+                .values(expires_at=func.now())
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def save(self, alarms: List[Dict[str, Any]], holder: str) -> Optional[int]:
+        payload = [a.to_state() if isinstance(a, AlarmRecord) else dict(a) for a in alarms]
+        # A leader that lost its lease mid-poll must not overwrite the new leader's state
+        still_leader = exists().where(
+            ServiceLease.name == POLLER_LEASE,
+            ServiceLease.holder == holder,
+            ServiceLease.expires_at > func.now()
+        )
+        stmt = insert(AlarmSnapshot).values(name=SNAPSHOT_NAME, version=1, payload=payload)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[AlarmSnapshot.name],
+            set_={"version": AlarmSnapshot.version + 1, "payload": stmt.excluded.payload, "updated_at": func.now()},
+            where=still_leader
+        ).returning(AlarmSnapshot.version)
+        db = self.session_factory()
+        try:
+            row = db.execute(stmt).first()
+            db.commit()
+            return row[0] if row else None
+        finally:
+            db.close()
+
+    def load(self, since_version: int) -> Optional[Snapshot]:
+        db = self.session_factory()
+        try:
+            row = db.execute(
+                select(AlarmSnapshot.version, AlarmSnapshot.payload)
+                .where(AlarmSnapshot.name == SNAPSHOT_NAME, AlarmSnapshot.version > since_version)
+            ).first()
+            return (row.version, row.payload) if row else None
+        finally:
+            db.close()
+
+    def push_event(self, event: Dict[str, Any]):
+        db = self.session_factory()
+        try:
+            db.execute(insert(AlarmEvent).values(payload=event))
+            db.commit()
+        finally:
+            db.close()
+
+    def take_events(self) -> List[Dict[str, Any]]:
+        db = self.session_factory()
+        try:
+            rows = db.execute(
+                delete(AlarmEvent).returning(AlarmEvent.id, AlarmEvent.payload)
+            ).all()
+            db.commit()
+            return [row.payload for row in sorted(rows, key=lambda r: r.id)]
+        finally:
+            db.close()
+
+class AlarmState:
+    """Run the alarm poller on one replica and share its results with the rest.
+
+    Every replica tries to take or renew the poller lease on each tick. The
+    holder polls Zabbix and publishes the alarm list to the store; the other
+    replicas only load new snapshots, so adding replicas scales API reads
+    without multiplying upstream polling. With the in-memory store the
+    single replica is always the leader. Pushed webhook events received by
+    a follower are forwarded through the store and applied by the leader.
+    """
+
+    def __init__(self, store=None, lease_seconds: int = 90, sync_interval: int = 5):
+        self.store = store or MemoryAlarmStore()
+        self.lease_seconds = lease_seconds
+        self.sync_interval = sync_interval
+        self.holder = f"{os.getenv('HOSTNAME') or socket.gethostname()}-{os.getpid()}"
+        self.is_leader = True
+        self.version = 0
+        self.poller = None
+        self.alarm_aggregator = None
+        # Coroutine applying a forwarded webhook event, returning whether alarms changed
+        self.event_handler = None
+        self.running = False
+        self.task = None
+        self.stats = {"polls": 0, "snapshots_loaded": 0, "leader_changes": 0, "events_forwarded": 0}
+
+    async def start(self, poller, alarm_aggregator):
+        """Take part in leader election and start the sync loop."""
+        if self.running:
+            return
+
+        self.poller = poller
+        self.alarm_aggregator = alarm_aggregator
+        self.running = True
+        # First tick inline so the alarm list is populated before serving requests
+        try:
+            await self.tick()
+        except Exception as e:
+            logger.error(f"Initial alarm state sync failed: {e}")
+        self.task = asyncio.create_task(self._sync_loop())
+        logger.info(f"Alarm state started ({type(self.store).__name__}, holder {self.holder})")
+
+    async def stop(self):
+        """Stop the sync loop and hand the poller lease over."""
+        self.running = False
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        if self.is_leader:
+            try:
+                await asyncio.to_thread(self.store.release_lease, POLLER_LEASE, self.holder)
+            except Exception as e:
+                logger.error(f"Failed to release poller lease: {e}")
+        logger.info("Alarm state stopped")
+
+    async def _sync_loop(self):
+        """Main sync loop."""
+        while self.running:
+            try:
+                await self.tick()
+            except Exception as e:
+                logger.error(f"Error in alarm state loop: {e}")
+
+            if self.is_leader:
+                # Wake for the next due instance, early enough to renew the lease,
+                # and often enough to apply events forwarded by followers
+                delay = min(self.poller.seconds_until_due(), self.lease_seconds / 3)
+                if self.store.shared:
+                    delay = min(delay, self.sync_interval)
+                await asyncio.sleep(delay)
+            else:
+                await asyncio.sleep(self.sync_interval)
+
+    async def tick(self):
+        """Renew the lease, then poll and publish (leader) or load the latest snapshot."""
+        leader = await asyncio.to_thread(self.store.acquire_lease, POLLER_LEASE, self.holder, self.lease_seconds)
+        changed = leader != self.is_leader
+        if changed:
+            self.stats["leader_changes"] += 1
+            logger.info(f"{self.holder} {'became' if leader else 'is no longer'} the alarm polling leader")
+        self.is_leader = leader
+
+        if leader:
+            polled = 0
+            # A new leader's own poll results are outdated; poll everything once
+            if changed or self.poller.is_due():
+                polled = await self.poller.poll_all_instances(force=changed)
+                self.stats["polls"] += 1 if polled else 0
+            applied = await self._apply_forwarded_events()
+            if polled or applied:
+                await self.publish()
+            return
+
+        snapshot = await asyncio.to_thread(self.store.load, self.version)
+        if snapshot is None:
+            return
+        self.version, states = snapshot
+        alarms = [a if isinstance(a, AlarmRecord) else AlarmRecord.from_state(a) for a in states]
+        # Incidents are derived locally so incident routes work on every replica
+        try:
+            incident_correlator.update(alarms)
+        except Exception as e:
+            logger.error(f"Failed to correlate alarms: {e}")
+        self.alarm_aggregator.set_zabbix_alarms(alarms)
+        self.stats["snapshots_loaded"] += 1
+
+    async def _apply_forwarded_events(self) -> int:
+        """Apply webhook events queued by followers."""
+        if self.event_handler is None:
+            return 0
+        applied = 0
+        for event in await asyncio.to_thread(self.store.take_events):
+            try:
+                applied += 1 if await self.event_handler(event) else 0
+            except Exception as e:
+                logger.error(f"Failed to apply forwarded event {event.get('event_id')}: {e}")
+        return applied
+
+    async def publish(self):
+        """Publish the leader's current alarm list to the other replicas."""
+        version = await asyncio.to_thread(self.store.save, self.alarm_aggregator.zabbix_alarms, self.holder)
+        if version is not None:
+            self.version = version
+
+    async def forward_event(self, event: Dict[str, Any]):
+        """Queue a webhook event received by a follower for the leader."""
+        await asyncio.to_thread(self.store.push_event, event)
+        self.stats["events_forwarded"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get replication statistics."""
+        return {
+            **self.stats,
+            "store": type(self.store).__name__,
+            "holder": self.holder,
+            "is_leader": self.is_leader,
+            "version": self.version,
+            "polling": self.poller.get_stats() if self.is_leader and self.poller else None
+        }
+
+# Global alarm state
+alarm_state = AlarmState()
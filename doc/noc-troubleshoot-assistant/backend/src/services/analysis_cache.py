@@ -0,0 +1,135 @@
+"""Cache of completed analyses for recurring alarms."""
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
+from uuid import UUID
+import hashlib
+import logging
+import re
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Investigation, ChatMessage
+
+logger = logging.getLogger(__name__)
+
+_NUMBER_PATTERN = re.compile(r'\d+(?:[.,]\d+)*')
+_SPACE_PATTERN = re.compile(r'\s+')
+
+def normalize_description(description: str) -> str:
+    """Normalize alarm description so recurring triggers compare equal.
+
+    Numbers (thresholds, measured values, counters) vary between occurrences
+    of the same trigger, so they are collapsed to a placeholder.
+    """
+    text = _NUMBER_PATTERN.sub('#', (description or '').lower())
+    return _SPACE_PATTERN.sub(' ', text).strip()
+
+def alarm_fingerprint(alarm: Dict[str, Any]) -> str:
+    """Get stable fingerprint for instance, host and normalized description."""
+    key = "|".join([
+        alarm.get('instance_id') or '',
+        (alarm.get('host') or '').lower(),
+        normalize_description(alarm.get('description', ''))
+    ])
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+class CachedAnalysis:
+    """Completed analysis that can be reused for a repeated alarm."""
+
+    def __init__(self, investigation_id: UUID, content: str, completed_at: datetime):
+        self.investigation_id = investigation_id
+        self.content = content
+        self.completed_at = completed_at
+
+class AnalysisCache:
+    """In-memory LRU in front of completed investigations in the database."""
+
+    def __init__(self, freshness_minutes: int = 60, max_entries: int = 500):
+        self.freshness_minutes = freshness_minutes
+        self.max_entries = max_entries
+        self.enabled = True
+        self.entries: "OrderedDict[str, CachedAnalysis]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _is_fresh(self, completed_at: Optional[datetime]) -> bool:
+        if completed_at is None:
+            return False
+        if completed_at.tzinfo is not None:
+            completed_at = completed_at.replace(tzinfo=None) - completed_at.utcoffset()
+        return datetime.utcnow() - completed_at <= timedelta(minutes=self.freshness_minutes)
+
+    async def lookup(self, db: AsyncSession, alarm: Dict[str, Any]) -> Optional[CachedAnalysis]:
+        """Get fresh cached analysis for alarm, if any."""
+        if not self.enabled:
+            return None
+
+        fingerprint = alarm_fingerprint(alarm)
+        entry = self.entries.get(fingerprint)
+        if entry is not None:
+            if self._is_fresh(entry.completed_at):
+                self.entries.move_to_end(fingerprint)
+                self.hits += 1
+                return entry
+            del self.entries[fingerprint]
+
+        entry = await self._load(db, fingerprint)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._remember(fingerprint, entry)
+        self.hits += 1
+        return entry
+
+    async def _load(self, db: AsyncSession, fingerprint: str) -> Optional[CachedAnalysis]:
+        """Load most recent completed analysis within the freshness window."""
+        cutoff = datetime.utcnow() - timedelta(minutes=self.freshness_minutes)
+        result = await db.execute(select(Investigation.id, Investigation.ended_at, ChatMessage.content).join(
+            ChatMessage, ChatMessage.investigation_id == Investigation.id
+        ).where(
+            Investigation.alarm_fingerprint == fingerprint,
+            Investigation.status == 'completed',
+            Investigation.ended_at >= cutoff,
+            ChatMessage.role == 'assistant',
+            ChatMessage.content != ''
+        ).order_by(
+            # Copies made on cache hits share the source's ended_at; prefer the source
+            Investigation.ended_at.desc(), Investigation.started_at, ChatMessage.timestamp.desc()
+        ).limit(1))
+        row = result.first()
+
+        if row is None:
+            return None
+        return CachedAnalysis(row.id, row.content, row.ended_at)
+
+    def store(self, alarm: Dict[str, Any], investigation_id: UUID, content: str):
+        """Remember a freshly completed analysis."""
+        if not self.enabled or not content:
+            return
+        self._remember(alarm_fingerprint(alarm), CachedAnalysis(investigation_id, content, datetime.utcnow()))
+
+    def invalidate(self, alarm: Dict[str, Any]):
+        """Forget cached analysis for alarm."""
+        self.entries.pop(alarm_fingerprint(alarm), None)
+
+    def _remember(self, fingerprint: str, entry: CachedAnalysis):
+        self.entries[fingerprint] = entry
+        self.entries.move_to_end(fingerprint)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        return {
+            "enabled": self.enabled,
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "freshness_minutes": self.freshness_minutes
+        }
+
+# Global analysis cache
+analysis_cache = AnalysisCache()
@@ -1,15 +1,25 @@
 """Network troubleshooting agent using Strands framework."""
 from strands import Agent, tool
-from strands.models import BedrockModel
+from strands.models import BedrockModel, CacheConfig
 from typing import Dict, Any, List
 import httpx
 import logging
+import time
 from config import config
+from .runbook_index import runbook_index
+from .tool_call_recorder import tool_call_recorder
 
 logger = logging.getLogger(__name__)
 
+# Static instructions live in the system prompt so that, together with the
+# tool schemas, they form an identical prefix on every call that Bedrock can
+# serve from its prompt cache. Per-alarm data goes only in the user message.
+# That prefix is about 1k tokens, below the minimum Bedrock caches for Haiku
+# (4096) and at the edge of Sonnet's (1024), so most of the savings come from
+# the conversation cache point covering tool results across the agent loop.
 SYSTEM_PROMPT = """You are an expert network engineer specializing in troubleshooting network infrastructure issues.
-You have access to Zabbix monitoring tools to query hosts, problems, metrics, and historical data.
+You have access to Zabbix monitoring tools to query hosts, problems, metrics, and historical data,
+and to the NOC runbooks with documented diagnostic, resolution and escalation procedures.
 
 Your role is to:
 1. Analyze network alarms and their context
@@ -17,13 +27,66 @@ Your role is to:
 3. Identify root causes of network problems
 4. Provide clear, actionable remediation steps
 
+When asked to investigate an alarm you receive the alarm details, alarms correlated with it
+into the same incident, initial host data, similar past cases and the matching runbook
+(when one exists). Explain the whole incident: identify the root cause and which
+correlated alarms are symptoms of it. Use the Zabbix tools to
+gather additional information as needed, follow the runbook's diagnostic steps where
+they apply, and verify any past root cause against live data before relying on it.
+
 Be concise, technical, and focus on practical solutions. Format your responses with:
 - **Analysis**: What you found
 - **Root Cause**: Why it's happening  
+- **Impact**: What is affected
 - **Recommended Actions**: Step-by-step fix
 - **Escalation**: When to escalate (if needed)
 """
 
+def _format_runbook(context: Dict[str, Any]) -> str:
+    """Format the runbook matched to the alarm for the prompt."""
+    runbook = context.get('runbook')
+    if not runbook:
+        return "No matching runbook (use runbook_search if needed)"
+    
+    sections = "\n\n".join(f"### {s['section']}\n{s['text']}" for s in runbook['sections'])
+    return f"{runbook['title']} ({runbook['path']})\n\n{sections}"
+
+def _format_maintenance(context: Dict[str, Any]) -> str:
+    """Format the maintenance window covering the alarm host."""
+    maintenance = context.get('maintenance')
+    if not maintenance:
+        return "none active"
+    data = "data collection continues" if maintenance.get('collect_data') else "no data collection"
+    return f"host under planned maintenance '{maintenance.get('name')}' until {maintenance.get('active_till')} ({data})"
+
+def _format_related_alarms(context: Dict[str, Any], limit: int = 30) -> str:
+    """Format alarms correlated into the same incident for the prompt."""
+    related = context.get('related_alarms') or []
+    if not related:
+        return "None (isolated alarm)"
+    
+    lines = [
+        f"- {a['host']}: {a['description']} ({a['severity']}, since {a.get('started_at') or 'unknown'})"
+        for a in related[:limit]
+    ]
+    if len(related) > limit:
+        lines.append(f"- ... and {len(related) - limit} more")
+    return "\n".join(lines)
+
+def _format_similar_cases(context: Dict[str, Any]) -> str:
+    """Format previously solved similar cases for the prompt."""
+    cases = context.get('similar_cases') or []
+    if not cases:
+        return "No similar past cases found"
+    
+    lines = []
+    for case in cases:
+        lines.append(
+            f"- [{case['similarity']:.2f}] {case['description']} on {case['host']} "
+            f"({case.get('ended_at') or 'unknown date'}): {case['summary']}"
+        )
+    return "\n".join(lines) + "\n(Verify against live data before relying on a past root cause.)"
+
 class NetworkTroubleshootAgent:
     """Network troubleshooting agent with Strands and MCP tools."""
     
@@ -31,24 +94,40 @@ class NetworkTroubleshootAgent:
         self.mcp_base_url = mcp_base_url
         bedrock_config = config.load_app_config()['bedrock']
         
-        # Initialize Bedrock model
-        self.model = BedrockModel(
-            model_id=bedrock_config['model_id'],
-            temperature=bedrock_config.get('temperature', 0.3),
-            streaming=True
-        )
+        # Cache points after the tool schemas, the system prompt and the latest message
+        model_options = {}
+        if bedrock_config.get('prompt_caching', True):
+            model_options['cache_config'] = CacheConfig(strategy="auto", tools_ttl=True)
+        
+        # Initialize one Bedrock model per tier (fast for routine alarms, strong for escalations)
+        self.model_ids = {}
+        self.models = {}
+        for tier, tier_config in config.model_tiers.items():
+            self.model_ids[tier] = tier_config['model_id']
+            self.models[tier] = BedrockModel(
+                model_id=tier_config['model_id'],
+                temperature=tier_config['temperature'],
+                streaming=True,
+                **model_options
+            )
         
         # Create tools from MCP server
         self.tools = self._create_mcp_tools()
         
-        # Create agent
-        self.agent = Agent(
-            model=self.model,
+        logger.info(f"Strands agent initialized with {len(self.tools)} MCP tools, models {self.model_ids}")
+    
+    def _new_agent(self, tier: str = "fast") -> Agent:
+        """Create agent with an empty conversation for one investigation.
+        
+        A shared agent would carry every previous investigation in its
+        history, growing the prompt and breaking per-investigation metrics.
+        """
+        return Agent(
+            model=self.models[tier],
             tools=self.tools,
-            system_prompt=SYSTEM_PROMPT
+            system_prompt=SYSTEM_PROMPT,
+            callback_handler=None
         )
-        
-        logger.info(f"Strands agent initialized with {len(self.tools)} MCP tools")
     
     def _create_mcp_tools(self) -> List:
         """Create Strands tools from MCP server HTTP API."""
@@ -136,15 +215,25 @@ class NetworkTroubleshootAgent:
                 "monitored": True
             })
         
-        tools = [host_get, problem_get, item_get, history_get, trigger_get]
+        @tool
+        def runbook_search(query: str, limit: int = 3) -> Dict[str, Any]:
+            """Search NOC runbooks for diagnostic, resolution and escalation procedures.
+            
+            Args:
+                query: Symptom, trigger name or procedure to look for
+                limit: Max runbook sections to return
+            """
+            return {"status": "success", "data": runbook_index.search(query, limit)}
+        
+        tools = [host_get, problem_get, item_get, history_get, trigger_get, runbook_search]
         return tools
     
     def _call_mcp_tool(self, tool_name: str, instance_id: str, params: Dict[str, Any]) -> Dict[str, Any]:
-        """Call MCP server tool via HTTP."""
+        """Call MCP server tool via HTTP (recorded in the investigation's audit trail)."""
+        # Remove None values from params
+        clean_params = {k: v for k, v in params.items() if v is not None}
+        started = time.monotonic()
         try:
-            # Remove None values from params
-            clean_params = {k: v for k, v in params.items() if v is not None}
-            
             response = httpx.post(
                 f"{self.mcp_base_url}/tools/{tool_name}/invoke",
                 json={"instance_id": instance_id, "params": clean_params},
@@ -152,76 +241,121 @@ class NetworkTroubleshootAgent:
             )
             response.raise_for_status()
             result = response.json()
-            
-            if result.get('success'):
-                return {"status": "success", "data": result.get('data', [])}
-            else:
-                return {"status": "error", "error": result.get('error', 'Unknown error')}
         
         except Exception as e:
             logger.error(f"MCP tool call failed: {tool_name} - {e}")
-            return {"status": "error", "error": str(e)}
-    
-    async def investigate(self, alarm: Dict[str, Any], context: Dict[str, Any]) -> str:
-        """Investigate an alarm and return response.
+            result = {"success": False, "error": str(e)}
         
-        Args:
-            alarm: Alarm details
-            context: Additional context
-        
-        Returns:
-            Full response text
-        """
-        prompt = f"""Investigate this network alarm:
+        tool_call_recorder.record(
+            tool_name,
+            {"instance_id": instance_id, **clean_params},
+            result,
+            int((time.monotonic() - started) * 1000)
+        )
+        if result.get('success'):
+            return {"status": "success", "data": result.get('data', [])}
+        else:
+            return {"status": "error", "error": result.get('error', 'Unknown error')}
+    
+    def _build_prompt(self, alarm: Dict[str, Any], context: Dict[str, Any]) -> str:
+        """Build the per-alarm user message (instructions are in the system prompt)."""
+        return f"""Investigate this network alarm:
 
 **Alarm Details:**
 - Host: {alarm.get('host')}
+- Host IDs: {', '.join(context.get('hostids') or []) or 'unknown'}
 - Problem: {alarm.get('description')}
 - Severity: {alarm.get('severity')} (Level {alarm.get('severity_code')})
 - Duration: {alarm.get('duration')}
 - Instance: {alarm.get('instance_name')} ({alarm.get('instance_id')})
+- Maintenance: {_format_maintenance(context)}
+
+**Correlated Alarms (same incident):**
+{_format_related_alarms(context)}
 
 **Initial Context:**
 {context.get('host_data', 'No host data available')}
 
-Please analyze this alarm using the available Zabbix tools and provide:
-1. Root cause analysis
-2. Impact assessment  
-3. Recommended remediation steps
-4. Whether escalation is needed
+**Similar Past Cases:**
+{_format_similar_cases(context)}
 
-Use the tools to gather additional information as needed.
+**Matching Runbook:**
+{_format_runbook(context)}
 """
+    
+    @staticmethod
+    def _usage_metrics(result) -> Dict[str, Any]:
+        """Extract token usage and prompt cache statistics from an agent result."""
+        usage = dict(result.metrics.accumulated_usage) if result is not None else {}
+        input_tokens = usage.get('inputTokens', 0)
+        cache_read = usage.get('cacheReadInputTokens', 0)
+        cache_write = usage.get('cacheWriteInputTokens', 0)
+        prompt_tokens = input_tokens + cache_read + cache_write
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": usage.get('outputTokens', 0),
+            "cache_read_tokens": cache_read,
+            "cache_write_tokens": cache_write,
+            "cache_hit_rate": round(cache_read / prompt_tokens, 3) if prompt_tokens else 0.0,
+            "cycles": result.metrics.cycle_count if result is not None else 0
+        }
+    
+    async def investigate(
+        self,
+        alarm: Dict[str, Any],
+        context: Dict[str, Any],
+        metrics: Dict[str, Any] = None,
+        tier: str = "fast"
+    ) -> str:
+        """Investigate an alarm and return response.
+        
+        Args:
+            alarm: Alarm details
+            context: Additional context
+            metrics: Optional dict filled with token usage and cache statistics
+            tier: Model tier to use (fast or strong)
         
+        Returns:
+            Full response text
+        """
         # Use Strands agent
-        result = self.agent(prompt)
+        result = await self._new_agent(tier).invoke_async(self._build_prompt(alarm, context))
+        if metrics is not None:
+            metrics.update(self._usage_metrics(result))
+            metrics['model_id'] = self.model_ids[tier]
         return result.message["content"][0]["text"]
     
-    async def stream_investigate(self, alarm: Dict[str, Any], context: Dict[str, Any]):
+    async def stream_investigate(
+        self,
+        alarm: Dict[str, Any],
+        context: Dict[str, Any],
+        metrics: Dict[str, Any] = None,
+        tier: str = "fast"
+    ):
         """Stream investigation response.
         
+        Args:
+            alarm: Alarm details
+            context: Additional context
+            metrics: Optional dict filled with token usage and cache statistics
+                once the stream is exhausted
+            tier: Model tier to use (fast or strong)
+        
         Yields:
             Response chunks
         """
-        prompt = f"""Investigate this network alarm:
-
-**Alarm Details:**
-- Host: {alarm.get('host')}
-- Problem: {alarm.get('description')}
-- Severity: {alarm.get('severity')} (Level {alarm.get('severity_code')})
-- Duration: {alarm.get('duration')}
-- Instance: {alarm.get('instance_name')} ({alarm.get('instance_id')})
-
-**Initial Context:**
-{context.get('host_data', 'No host data available')}
-
-Analyze this alarm using available Zabbix tools and provide root cause analysis and remediation steps.
-"""
+        result = None
         
         # Stream response
-        async for event in self.agent.stream_async(prompt):
+        async for event in self._new_agent(tier).stream_async(self._build_prompt(alarm, context)):
             if "data" in event:
                 yield event["data"]
+            elif "result" in event:
+                result = event["result"]
+        
+        if metrics is not None:
+            metrics.update(self._usage_metrics(result))
+            metrics['model_id'] = self.model_ids[tier]
 
 # Global agent instance
 _agent = None
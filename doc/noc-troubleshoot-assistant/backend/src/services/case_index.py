@@ -0,0 +1,266 @@
+"""Semantic index over past investigations used as agent context."""
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+import hashlib
+import json
+import logging
+import re
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from models import Investigation, ChatMessage
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(r'[a-z][a-z0-9_\-\.]*')
+_ROOT_CAUSE_PATTERN = re.compile(r'\*\*Root Cause\*\*:?(.*?)(?:\n\s*\*\*|\Z)', re.IGNORECASE | re.DOTALL)
+
+class HashingEmbedder:
+    """Local text embedder using signed feature hashing of words and bigrams.
+
+    Needs no model download or network call, and produces identical vectors
+    across processes so the index can be persisted.
+    """
+
+    def __init__(self, dimensions: int = 512):
+        self.dimensions = dimensions
+
+    def _bucket(self, feature: str):
+        digest = hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest()
+        value = int.from_bytes(digest, 'little')
+        return value % self.dimensions, 1.0 if (value >> 63) & 1 else -1.0
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embed text into an L2-normalized vector."""
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        tokens = _TOKEN_PATTERN.findall((text or '').lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        for feature in features:
+            index, sign = self._bucket(feature)
+            vector[index] += sign
+
+        # Sublinear term frequency, then unit length for cosine similarity
+        vector = np.sign(vector) * np.log1p(np.abs(vector))
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+def _as_utc_naive(value: datetime) -> datetime:
+    """Convert aware timestamps from the database to naive UTC."""
+    if value.tzinfo is None:
+        return value
+    return value.replace(tzinfo=None) - value.utcoffset()
+
+def summarize_answer(content: str, max_chars: int = 600) -> str:
+    """Extract the root cause section of an answer, falling back to its start."""
+    match = _ROOT_CAUSE_PATTERN.search(content or '')
+    summary = match.group(1).strip() if match and match.group(1).strip() else (content or '').strip()
+    return summary[:max_chars]
+
+class CaseIndex:
+    """Incrementally built matrix of past investigation embeddings."""
+
+    def __init__(self, dimensions: int = 512, index_path: Optional[str] = None):
+        self.embedder = HashingEmbedder(dimensions)
+        self.index_path = Path(index_path) if index_path else None
+        self.enabled = True
+        self.top_k = 3
+        self.min_score = 0.35
+        self.save_every = 20
+        self._matrix = np.zeros((0, dimensions), dtype=np.float32)
+        self._size = 0
+        self.case_ids: List[str] = []
+        self.cases: List[Dict[str, Any]] = []
+        self._content_hashes = set()
+        self.last_indexed_at: Optional[datetime] = None
+        self._unsaved = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _case_vector(self, description: str, host: str, answer: str) -> np.ndarray:
+        """Embed a case, weighting the alarm over the answer text."""
+        alarm_vector = self.embedder.embed(f"{description} {host}")
+        answer_vector = self.embedder.embed(answer[:2000])
+        vector = 2.0 * alarm_vector + answer_vector
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _append(self, vector: np.ndarray):
+        """Append row, growing the matrix geometrically."""
+        if self._size == self._matrix.shape[0]:
+            capacity = max(64, self._matrix.shape[0] * 2)
+            grown = np.zeros((capacity, self._matrix.shape[1]), dtype=np.float32)
+            grown[:self._size] = self._matrix[:self._size]
+            self._matrix = grown
+        self._matrix[self._size] = vector
+        self._size += 1
+
+    def add_case(
+        self,
+        investigation_id: str,
+        description: str,
+        host: str,
+        instance_id: str,
+        answer: str,
+        ended_at: Optional[datetime] = None
+    ) -> bool:
+        """Index a completed investigation. Returns False for duplicates."""
+        if not answer:
+            return False
+
+        # Analyses reused from the cache carry identical answers; index them once
+        content_hash = hashlib.sha1(answer.encode('utf-8')).hexdigest()
+        if content_hash in self._content_hashes:
+            return False
+
+        self._append(self._case_vector(description, host, answer))
+        self._content_hashes.add(content_hash)
+        self.case_ids.append(str(investigation_id))
+        self.cases.append({
+            "investigation_id": str(investigation_id),
+            "description": description,
+            "host": host,
+            "instance_id": instance_id,
+            "summary": summarize_answer(answer),
+            "ended_at": ended_at.isoformat() if ended_at else None,
+            "content_hash": content_hash
+        })
+        if ended_at is not None:
+            ended_at = _as_utc_naive(ended_at)
+            if self.last_indexed_at is None or ended_at > self.last_indexed_at:
+                self.last_indexed_at = ended_at
+
+        self._unsaved += 1
+        if self._unsaved >= self.save_every:
+            self.save()
+        return True
+
+    def search(self, alarm: Dict[str, Any], top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Find past cases most similar to an alarm."""
+        if not self.enabled or self._size == 0:
+            return []
+
+        top_k = top_k or self.top_k
+        query = self.embedder.embed(f"{alarm.get('description', '')} {alarm.get('host', '')}")
+        scores = self._matrix[:self._size] @ query
+
+        count = min(top_k, self._size)
+        candidates = np.argpartition(-scores, count - 1)[:count]
+        candidates = candidates[np.argsort(-scores[candidates])]
+
+        results = []
+        for index in candidates:
+            score = float(scores[index])
+            if score < self.min_score:
+                break
+            results.append({**self.cases[index], "similarity": round(score, 3)})
+        return results
+
+    def prune(self, db: Session, batch_size: int = 500) -> int:
+        """Drop cases whose investigation no longer exists, e.g. after retention.
+
+        Returns:
+            Number of cases removed
+        """
+        existing = set()
+        for start in range(0, len(self.case_ids), batch_size):
+            batch = [UUID(case_id) for case_id in self.case_ids[start:start + batch_size]]
+            rows = db.query(Investigation.id).filter(Investigation.id.in_(batch))
+            existing.update(str(row.id) for row in rows)
+
+        keep = [i for i, case_id in enumerate(self.case_ids) if case_id in existing]
+        removed = self._size - len(keep)
+        if removed:
+            self._matrix = self._matrix[keep]
+            self._size = len(keep)
+            self.cases = [self.cases[i] for i in keep]
+            self.case_ids = [self.case_ids[i] for i in keep]
+            self._content_hashes = {case['content_hash'] for case in self.cases}
+        return removed
+
+    def sync(self, db: Session) -> int:
+        """Index completed investigations not yet in the index and drop deleted ones."""
+        removed = self.prune(db)
+
+        query = db.query(
+            Investigation.id,
+            Investigation.alarm_description,
+            Investigation.host_name,
+            Investigation.instance_id,
+            Investigation.ended_at,
+            ChatMessage.content
+        ).join(
+            ChatMessage, ChatMessage.investigation_id == Investigation.id
+        ).filter(
+            Investigation.status == 'completed',
+            ChatMessage.role == 'assistant'
+        )
+        if self.last_indexed_at is not None:
+            query = query.filter(Investigation.ended_at >= self.last_indexed_at)
+
+        added = 0
+        for row in query.order_by(Investigation.ended_at).yield_per(500):
+            if self.add_case(row.id, row.alarm_description, row.host_name, row.instance_id, row.content, row.ended_at):
+                added += 1
+
+        if added or removed:
+            self.save()
+        logger.info(f"Case index synced: {added} new cases, {removed} removed, {self._size} total")
+        return added
+
+    def save(self):
+        """Persist index to disk."""
+        self._unsaved = 0
+        if self.index_path is None:
+            return
+        try:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.index_path, 'wb') as f:
+                np.savez_compressed(
+                    f,
+                    matrix=self._matrix[:self._size].astype(np.float16),
+                    cases=np.array(json.dumps(self.cases)),
+                    last_indexed_at=np.array(self.last_indexed_at.isoformat() if self.last_indexed_at else '')
+                )
+        except Exception as e:
+            logger.error(f"Failed to save case index: {e}")
+
+    def load(self) -> bool:
+        """Load persisted index from disk."""
+        if self.index_path is None or not self.index_path.exists():
+            return False
+        try:
+            with np.load(self.index_path, allow_pickle=False) as data:
+                matrix = data['matrix'].astype(np.float32)
+                cases = json.loads(str(data['cases']))
+                last_indexed_at = str(data['last_indexed_at'])
+
+            if matrix.shape[1] != self._matrix.shape[1] or matrix.shape[0] != len(cases):
+                logger.warning("Case index on disk does not match configuration, rebuilding")
+                return False
+
+            self._matrix = matrix
+            self._size = matrix.shape[0]
+            self.cases = cases
+            self.case_ids = [case['investigation_id'] for case in cases]
+            self._content_hashes = {case['content_hash'] for case in cases}
+            self.last_indexed_at = datetime.fromisoformat(last_indexed_at) if last_indexed_at else None
+            logger.info(f"Loaded case index with {self._size} cases")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to load case index: {e}")
+            return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get index statistics."""
+        return {
+            "enabled": self.enabled,
+            "cases": self._size,
+            "last_indexed_at": self.last_indexed_at.isoformat() if self.last_indexed_at else None
+        }
+
+# Global case index
+case_index = CaseIndex()
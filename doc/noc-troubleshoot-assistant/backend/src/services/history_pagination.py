@@ -0,0 +1,127 @@
+"""Keyset cursors and cached counts for the investigation history list."""
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, Hashable, Optional, Tuple
+from uuid import UUID
+import base64
+import json
+import time
+
+from sqlalchemy import select, func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+COUNT_MODES = ("estimate", "exact", "none")
+
+def _encode(payload) -> str:
+    raw = json.dumps(payload).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def _decode(cursor: str):
+    raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+    return json.loads(raw)
+
+def encode_cursor(started_at: datetime, investigation_id: UUID) -> str:
+    """Encode the sort key of the last listed investigation as an opaque cursor."""
+    return _encode([started_at.isoformat(), str(investigation_id)])
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """Decode a cursor into (started_at, id).
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        started_at, investigation_id = _decode(cursor)
+        return datetime.fromisoformat(started_at), UUID(investigation_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def encode_offset_cursor(offset: int) -> str:
+    """Encode a row offset as an opaque cursor (for orders without a unique key)."""
+    return _encode({"offset": offset})
+
+def decode_offset_cursor(cursor: str) -> int:
+    """Decode an offset cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        offset = _decode(cursor)["offset"]
+    except (TypeError, ValueError, KeyError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(offset, int) or offset < 0:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return offset
+
+class HistoryCounts:
+    """Total counts of history list filters, cached for a short time.
+
+    Counting a filtered set scans all of it, so counts are cached per filter
+    instead of being recomputed for every page. Without filters PostgreSQL's
+    planner statistics give an estimate of the table size at no cost.
+    """
+
+    def __init__(self, ttl_seconds: int = 60, max_entries: int = 256):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Hashable, Tuple[float, int]]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "estimates": 0}
+
+    async def count(self, db: AsyncSession, query, key: Hashable, mode: str = "estimate") -> Tuple[Optional[int], bool]:
+        """Count rows of a filtered select.
+
+        Args:
+            db: Database session
+            query: Filtered select of investigations
+            key: Hashable description of the filters (None when unfiltered)
+            mode: 'estimate', 'exact' or 'none'
+
+        Returns:
+            Tuple of (total or None, whether the total is an estimate)
+        """
+        if mode == "none":
+            return None, False
+
+        if mode == "estimate" and key is None:
+            estimate = await self._estimate_rows(db)
+            if estimate is not None:
+                self.stats["estimates"] += 1
+                return estimate, True
+
+        now = time.monotonic()
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] > now:
+            self.entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[1], False
+
+        self.stats["misses"] += 1
+        total = await db.scalar(select(func.count()).select_from(query.order_by(None).subquery()))
+        self.entries[key] = (now + self.ttl_seconds, total)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return total, False
+
+    @staticmethod
+    async def _estimate_rows(db: AsyncSession) -> Optional[int]:
+        """Get planner row estimate of the investigations table (PostgreSQL only)."""
+        if db.get_bind().dialect.name != "postgresql":
+            return None
+        estimate = await db.scalar(text(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = 'investigations'::regclass"
+        ))
+        # Tables never vacuumed or analyzed report -1
+        return estimate if estimate is not None and estimate >= 0 else None
+
+    def clear(self):
+        """Forget cached counts (after investigations are deleted)."""
+        self.entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get count cache statistics."""
+        return {**self.stats, "entries": len(self.entries), "ttl_seconds": self.ttl_seconds}
+
+# Global history count cache
+history_counts = HistoryCounts()
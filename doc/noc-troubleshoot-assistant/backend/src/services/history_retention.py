@@ -0,0 +1,271 @@
+"""Monthly partitions and retention of investigation history."""
+import asyncio
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+import gzip
+import logging
+import os
+import re
+
+from sqlalchemy import text
+
+from models import SessionLocal
+from .alarm_state import alarm_state
+from .tool_results import TOUCH_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Tables range-partitioned by month on their timestamp column (see init.sql)
+PARTITIONED_TABLES = {
+    "investigations": "started_at",
+    "chat_messages": "timestamp",
+    "tool_calls": "timestamp",
+}
+
+_PARTITION_PATTERN = re.compile(r"^(investigations|chat_messages|tool_calls)_p(\d{4})(\d{2})$")
+
+def add_months(month: date, months: int) -> date:
+    """Get first day of the month a number of months after the given month."""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(table: str, month: date) -> str:
+    """Get name of a table's partition for a month."""
+    return f"{table}_p{month:%Y%m}"
+
+def parse_partition(name: str) -> Optional[Tuple[str, date]]:
+    """Get (table, month) of a monthly partition name, or None for other tables."""
+    match = _PARTITION_PATTERN.match(name)
+    if not match:
+        return None
+    return match.group(1), date(int(match.group(2)), int(match.group(3)), 1)
+
+def expired_partitions(names: Iterable[str], retention_days: int, today: date) -> List[str]:
+    """Get partitions whose whole month is older than the retention window, oldest first."""
+    cutoff = today - timedelta(days=retention_days)
+    expired = []
+    for name in names:
+        parsed = parse_partition(name)
+        if parsed is not None and add_months(parsed[1], 1) <= cutoff:
+            expired.append((parsed[1], name))
+    return [name for _, name in sorted(expired)]
+
+class HistoryRetention:
+    """Create upcoming monthly partitions and drop expired ones.
+
+    Expired history is removed by dropping a whole month at once instead of
+    deleting rows, which leaves no dead tuples to vacuum. Messages and tool
+    calls are partitioned on their own timestamp, so children of an
+    investigation started at the end of a month go with the next month.
+    Rows that landed in a default partition (no monthly partition existed
+    yet) are deleted row by row as a fallback, as are stored tool results
+    no longer used by any kept tool call. With an archive path set,
+    each partition is first written to a gzipped JSON-lines file.
+    """
+
+    def __init__(
+        self,
+        retention_days: int = 90,
+        months_ahead: int = 2,
+        check_interval: int = 86400,
+        archive_path: Optional[str] = None,
+        session_factory=SessionLocal
+    ):
+        self.retention_days = retention_days
+        self.months_ahead = months_ahead
+        self.check_interval = check_interval
+        self.archive_path = Path(archive_path) if archive_path else None
+        self.session_factory = session_factory
+        self.running = False
+        self.task = None
+        self.last_run: Optional[datetime] = None
+        self.stats = {"created": 0, "dropped": 0, "archived": 0, "default_rows_deleted": 0, "tool_results_deleted": 0, "errors": 0}
+
+    def list_partitions(self, db) -> List[str]:
+        """Get names of all partitions of the history tables."""
+        rows = db.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent IN ('investigations'::regclass, 'chat_messages'::regclass, 'tool_calls'::regclass)"
+        ))
+        return [row[0] for row in rows]
+
+    def ensure_partitions(self, today: Optional[date] = None) -> List[str]:
+        """Create partitions for the current and upcoming months.
+
+        Returns:
+            Names of partitions created
+        """
+        month = (today or datetime.utcnow().date()).replace(day=1)
+        db = self.session_factory()
+        try:
+            existing = set(self.list_partitions(db))
+            created = []
+            for offset in range(self.months_ahead + 1):
+                start = add_months(month, offset)
+                end = add_months(start, 1)
+                for table in PARTITIONED_TABLES:
+                    name = partition_name(table, start)
+                    if name in existing:
+                        continue
+                    try:
+                        db.execute(text(
+                            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+                            f"FOR VALUES FROM ('{start.isoformat()} 00:00:00+00') TO ('{end.isoformat()} 00:00:00+00')"
+                        ))
+                        db.commit()
+                        created.append(name)
+                    except Exception as e:
+                        # Rows for the month already in the default partition block the new one
+                        db.rollback()
+                        self.stats["errors"] += 1
+                        logger.error(f"Failed to create partition {name}: {e}")
+            self.stats["created"] += len(created)
+            if created:
+                logger.info(f"Created history partitions: {', '.join(created)}")
+            return created
+        finally:
+            db.close()
+
+    def expire(self, today: Optional[date] = None) -> List[str]:
+        """Archive (optionally) and drop partitions past the retention window.
+
+        Returns:
+            Names of partitions dropped
+        """
+        today = today or datetime.utcnow().date()
+        db = self.session_factory()
+        try:
+            dropped = []
+            for name in expired_partitions(self.list_partitions(db), self.retention_days, today):
+                try:
+                    if self.archive_path is not None:
+                        self.archive_partition(db, name)
+                    db.execute(text(f"DROP TABLE IF EXISTS {name}"))
+                    db.commit()
+                    dropped.append(name)
+                except Exception as e:
+                    # A failed archive keeps the partition for the next run
+                    db.rollback()
+                    self.stats["errors"] += 1
+                    logger.error(f"Failed to expire partition {name}: {e}")
+
+            cutoff = datetime.combine(today - timedelta(days=self.retention_days), datetime.min.time())
+            for table, column in PARTITIONED_TABLES.items():
+                result = db.execute(
+                    text(f"DELETE FROM {table}_default WHERE {column} < :cutoff"),
+                    {"cutoff": cutoff}
+                )
+                self.stats["default_rows_deleted"] += result.rowcount
+            db.commit()
+
+            self.purge_tool_results(db, cutoff)
+
+            self.stats["dropped"] += len(dropped)
+            if dropped:
+                logger.info(f"Dropped expired history partitions: {', '.join(dropped)}")
+            return dropped
+        finally:
+            db.close()
+
+    def purge_tool_results(self, db, cutoff: datetime) -> int:
+        """Delete stored tool results no remaining tool call references.
+
+        Tool calls of the month containing the cutoff are kept until the whole
+        month expires, so age alone does not tell whether a result is still
+        needed. The age condition only skips results saved moments ago.
+        """
+        result = db.execute(
+            text(
+                "DELETE FROM tool_results WHERE last_used_at < :cutoff "
+                "AND NOT EXISTS (SELECT 1 FROM tool_calls WHERE tool_calls.result_hash = tool_results.hash)"
+            ),
+            {"cutoff": cutoff - TOUCH_INTERVAL}
+        )
+        db.commit()
+        self.stats["tool_results_deleted"] += result.rowcount
+        return result.rowcount
+
+    def archive_partition(self, db, name: str) -> Path:
+        """Write all rows of a partition to <archive_path>/<name>.jsonl.gz.
+
+        Rows are read through a server-side cursor so memory use does not
+        depend on the partition size; the file only appears once complete.
+        """
+        self.archive_path.mkdir(parents=True, exist_ok=True)
+        target = self.archive_path / f"{name}.jsonl.gz"
+        partial = target.with_suffix(".gz.partial")
+        result = db.connection().execution_options(stream_results=True, yield_per=1000).execute(
+            text(f"SELECT row_to_json(p)::text FROM {name} p")
+        )
+        with gzip.open(partial, "wt", encoding="utf-8") as archive:
+            for row in result:
+                archive.write(row[0] + "\n")
+        os.replace(partial, target)
+        self.stats["archived"] += 1
+        logger.info(f"Archived partition {name} to {target}")
+        return target
+
+    def run_once(self, today: Optional[date] = None):
+        """Create upcoming partitions and expire old ones."""
+        self.ensure_partitions(today)
+        self.expire(today)
+        self.last_run = datetime.utcnow()
+
+    async def start(self):
+        """Start the retention loop."""
+        if self.running:
+            return
+
+        # Every replica makes sure this month and the next can take rows before
+        # serving traffic; a row in a default partition would block creating
+        # that month's partition. Repeating the creation is harmless.
+        try:
+            await asyncio.to_thread(self.ensure_partitions)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Failed to create history partitions at startup: {e}")
+
+        self.running = True
+        self.task = asyncio.create_task(self._run_loop())
+        logger.info(
+            f"History retention started ({self.retention_days} days, "
+            f"archive: {self.archive_path or 'disabled'})"
+        )
+
+    async def stop(self):
+        """Stop the retention loop."""
+        self.running = False
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        logger.info("History retention stopped")
+
+    async def _run_loop(self):
+        """Main retention loop."""
+        while self.running:
+            # Partitions ahead and expiry are run by one replica, the polling leader
+            if alarm_state.is_leader:
+                try:
+                    await asyncio.to_thread(self.run_once)
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    logger.error(f"Error in history retention loop: {e}")
+
+            await asyncio.sleep(self.check_interval)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get retention statistics."""
+        return {
+            **self.stats,
+            "retention_days": self.retention_days,
+            "archive_enabled": self.archive_path is not None,
+            "last_run": self.last_run.isoformat() if self.last_run else None
+        }
+
+# Global history retention
+history_retention = HistoryRetention()
@@ -0,0 +1,98 @@
+"""Full-text search over investigation history."""
+from typing import Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import select, union, func, literal_column, or_, and_, literal
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Investigation, ChatMessage
+
+# Text search configuration of the chat_messages content index (see init.sql). Rendered
+# inline rather than bound so the planner can match the indexed expression.
+TS_CONFIG = literal_column("'english'::regconfig")
+
+# Generated column combining host name (weight A) and alarm description (weight B)
+_SEARCH_VECTOR = literal_column("investigations.search_vector", type_=TSVECTOR)
+
+# Snippets mark matches with markdown bold, as answers are rendered as markdown
+_HEADLINE_OPTIONS = 'StartSel=**, StopSel=**, MaxFragments=2, MaxWords=25, MinWords=8, FragmentDelimiter=" … "'
+
+# Message content weighs less than a match in the alarm itself
+_CONTENT_RANK_WEIGHT = 0.5
+
+class HistorySearch:
+    """Build search filters, ranking and snippets for one search string.
+
+    On PostgreSQL, alarms are matched through the search_vector column and
+    answers through the GIN index on chat_messages content, each in its own
+    index scan; a trigram index serves partial host names. Other databases
+    (tests) fall back to substring matching without ranking.
+    """
+
+    def __init__(self, text: str, dialect_name: str):
+        self.text = text
+        self.full_text = dialect_name == "postgresql"
+        self.tsquery = func.websearch_to_tsquery(TS_CONFIG, text)
+
+    @staticmethod
+    def _content_vector():
+        # Must match the indexed expression exactly for the index to be used
+        return func.to_tsvector(TS_CONFIG, ChatMessage.content)
+
+    def matching_ids(self):
+        """Select ids of investigations matching the search."""
+        pattern = f"%{self.text}%"
+        if not self.full_text:
+            return union(
+                select(Investigation.id).where(or_(
+                    Investigation.alarm_description.ilike(pattern),
+                    Investigation.host_name.ilike(pattern)
+                )),
+                select(ChatMessage.investigation_id).where(ChatMessage.content.ilike(pattern))
+            )
+        return union(
+            select(Investigation.id).where(_SEARCH_VECTOR.op("@@")(self.tsquery)),
+            select(Investigation.id).where(Investigation.host_name.ilike(pattern)),
+            select(ChatMessage.investigation_id).where(self._content_vector().op("@@")(self.tsquery))
+        )
+
+    def rank(self):
+        """Relevance of an investigation: alarm match plus best answer match."""
+        if not self.full_text:
+            return literal(0.0)
+        content_rank = select(func.max(func.ts_rank_cd(self._content_vector(), self.tsquery))).where(
+            and_(
+                ChatMessage.investigation_id == Investigation.id,
+                self._content_vector().op("@@")(self.tsquery)
+            )
+        ).scalar_subquery()
+        return func.ts_rank_cd(_SEARCH_VECTOR, self.tsquery) + \
+            func.coalesce(content_rank, 0.0) * _CONTENT_RANK_WEIGHT
+
+    async def snippets(self, db: AsyncSession, investigation_ids: List[UUID]) -> Dict[UUID, str]:
+        """Get highlighted fragment of the best matching message of each investigation.
+
+        Headlines re-parse the message text, so they are only built for the
+        page being returned.
+        """
+        if not self.full_text or not investigation_ids:
+            return {}
+        rank = func.ts_rank_cd(self._content_vector(), self.tsquery)
+        rows = await db.execute(
+            select(
+                ChatMessage.investigation_id,
+                func.ts_headline(TS_CONFIG, ChatMessage.content, self.tsquery, _HEADLINE_OPTIONS)
+            ).where(
+                ChatMessage.investigation_id.in_(investigation_ids),
+                self._content_vector().op("@@")(self.tsquery)
+            ).distinct(ChatMessage.investigation_id).order_by(ChatMessage.investigation_id, rank.desc())
+        )
+        return {investigation_id: snippet for investigation_id, snippet in rows}
+
+def history_search(text: Optional[str], db: AsyncSession) -> Optional[HistorySearch]:
+    """Get search helper for a search string, or None when not searching."""
+    text = (text or "").strip()
+    if not text:
+        return None
+    return HistorySearch(text, db.get_bind().dialect.name)
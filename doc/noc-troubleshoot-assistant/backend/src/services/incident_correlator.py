@@ -0,0 +1,282 @@
+"""Correlation of alarm storms into incidents."""
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Set, Tuple
+import logging
+import re
+import time
+
+from .analysis_cache import normalize_description
+from .alarm_record import alarm_to_dict
+
+logger = logging.getLogger(__name__)
+
+AlarmKey = Tuple[str, str]
+
+_WORD_PATTERN = re.compile(r'[a-z#][a-z0-9#_\-/\.]*')
+
+def alarm_signature(alarm: Dict[str, Any]) -> str:
+    """Get host-independent normalized description of an alarm.
+
+    Zabbix problem names usually start with the host name, which would stop
+    the same symptom on different hosts from comparing equal.
+    """
+    description = alarm.get('description') or ''
+    host = alarm.get('host') or ''
+    if host and description.lower().startswith(host.lower()):
+        description = description[len(host):].lstrip(' :-')
+    return normalize_description(description)
+
+def _start_timestamp(alarm: Dict[str, Any]) -> float:
+    if alarm.get('clock'):
+        return float(alarm['clock'])
+    started_at = alarm.get('started_at')
+    if started_at:
+        try:
+            return datetime.fromisoformat(started_at).timestamp()
+        except ValueError:
+            pass
+    return time.time()
+
+class Incident:
+    """Group of correlated alarms on one Zabbix instance."""
+
+    def __init__(self, incident_id: str, instance_id: str):
+        self.id = incident_id
+        self.instance_id = instance_id
+        self.alarm_keys: List[AlarmKey] = []
+        self.first_start = float('inf')
+        self.last_start = float('-inf')
+        self.signatures: Set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self.alarm_keys)
+
+    def add(self, key: AlarmKey, start: float, signature: str):
+        self.alarm_keys.append(key)
+        self.first_start = min(self.first_start, start)
+        self.last_start = max(self.last_start, start)
+        self.signatures.add(signature)
+
+class IncidentCorrelator:
+    """Incrementally group alarms into incidents.
+
+    Two alarms on the same instance are related when they started within
+    the time window of each other and share a host, a trigger dependency,
+    or a similar description. Alarms keep their incident across
+    polls; only new alarms are placed, by looking up candidate incidents in
+    host, trigger and word indexes rather than comparing against every
+    incident, so cost stays near-linear in the number of alarms.
+    """
+
+    def __init__(
+        self,
+        time_window_seconds: int = 300,
+        similarity_threshold: float = 0.6,
+        max_word_incidents: int = 50
+    ):
+        self.time_window_seconds = time_window_seconds
+        self.similarity_threshold = similarity_threshold
+        # Words shared by more incidents than this are too common to find candidates
+        self.max_word_incidents = max_word_incidents
+        self.incidents: Dict[str, Incident] = {}
+        self.alarm_incident: Dict[AlarmKey, str] = {}
+        self.alarms: Dict[AlarmKey, Dict[str, Any]] = {}
+        self._starts: Dict[AlarmKey, float] = {}
+
+    @staticmethod
+    def _link_keys(alarm: Dict[str, Any]) -> List[Tuple[str, str, str]]:
+        """Get index keys that relate an alarm to others regardless of description.
+
+        Host groups are not links: broad groups would merge unrelated alarms
+        into one incident and redirect their investigations to its root.
+        """
+        instance_id = alarm['instance_id']
+        host = (alarm.get('host') or '').lower()
+        keys = [(instance_id, "host", host)] if host and host != 'unknown' else []
+        if alarm.get('trigger_id'):
+            keys.append((instance_id, "trigger", alarm['trigger_id']))
+        keys.extend((instance_id, "trigger", trigger_id) for trigger_id in alarm.get('depends_on') or [])
+        return keys
+
+    @staticmethod
+    def _words(signature: str) -> Set[str]:
+        return set(_WORD_PATTERN.findall(signature))
+
+    def _similar(self, words: Set[str], incident: Incident) -> bool:
+        for signature in incident.signatures:
+            other = self._words(signature)
+            union = words | other
+            if union and len(words & other) / len(union) >= self.similarity_threshold:
+                return True
+        return False
+
+    def update(self, alarms: List[Dict[str, Any]]) -> Dict[str, Incident]:
+        """Correlate the current alarm list, annotating each alarm with its incident."""
+        current = {(alarm['instance_id'], alarm['id']): alarm for alarm in alarms}
+
+        # Drop cleared alarms from their incidents
+        for key in [key for key in self.alarm_incident if key not in current]:
+            incident = self.incidents.get(self.alarm_incident.pop(key))
+            self._starts.pop(key, None)
+            if incident is not None:
+                incident.alarm_keys.remove(key)
+                if not incident.alarm_keys:
+                    del self.incidents[incident.id]
+        self.alarms = current
+
+        # Rebuild candidate indexes from the surviving assignments
+        link_index: Dict[Tuple[str, str, str], Set[str]] = defaultdict(set)
+        word_index: Dict[Tuple[str, str], Set[str]] = defaultdict(set)
+        for incident in self.incidents.values():
+            incident.signatures = set()
+            incident.first_start, incident.last_start = float('inf'), float('-inf')
+            for key in incident.alarm_keys:
+                alarm = current[key]
+                signature = alarm_signature(alarm)
+                incident.signatures.add(signature)
+                incident.first_start = min(incident.first_start, self._starts[key])
+                incident.last_start = max(incident.last_start, self._starts[key])
+                for link in self._link_keys(alarm):
+                    link_index[link].add(incident.id)
+                for word in self._words(signature):
+                    word_index[(incident.instance_id, word)].add(incident.id)
+
+        # Incidents merged during this update point at the incident that absorbed them
+        merged: Dict[str, str] = {}
+
+        def resolve(incident_id: str) -> str:
+            while incident_id in merged:
+                incident_id = merged[incident_id]
+            return incident_id
+
+        new_keys = sorted(
+            (key for key in current if key not in self.alarm_incident),
+            key=lambda key: _start_timestamp(current[key])
+        )
+        for key in new_keys:
+            alarm = current[key]
+            instance_id = alarm['instance_id']
+            start = _start_timestamp(alarm)
+            signature = alarm_signature(alarm)
+            words = self._words(signature)
+            links = self._link_keys(alarm)
+
+            candidates: Set[str] = set()
+            for link in links:
+                candidates |= {resolve(i) for i in link_index.get(link, ())}
+            similar_candidates: Set[str] = set()
+            for word in words:
+                incident_ids = word_index.get((instance_id, word), ())
+                if len(incident_ids) <= self.max_word_incidents:
+                    similar_candidates |= {resolve(i) for i in incident_ids}
+            similar_candidates -= candidates
+
+            matches = [
+                incident_id for incident_id in candidates
+                if self._in_window(self.incidents[incident_id], start)
+            ] + [
+                incident_id for incident_id in similar_candidates
+                if self._in_window(self.incidents[incident_id], start)
+                and self._similar(words, self.incidents[incident_id])
+            ]
+
+            if matches:
+                incident = self._merge(matches, merged)
+            else:
+                incident = Incident(f"inc-{instance_id}-{alarm['id']}", instance_id)
+                self.incidents[incident.id] = incident
+
+            incident.add(key, start, signature)
+            self.alarm_incident[key] = incident.id
+            self._starts[key] = start
+            for link in links:
+                link_index[link].add(incident.id)
+            for word in words:
+                word_index[(instance_id, word)].add(incident.id)
+
+        for incident in self.incidents.values():
+            for key in incident.alarm_keys:
+                current[key]['incident_id'] = incident.id
+                current[key]['incident_size'] = len(incident)
+
+        grouped = sum(1 for incident in self.incidents.values() if len(incident) > 1)
+        logger.info(f"Correlated {len(current)} alarms into {len(self.incidents)} incidents ({grouped} multi-alarm)")
+        return self.incidents
+
+    def _in_window(self, incident: Incident, start: float) -> bool:
+        window = self.time_window_seconds
+        return incident.first_start - window <= start <= incident.last_start + window
+
+    def _merge(self, incident_ids: List[str], merged: Dict[str, str]) -> Incident:
+        """Merge matching incidents into the earliest one."""
+        incidents = sorted((self.incidents[i] for i in set(incident_ids)), key=lambda inc: inc.first_start)
+        target = incidents[0]
+        for other in incidents[1:]:
+            for key in other.alarm_keys:
+                target.add(key, self._starts[key], alarm_signature(self.alarms[key]))
+                self.alarm_incident[key] = target.id
+            del self.incidents[other.id]
+            merged[other.id] = target.id
+        return target
+
+    def root_alarm(self, incident: Incident) -> Dict[str, Any]:
+        """Get the alarm most likely to be the cause of an incident.
+
+        An alarm other members depend on wins; otherwise the earliest, then
+        most severe, alarm.
+        """
+        alarms = [self.alarms[key] for key in incident.alarm_keys]
+        upstream = {trigger_id for alarm in alarms for trigger_id in alarm.get('depends_on') or []}
+        return min(
+            alarms,
+            key=lambda alarm: (
+                alarm.get('trigger_id') not in upstream if upstream else True,
+                self._starts[(alarm['instance_id'], alarm['id'])],
+                -alarm.get('severity_code', 0)
+            )
+        )
+
+    def get_incident_for_alarm(self, alarm_id: str, instance_id: str) -> Optional[Incident]:
+        """Get incident an alarm belongs to."""
+        incident_id = self.alarm_incident.get((instance_id, alarm_id))
+        return self.incidents.get(incident_id) if incident_id else None
+
+    def to_dict(self, incident: Incident, include_alarms: bool = False) -> Dict[str, Any]:
+        """Serialize incident for the API."""
+        alarms = [self.alarms[key] for key in incident.alarm_keys]
+        root = self.root_alarm(incident)
+        data = {
+            "id": incident.id,
+            "instance_id": incident.instance_id,
+            "title": root['description'],
+            "root_alarm_id": root['id'],
+            "root_host": root['host'],
+            "severity": max(alarms, key=lambda a: a.get('severity_code', 0))['severity'],
+            "severity_code": max(a.get('severity_code', 0) for a in alarms),
+            "alarm_count": len(alarms),
+            "hosts": sorted({a['host'] for a in alarms}),
+            "started_at": datetime.fromtimestamp(incident.first_start).isoformat()
+        }
+        if include_alarms:
+            data["alarms"] = [alarm_to_dict(a) for a in alarms]
+        return data
+
+    def get_incidents(self, min_alarms: int = 2) -> List[Dict[str, Any]]:
+        """Get incidents with at least min_alarms alarms, most severe and largest first."""
+        incidents = [
+            self.to_dict(incident) for incident in self.incidents.values()
+            if len(incident) >= min_alarms
+        ]
+        return sorted(incidents, key=lambda i: (-i['severity_code'], -i['alarm_count'], i['started_at']))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get correlation statistics."""
+        return {
+            "alarms": len(self.alarm_incident),
+            "incidents": len(self.incidents),
+            "multi_alarm_incidents": sum(1 for incident in self.incidents.values() if len(incident) > 1)
+        }
+
+# Global incident correlator
+incident_correlator = IncidentCorrelator()
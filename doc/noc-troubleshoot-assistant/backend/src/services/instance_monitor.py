@@ -1,7 +1,7 @@
 """Instance monitoring service."""
 import asyncio
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import logging
 
 logger = logging.getLogger(__name__)
@@ -9,10 +9,13 @@ logger = logging.getLogger(__name__)
 class InstanceMonitor:
     """Monitor Zabbix instance connectivity and generate synthetic alarms."""
     
-    def __init__(self, mcp_client, alarm_aggregator, check_interval: int = 30):
+    def __init__(self, mcp_client, alarm_aggregator, check_interval: int = 30, min_interval: Optional[int] = None):
         self.mcp_client = mcp_client
         self.alarm_aggregator = alarm_aggregator
         self.check_interval = check_interval
+        # Checked at this faster interval while an instance is down or just changed state
+        self.min_interval = min(min_interval or check_interval, check_interval)
+        self.unsettled = False
         self.instance_status: Dict[str, Dict[str, Any]] = {}
         self.running = False
         self.task = None
@@ -45,12 +48,13 @@ class InstanceMonitor:
             except Exception as e:
                 logger.error(f"Error in monitor loop: {e}")
             
-            await asyncio.sleep(self.check_interval)
+            await asyncio.sleep(self.min_interval if self.unsettled else self.check_interval)
     
     async def check_all_instances(self):
         """Check all instances and generate/clear synthetic alarms."""
         try:
             instances = await self.mcp_client.get_instances()
+            unsettled = False
             
             for instance in instances:
                 instance_id = instance['id']
@@ -73,6 +77,9 @@ class InstanceMonitor:
                     'status': current_status,
                     'checked_at': datetime.utcnow()
                 }
+                unsettled = unsettled or current_status != 'connected' or current_status != previous_status
+            
+            self.unsettled = unsettled
         
         except Exception as e:
             logger.error(f"Failed to check instances: {e}")
@@ -109,7 +116,7 @@ class InstanceMonitor:
         """Get monitor status."""
         return {
             "running": self.running,
-            "check_interval": self.check_interval,
+            "check_interval": self.min_interval if self.unsettled else self.check_interval,
             "instances_monitored": len(self.instance_status),
             "last_check": max(
                 (s['checked_at'] for s in self.instance_status.values()),
@@ -0,0 +1,217 @@
+"""Background execution of AI investigations."""
+from typing import Dict, Any
+from uuid import UUID
+from datetime import datetime
+import asyncio
+import logging
+import time
+
+from models import async_session
+from config import config
+from .bedrock_agent import get_agent
+from .investigation_service import InvestigationService
+from .investigation_stream import InvestigationStream, ResponseBuffer
+from .analysis_cache import analysis_cache, alarm_fingerprint
+from .case_index import case_index
+from .runbook_index import runbook_index
+from .incident_correlator import incident_correlator
+from .alarm_aggregator import alarm_aggregator
+from .model_router import model_router, STRONG
+from .investigation_scheduler import investigation_scheduler, SchedulerBusy
+from .tool_call_recorder import tool_call_recorder
+from .alarm_state import alarm_state
+
+logger = logging.getLogger(__name__)
+
+# Run claims are renewed every third of this while the model runs
+RUN_CLAIM_SECONDS = 60
+
+def new_response_buffer() -> ResponseBuffer:
+    """Create response buffer with configured checkpoint bounds."""
+    return ResponseBuffer(
+        checkpoint_chars=config.stream_checkpoint_chars,
+        checkpoint_seconds=config.stream_checkpoint_seconds
+    )
+
+async def claim_run(investigation_id: UUID) -> bool:
+    """Claim an investigation's run for this replica, or renew the claim.
+
+    Returns False while another replica holds an unexpired claim or the
+    investigation is no longer in progress.
+    """
+    async with async_session() as db:
+        return await InvestigationService(db).claim_run(investigation_id, alarm_state.holder, RUN_CLAIM_SECONDS)
+
+async def _keep_claim(investigation_id: UUID):
+    """Renew the run claim until cancelled."""
+    while True:
+        await asyncio.sleep(RUN_CLAIM_SECONDS / 3)
+        try:
+            if not await claim_run(investigation_id):
+                logger.warning(f"Lost run claim of investigation {investigation_id}")
+        except Exception as e:
+            logger.error(f"Failed to renew run claim of investigation {investigation_id}: {e}")
+
+async def build_context(alarm: Dict[str, Any], mcp_client) -> Dict[str, Any]:
+    """Build investigation context from Zabbix data."""
+    context = {"alarm": alarm}
+    live_alarm = alarm_aggregator.get_alarm_by_id(alarm['id'], alarm['instance_id'])
+
+    # Hosts resolved by the poller allow an exact lookup instead of a name search
+    hostids = alarm.get('hostids') or (live_alarm.get('hostids') if live_alarm else None)
+    if hostids:
+        context['hostids'] = list(hostids)
+
+    try:
+        # Get host information
+        if hostids:
+            host_result = await mcp_client.get_hosts(
+                alarm['instance_id'],
+                hostids=list(hostids),
+                output="extend"
+            )
+        else:
+            host_result = await mcp_client.get_hosts(
+                alarm['instance_id'],
+                search={"name": alarm['host']},
+                output="extend"
+            )
+
+        if host_result.get('success') and host_result.get('data'):
+            context['host_data'] = host_result['data'][0] if host_result['data'] else None
+
+    except Exception as e:
+        logger.error(f"Failed to build context: {e}")
+
+    # Planned maintenance often explains the alarm
+    if live_alarm and live_alarm.get('maintenance'):
+        context['maintenance'] = live_alarm['maintenance']
+
+    # Alarms correlated with this one describe the blast radius of the incident
+    incident = incident_correlator.get_incident_for_alarm(alarm['id'], alarm['instance_id'])
+    if incident is not None and len(incident) > 1:
+        context['related_alarms'] = [
+            a for a in incident_correlator.to_dict(incident, include_alarms=True)['alarms']
+            if a['id'] != alarm['id']
+        ]
+
+    # Prefetch the matching runbook so the model follows documented procedures
+    try:
+        context['runbook'] = runbook_index.match_alarm(alarm)
+    except Exception as e:
+        logger.error(f"Failed to match runbook: {e}")
+
+    # Similar solved cases give the model a head start on the root cause
+    try:
+        context['similar_cases'] = case_index.search(alarm)
+    except Exception as e:
+        logger.error(f"Failed to retrieve similar cases: {e}")
+
+    return context
+
+async def run_investigation(stream: InvestigationStream, alarm: Dict[str, Any], mcp_client):
+    """Run the agent for an investigation, checkpointing output to the database.
+
+    The run is decoupled from any HTTP connection: clients subscribe to the
+    stream and can reattach after a disconnect without restarting the model.
+    """
+    investigation_id: UUID = stream.investigation_id
+    buffer = stream.buffer
+    db = async_session()
+    renewal = asyncio.create_task(_keep_claim(investigation_id))
+    try:
+        inv_service = InvestigationService(db)
+
+        # Reuse a partial answer left by an interrupted run, otherwise start a new one
+        message = await inv_service.get_last_message(investigation_id, "assistant")
+        if message is None:
+            message = await inv_service.add_message(investigation_id, "assistant", "")
+        stream.message_id = message.id
+
+        investigation = await inv_service.get_investigation(investigation_id)
+        origin = investigation.origin if investigation else "operator"
+        refresh = bool(investigation and investigation.refresh_requested)
+        # End the read transaction so queued runs do not hold pool connections
+        await db.commit()
+
+        # Wait for a run slot so alarm storms do not overload Bedrock and Zabbix
+        async with investigation_scheduler.slot(alarm, stream, origin):
+            context = await build_context(alarm, mcp_client)
+            agent = get_agent(config.mcp_server_url)
+
+            # Route routine alarms to the fast model and escalations to the strong one
+            prior_failures = await inv_service.count_recent_failures(
+                alarm_fingerprint(alarm), model_router.failure_lookback_hours
+            )
+            decision = model_router.select(alarm, context, refresh=refresh, prior_failures=prior_failures)
+
+            metrics: Dict[str, Any] = decision.to_dict()
+            started = time.monotonic()
+            logger.info(f"Running investigation {investigation_id} on {decision.tier} model ({decision.reason})")
+            try:
+                await _stream_answer(stream, agent, alarm, context, metrics, decision.tier, inv_service, started)
+            except Exception as e:
+                # A fast model failing before producing output is retried once on the strong model
+                if decision.tier == STRONG or len(buffer) > 0:
+                    raise
+                logger.warning(f"Fast model failed for investigation {investigation_id}, escalating: {e}")
+                metrics.update(model_tier=STRONG, routing_reason=f"escalated after fast model error: {e}")
+                await _stream_answer(stream, agent, alarm, context, metrics, STRONG, inv_service, started)
+            metrics['latency_ms'] = int((time.monotonic() - started) * 1000)
+
+            await inv_service.update_message_content(stream.message_id, buffer.text())
+            buffer.mark_checkpoint()
+            await inv_service.save_metrics(investigation_id, metrics)
+            await inv_service.complete_investigation(investigation_id)
+            analysis_cache.store(alarm, investigation_id, buffer.text())
+            case_index.add_case(
+                investigation_id,
+                alarm['description'],
+                alarm['host'],
+                alarm['instance_id'],
+                buffer.text(),
+                datetime.utcnow()
+            )
+            stream.complete()
+
+    except SchedulerBusy as e:
+        # End the row too, otherwise new clicks would be shared onto a run that never starts.
+        # Cancelled rather than failed: load shedding must not escalate later runs to the strong model
+        logger.warning(f"Investigation {investigation_id} rejected: {e}")
+        try:
+            await db.rollback()
+            await InvestigationService(db).cancel_investigation(investigation_id)
+        except Exception as persist_error:
+            logger.error(f"Failed to mark rejected investigation {investigation_id}: {persist_error}")
+        stream.fail(str(e))
+
+    except Exception as e:
+        import traceback
+        logger.error(f"Investigation {investigation_id} failed: {e}\n{traceback.format_exc()}")
+        try:
+            await db.rollback()
+            if stream.message_id is not None:
+                await InvestigationService(db).update_message_content(stream.message_id, buffer.text())
+                buffer.mark_checkpoint()
+            await InvestigationService(db).fail_investigation(investigation_id)
+        except Exception as persist_error:
+            logger.error(f"Failed to persist partial investigation {investigation_id}: {persist_error}")
+        stream.fail(str(e))
+
+    finally:
+        renewal.cancel()
+        # Write the run's tool calls now rather than on the next timer tick
+        await tool_call_recorder.flush()
+        await db.close()
+
+async def _stream_answer(stream, agent, alarm, context, metrics, tier, inv_service, started):
+    """Stream the agent answer into the buffer, checkpointing to the database."""
+    buffer = stream.buffer
+    with tool_call_recorder.investigation(stream.investigation_id):
+        async for chunk in agent.stream_investigate(alarm, context, metrics, tier=tier):
+            if 'first_token_ms' not in metrics:
+                metrics['first_token_ms'] = int((time.monotonic() - started) * 1000)
+            stream.append(chunk)
+            if buffer.needs_checkpoint():
+                await inv_service.update_message_content(stream.message_id, buffer.text())
+                buffer.mark_checkpoint()
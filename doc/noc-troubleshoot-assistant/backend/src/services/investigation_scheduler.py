@@ -0,0 +1,146 @@
+"""Bounded scheduling of model investigations."""
+import asyncio
+from contextlib import asynccontextmanager
+from itertools import count
+from typing import Dict, Any, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+class SchedulerBusy(Exception):
+    """Raised when the investigation queue is full."""
+
+class _Ticket:
+    """Investigation waiting for a run slot."""
+
+    __slots__ = ("priority", "instance_id", "stream", "granted")
+
+    def __init__(self, priority: tuple, instance_id: str, stream):
+        self.priority = priority
+        self.instance_id = instance_id
+        self.stream = stream
+        self.granted = asyncio.get_running_loop().create_future()
+
+class InvestigationScheduler:
+    """Limit concurrent model runs globally and per Zabbix instance.
+
+    Runs above the limits wait in a queue ordered by alarm severity, with
+    operator requests ahead of background pre-investigations and FIFO within
+    the same priority. A ticket blocked by its instance cap does not hold up
+    tickets for other instances. Waiting streams are told their queue
+    position so clients can show progress instead of timing out.
+    """
+
+    def __init__(self, max_concurrent: int = 4, max_per_instance: int = 2, max_queue: int = 50):
+        self.max_concurrent = max_concurrent
+        self.max_per_instance = max_per_instance
+        self.max_queue = max_queue
+        self.running: Dict[str, int] = {}
+        self.waiting: List[_Ticket] = []
+        self._sequence = count()
+        self.stats = {"started": 0, "queued": 0, "rejected": 0}
+
+    @property
+    def running_total(self) -> int:
+        return sum(self.running.values())
+
+    def has_capacity(self) -> bool:
+        """Check whether a new investigation can be accepted (run or queue)."""
+        return len(self.waiting) < self.max_queue
+
+    def retry_after(self) -> int:
+        """Estimate seconds until queue space frees up."""
+        return 30 * max(1, len(self.waiting) // max(self.max_concurrent, 1))
+
+    def _can_run(self, instance_id: str) -> bool:
+        return (
+            self.running_total < self.max_concurrent
+            and self.running.get(instance_id, 0) < self.max_per_instance
+        )
+
+    def _grant(self, instance_id: str):
+        self.running[instance_id] = self.running.get(instance_id, 0) + 1
+        self.stats["started"] += 1
+
+    def _dispatch(self):
+        """Grant free slots to waiting tickets in priority order."""
+        for ticket in list(self.waiting):
+            if self.running_total >= self.max_concurrent:
+                break
+            if ticket.granted.done() or not self._can_run(ticket.instance_id):
+                continue
+            self.waiting.remove(ticket)
+            self._grant(ticket.instance_id)
+            ticket.granted.set_result(True)
+        self._update_positions()
+
+    def _update_positions(self):
+        for position, ticket in enumerate(self.waiting, start=1):
+            if ticket.stream is not None:
+                ticket.stream.set_queue_position(position)
+
+    def _release(self, instance_id: str):
+        self.running[instance_id] -= 1
+        if not self.running[instance_id]:
+            del self.running[instance_id]
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, alarm: Dict[str, Any], stream=None, origin: str = "operator"):
+        """Hold a run slot for the duration of an investigation.
+
+        Raises:
+            SchedulerBusy: If the run cannot start now and the queue is full
+        """
+        instance_id = alarm.get('instance_id', '')
+        if not self.waiting and self._can_run(instance_id):
+            self._grant(instance_id)
+        else:
+            if not self.has_capacity():
+                self.stats["rejected"] += 1
+                raise SchedulerBusy(f"Investigation queue is full ({len(self.waiting)} waiting)")
+
+            priority = (-alarm.get('severity_code', 0), origin != "operator", next(self._sequence))
+            ticket = _Ticket(priority, instance_id, stream)
+            self.waiting.append(ticket)
+            self.waiting.sort(key=lambda t: t.priority)
+            self.stats["queued"] += 1
+            self._dispatch()
+            try:
+                await ticket.granted
+            except asyncio.CancelledError:
+                if ticket in self.waiting:
+                    self.waiting.remove(ticket)
+                    self._update_positions()
+                else:
+                    self._release(instance_id)
+                raise
+
+        if stream is not None:
+            stream.set_queue_position(None)
+        try:
+            yield
+        finally:
+            self._release(instance_id)
+
+    def queue_position(self, stream) -> Optional[int]:
+        """Get 1-based queue position of a waiting stream."""
+        for position, ticket in enumerate(self.waiting, start=1):
+            if ticket.stream is stream:
+                return position
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get scheduler statistics."""
+        return {
+            **self.stats,
+            "running": self.running_total,
+            "running_by_instance": dict(self.running),
+            "waiting": len(self.waiting),
+            "max_concurrent": self.max_concurrent,
+            "max_per_instance": self.max_per_instance,
+            "max_queue": self.max_queue
+        }
+
+# Global investigation scheduler
+investigation_scheduler = InvestigationScheduler()
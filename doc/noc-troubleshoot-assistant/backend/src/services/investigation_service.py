@@ -1,48 +1,88 @@
 """Investigation management service."""
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update, insert, func, or_
+from sqlalchemy.ext.asyncio import AsyncSession
 from models import Investigation, ChatMessage, ToolCall
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+from datetime import datetime, timedelta
 from uuid import UUID
 import logging
 
+from .analysis_cache import alarm_fingerprint, CachedAnalysis
+from .tool_results import tool_result_store
+
 logger = logging.getLogger(__name__)
 
 class InvestigationService:
     """Manage investigation sessions."""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
     
-    def create_investigation(self, alarm: Dict[str, Any]) -> str:
-        """Create new investigation from alarm. Returns investigation ID as string."""
-        investigation = Investigation(
-            alarm_id=alarm['id'],
-            alarm_description=alarm['description'],
-            alarm_severity=alarm['severity'],
-            host_name=alarm['host'],
-            instance_id=alarm['instance_id']
-        )
-        self.db.add(investigation)
-        self.db.flush()
-        
-        # Get ID as string immediately
-        inv_id_str = str(investigation.id)
-        
-        # Expunge to completely detach from session
-        self.db.expunge(investigation)
+    async def create_investigation(
+        self,
+        alarm: Dict[str, Any],
+        refresh: bool = False,
+        origin: str = "operator",
+        system_message: Optional[str] = None
+    ) -> str:
+        """Create new investigation from alarm. Returns investigation ID as string.
         
-        # Commit
-        self.db.commit()
-        
-        # Don't log the investigation object, only the ID string
-        logger.info(f"Created investigation {inv_id_str}")
-        
-        # Delete the investigation variable to ensure no references remain
-        del investigation
+        A refresh (the operator rejected a cached analysis) is recorded so the
+        run can be routed to the stronger model. Origin is 'auto' for
+        background pre-investigations. The initial system message, if any, is
+        written in the same transaction.
+        """
+        messages = [("system", system_message)] if system_message is not None else []
+        inv_id = await self._insert_investigation(
+            alarm,
+            messages,
+            refresh_requested=refresh,
+            origin=origin
+        )
+        logger.info(f"Created investigation {inv_id}")
+        return str(inv_id)
+    
+    async def create_from_cache(self, alarm: Dict[str, Any], cached: CachedAnalysis) -> str:
+        """Create completed investigation that reuses a cached analysis. Returns ID as string."""
+        inv_id = await self._insert_investigation(
+            alarm,
+            [
+                ("system", f"Reusing analysis from investigation {cached.investigation_id} for: {alarm['description']}"),
+                ("assistant", cached.content)
+            ],
+            status='completed',
+            # Keep the source's completion time so reuse does not extend its freshness
+            ended_at=cached.completed_at
+        )
+        logger.info(f"Created investigation {inv_id} from cached analysis {cached.investigation_id}")
+        return str(inv_id)
+    
+    async def _insert_investigation(self, alarm: Dict[str, Any], messages: List[tuple], **values) -> UUID:
+        """Insert an investigation and its first messages in one transaction.
         
-        return inv_id_str
+        Plain INSERT ... RETURNING statements, so no ORM object has to be
+        flushed and detached to read the new ID.
+        """
+        inv_id = await self.db.scalar(
+            insert(Investigation).values(
+                alarm_id=alarm['id'],
+                alarm_description=alarm['description'],
+                alarm_severity=alarm['severity'],
+                host_name=alarm['host'],
+                instance_id=alarm['instance_id'],
+                alarm_fingerprint=alarm_fingerprint(alarm),
+                **values
+            ).returning(Investigation.id)
+        )
+        if messages:
+            await self.db.execute(insert(ChatMessage), [
+                {"investigation_id": inv_id, "role": role, "content": content}
+                for role, content in messages
+            ])
+        await self.db.commit()
+        return inv_id
     
-    def add_message(self, investigation_id: UUID, role: str, content: str) -> ChatMessage:
+    async def add_message(self, investigation_id: UUID, role: str, content: str) -> ChatMessage:
         """Add message to investigation."""
         message = ChatMessage(
             investigation_id=investigation_id,
@@ -50,10 +90,17 @@ class InvestigationService:
             content=content
         )
         self.db.add(message)
-        self.db.commit()
+        await self.db.commit()
         return message
     
-    def add_tool_call(
+    async def update_message_content(self, message_id: UUID, content: str):
+        """Overwrite message content (used to checkpoint streamed answers)."""
+        await self.db.execute(
+            update(ChatMessage).where(ChatMessage.id == message_id).values(content=content)
+        )
+        await self.db.commit()
+    
+    async def add_tool_call(
         self, 
         investigation_id: UUID, 
         tool_name: str, 
@@ -61,34 +108,142 @@ class InvestigationService:
         result: Dict[str, Any],
         duration_ms: int
     ) -> ToolCall:
-        """Log tool call to investigation."""
+        """Log tool call to investigation (result stored deduplicated in tool_results)."""
+        result_hash, result_summary = await tool_result_store.save(self.db, result)
         tool_call = ToolCall(
             investigation_id=investigation_id,
             tool_name=tool_name,
             parameters=parameters,
-            result=result,
+            result_hash=result_hash,
+            result_summary=result_summary,
             duration_ms=duration_ms
         )
         self.db.add(tool_call)
-        self.db.commit()
+        await self.db.commit()
         return tool_call
     
-    def get_investigation(self, investigation_id: UUID) -> Optional[Investigation]:
+    async def add_tool_calls(self, records: List[Dict[str, Any]]) -> int:
+        """Log a batch of tool calls in one transaction.
+        
+        Args:
+            records: Dicts with investigation_id, tool_name, parameters,
+                result, duration_ms and timestamp
+        
+        Returns:
+            Number of tool calls written
+        """
+        if not records:
+            return 0
+        stored = await tool_result_store.save_many(self.db, [r['result'] for r in records])
+        await self.db.execute(insert(ToolCall), [
+            {
+                "investigation_id": r['investigation_id'],
+                "tool_name": r['tool_name'],
+                "parameters": r['parameters'],
+                "result_hash": result_hash,
+                "result_summary": result_summary,
+                "duration_ms": r['duration_ms'],
+                "timestamp": r['timestamp']
+            }
+            for r, (result_hash, result_summary) in zip(records, stored)
+        ])
+        await self.db.commit()
+        return len(records)
+    
+    async def get_investigation(self, investigation_id: UUID) -> Optional[Investigation]:
         """Get investigation by ID."""
-        return self.db.query(Investigation).filter_by(id=investigation_id).first()
+        return await self.db.get(Investigation, investigation_id)
+    
+    async def find_investigation_for_alarm(self, alarm: Dict[str, Any], origin: Optional[str] = None) -> Optional[Investigation]:
+        """Get latest running or completed investigation of an alarm event."""
+        query = select(Investigation).where(
+            Investigation.instance_id == alarm['instance_id'],
+            Investigation.alarm_id == alarm['id'],
+            Investigation.status.in_(('in_progress', 'completed'))
+        )
+        if origin is not None:
+            query = query.where(Investigation.origin == origin)
+        return await self._first(query.order_by(Investigation.started_at.desc()))
+    
+    async def find_running_investigation(self, alarm: Dict[str, Any], max_age_minutes: int = 60) -> Optional[Investigation]:
+        """Get a recent in-progress investigation of the same alarm, to share instead of duplicating."""
+        return await self._first(select(Investigation).where(
+            Investigation.alarm_fingerprint == alarm_fingerprint(alarm),
+            Investigation.status == 'in_progress',
+            Investigation.started_at >= datetime.utcnow() - timedelta(minutes=max_age_minutes)
+        ).order_by(Investigation.started_at.desc()))
     
-    def get_messages(self, investigation_id: UUID) -> list:
+    async def get_messages(self, investigation_id: UUID) -> list:
         """Get all messages for investigation."""
-        return self.db.query(ChatMessage).filter_by(
-            investigation_id=investigation_id
-        ).order_by(ChatMessage.timestamp).all()
+        result = await self.db.scalars(select(ChatMessage).where(
+            ChatMessage.investigation_id == investigation_id
+        ).order_by(ChatMessage.timestamp))
+        return list(result)
     
-    def complete_investigation(self, investigation_id: UUID):
+    async def get_last_message(self, investigation_id: UUID, role: str) -> Optional[ChatMessage]:
+        """Get most recent message with given role."""
+        return await self._first(select(ChatMessage).where(
+            ChatMessage.investigation_id == investigation_id,
+            ChatMessage.role == role
+        ).order_by(ChatMessage.timestamp.desc()))
+    
+    async def count_recent_failures(self, fingerprint: str, hours: int = 24) -> int:
+        """Count failed investigations of the same alarm within the last hours."""
+        return await self.db.scalar(select(func.count()).select_from(Investigation).where(
+            Investigation.alarm_fingerprint == fingerprint,
+            Investigation.status == 'failed',
+            Investigation.started_at >= datetime.utcnow() - timedelta(hours=hours)
+        ))
+    
+    async def save_metrics(self, investigation_id: UUID, metrics: Dict[str, Any]):
+        """Store model usage metrics for investigation."""
+        await self._update(investigation_id, metrics=metrics)
+    
+    async def claim_run(self, investigation_id: UUID, holder: str, lease_seconds: int) -> bool:
+        """Claim or renew the right to run an in-progress investigation.
+        
+        Streams live in the process running the model, so replicas claim the
+        run here first; a claim that is not renewed lapses and can be taken over.
+        """
+        now = datetime.utcnow()
+        result = await self.db.execute(
+            update(Investigation).where(
+                Investigation.id == investigation_id,
+                Investigation.status == 'in_progress',
+                or_(
+                    Investigation.run_holder.is_(None),
+                    Investigation.run_holder == holder,
+                    Investigation.run_expires_at < now
+                )
+            ).values(run_holder=holder, run_expires_at=now + timedelta(seconds=lease_seconds))
+        )
+        await self.db.commit()
+        return result.rowcount > 0
+    
+    async def complete_investigation(self, investigation_id: UUID):
         """Mark investigation as completed."""
-        investigation = self.get_investigation(investigation_id)
-        if investigation:
-            investigation.status = 'completed'
-            from datetime import datetime
-            investigation.ended_at = datetime.utcnow()
-            self.db.commit()
+        if await self._update(investigation_id, status='completed', ended_at=datetime.utcnow()):
             logger.info(f"Investigation {investigation_id} completed")
+    
+    async def fail_investigation(self, investigation_id: UUID):
+        """Mark investigation as failed."""
+        if await self._update(investigation_id, status='failed', ended_at=datetime.utcnow()):
+            logger.info(f"Investigation {investigation_id} failed")
+    
+    async def cancel_investigation(self, investigation_id: UUID):
+        """Mark investigation as cancelled (never run, so not counted as a failure)."""
+        if await self._update(investigation_id, status='cancelled', ended_at=datetime.utcnow()):
+            logger.info(f"Investigation {investigation_id} cancelled")
+    
+    async def _first(self, query):
+        """Get first ORM object of a select, or None."""
+        result = await self.db.scalars(query.limit(1))
+        return result.first()
+    
+    async def _update(self, investigation_id: UUID, **values) -> bool:
+        """Update columns of one investigation and commit. Returns whether it exists."""
+        result = await self.db.execute(
+            update(Investigation).where(Investigation.id == investigation_id).values(**values)
+        )
+        await self.db.commit()
+        return result.rowcount > 0
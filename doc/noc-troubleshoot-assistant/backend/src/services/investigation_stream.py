@@ -0,0 +1,183 @@
+"""In-flight investigation streams with incremental persistence."""
+import asyncio
+import bisect
+import time
+from datetime import datetime
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from uuid import UUID
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ResponseBuffer:
+    """List-backed text builder that tracks checkpoint progress."""
+
+    def __init__(self, checkpoint_chars: int = 1024, checkpoint_seconds: float = 2.0):
+        self.checkpoint_chars = checkpoint_chars
+        self.checkpoint_seconds = checkpoint_seconds
+        self._chunks: List[str] = []
+        self._offsets: List[int] = []
+        self._length = 0
+        self.persisted_offset = 0
+        self._last_checkpoint = time.monotonic()
+
+    def __len__(self) -> int:
+        return self._length
+
+    def append(self, chunk: str):
+        """Append a chunk without copying previous content."""
+        if not chunk:
+            return
+        self._offsets.append(self._length)
+        self._chunks.append(chunk)
+        self._length += len(chunk)
+
+    def text(self) -> str:
+        """Get full buffered text."""
+        return ''.join(self._chunks)
+
+    def text_from(self, offset: int) -> str:
+        """Get buffered text starting at a character offset."""
+        if offset <= 0:
+            return self.text()
+        if offset >= self._length:
+            return ''
+
+        # Locate the chunk containing the offset, then join only the tail
+        index = bisect.bisect_right(self._offsets, offset) - 1
+        head = self._chunks[index][offset - self._offsets[index]:]
+        return head + ''.join(self._chunks[index + 1:])
+
+    def needs_checkpoint(self) -> bool:
+        """Check whether unpersisted content should be written out."""
+        pending = self._length - self.persisted_offset
+        if pending <= 0:
+            return False
+        if pending >= self.checkpoint_chars:
+            return True
+        return time.monotonic() - self._last_checkpoint >= self.checkpoint_seconds
+
+    def mark_checkpoint(self):
+        """Record that all buffered content has been persisted."""
+        self.persisted_offset = self._length
+        self._last_checkpoint = time.monotonic()
+
+class InvestigationStream:
+    """Live output of a single investigation run, shared by all subscribers."""
+
+    def __init__(self, investigation_id: UUID, buffer: ResponseBuffer):
+        self.investigation_id = investigation_id
+        self.buffer = buffer
+        self.status = "running"
+        self.error: Optional[str] = None
+        self.message_id: Optional[UUID] = None
+        self.finished_at: Optional[datetime] = None
+        self.task: Optional[asyncio.Task] = None
+        self.queue_position: Optional[int] = None
+        self._updated = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status != "running"
+
+    def _notify(self):
+        """Wake up subscribers waiting for new content."""
+        updated, self._updated = self._updated, asyncio.Event()
+        updated.set()
+
+    def append(self, chunk: str):
+        """Append model output."""
+        self.buffer.append(chunk)
+        self._notify()
+
+    def set_queue_position(self, position: Optional[int]):
+        """Update position while waiting for a run slot (None once running)."""
+        if position != self.queue_position:
+            self.queue_position = position
+            self._notify()
+
+    def complete(self):
+        """Mark run as successfully finished."""
+        self.status = "completed"
+        self.finished_at = datetime.utcnow()
+        self._notify()
+
+    def fail(self, error: str):
+        """Mark run as failed."""
+        self.status = "failed"
+        self.error = error
+        self.finished_at = datetime.utcnow()
+        self._notify()
+
+    async def follow_queue(self) -> AsyncIterator[int]:
+        """Yield queue positions until the run leaves the queue."""
+        last = None
+        while self.queue_position is not None and not self.finished:
+            updated = self._updated
+            if self.queue_position != last:
+                last = self.queue_position
+                yield last
+                continue
+            await updated.wait()
+
+    async def follow(self, offset: int = 0) -> AsyncIterator[Tuple[int, str]]:
+        """Yield (end_offset, text) pieces from offset until the run finishes."""
+        while True:
+            updated = self._updated
+            if offset < len(self.buffer):
+                text = self.buffer.text_from(offset)
+                offset += len(text)
+                yield offset, text
+                continue
+            if self.finished:
+                return
+            await updated.wait()
+
+class StreamRegistry:
+    """Track running investigation streams so clients can reattach to them."""
+
+    def __init__(self, retention_seconds: int = 300):
+        self.retention_seconds = retention_seconds
+        self.streams: Dict[UUID, InvestigationStream] = {}
+
+    def get(self, investigation_id: UUID) -> Optional[InvestigationStream]:
+        """Get stream for investigation if still tracked."""
+        self._prune()
+        return self.streams.get(investigation_id)
+
+    def start(
+        self,
+        investigation_id: UUID,
+        producer: Callable[[InvestigationStream], Awaitable[None]],
+        buffer: ResponseBuffer
+    ) -> InvestigationStream:
+        """Get the running stream or start a new background run."""
+        stream = self.get(investigation_id)
+        if stream is not None:
+            return stream
+
+        stream = InvestigationStream(investigation_id, buffer)
+        self.streams[investigation_id] = stream
+        stream.task = asyncio.create_task(producer(stream))
+        logger.info(f"Started investigation stream {investigation_id}")
+        return stream
+
+    def _prune(self):
+        """Drop finished streams past the retention window."""
+        now = datetime.utcnow()
+        expired = [
+            inv_id for inv_id, stream in self.streams.items()
+            if stream.finished_at and (now - stream.finished_at).total_seconds() > self.retention_seconds
+        ]
+        for inv_id in expired:
+            del self.streams[inv_id]
+
+    def get_stats(self):
+        """Get registry statistics."""
+        return {
+            "tracked": len(self.streams),
+            "running": sum(1 for s in self.streams.values() if not s.finished)
+        }
+
+# Global stream registry
+stream_registry = StreamRegistry()
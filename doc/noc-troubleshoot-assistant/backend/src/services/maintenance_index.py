@@ -0,0 +1,184 @@
+"""Index of Zabbix maintenance windows per instance."""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Zabbix timeperiod types
+ONE_TIME = 0
+DAILY = 2
+WEEKLY = 3
+MONTHLY = 4
+
+def _period_starts(timeperiod: Dict[str, Any], day: datetime, active_since: datetime) -> Optional[datetime]:
+    """Get start of the period occurrence on a given day, if the period occurs that day."""
+    period_type = int(timeperiod.get('timeperiod_type', ONE_TIME))
+    every = max(int(timeperiod.get('every', 1) or 1), 1)
+    start = day + timedelta(seconds=int(timeperiod.get('start_time', 0) or 0))
+
+    if period_type == DAILY:
+        days = (day.date() - active_since.date()).days
+        return start if days >= 0 and days % every == 0 else None
+
+    if period_type == WEEKLY:
+        if not int(timeperiod.get('dayofweek', 0) or 0) & (1 << day.weekday()):
+            return None
+        weeks = (day.date() - active_since.date()).days // 7
+        return start if weeks >= 0 and weeks % every == 0 else None
+
+    if period_type == MONTHLY:
+        if not int(timeperiod.get('month', 0) or 0) & (1 << (day.month - 1)):
+            return None
+        day_of_month = int(timeperiod.get('day', 0) or 0)
+        if day_of_month:
+            return start if day.day == day_of_month else None
+        if not int(timeperiod.get('dayofweek', 0) or 0) & (1 << day.weekday()):
+            return None
+        # every: 1-4 = first..fourth such weekday of the month, 5 = last
+        week_of_month = (day.day - 1) // 7 + 1
+        if every == 5:
+            return start if (day + timedelta(days=7)).month != day.month else None
+        return start if week_of_month == every else None
+
+    return None
+
+def window_active(window: Dict[str, Any], now: datetime) -> bool:
+    """Check whether a maintenance window is in effect at a (server local) time."""
+    active_since = datetime.fromtimestamp(int(window.get('active_since', 0)))
+    active_till = datetime.fromtimestamp(int(window.get('active_till', 0)))
+    if not active_since <= now < active_till:
+        return False
+
+    for timeperiod in window.get('timeperiods') or []:
+        period = int(timeperiod.get('period', 0) or 0)
+        if int(timeperiod.get('timeperiod_type', ONE_TIME)) == ONE_TIME:
+            start = datetime.fromtimestamp(int(timeperiod.get('start_date', 0) or 0))
+            if start <= now < start + timedelta(seconds=period):
+                return True
+            continue
+
+        # A period starting late yesterday can still run past midnight
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        for day in (today, today - timedelta(days=1)):
+            start = _period_starts(timeperiod, day, active_since)
+            if start is not None and start <= now < start + timedelta(seconds=period):
+                return True
+    return False
+
+class MaintenanceIndex:
+    """Cached maintenance windows per instance, keyed by host and host group.
+
+    Windows are fetched at most once per refresh interval; whether a window
+    is in effect is evaluated from its time periods on every lookup, so
+    windows starting between refreshes are still honoured. Times are
+    evaluated in the backend's local timezone, which should match the
+    Zabbix server.
+    """
+
+    def __init__(self, refresh_interval: int = 300):
+        self.refresh_interval = refresh_interval
+        self.windows: Dict[str, List[Dict[str, Any]]] = {}
+        self.by_host: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+        self.by_group: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+        self._refreshed_at: Dict[str, float] = {}
+
+    async def refresh_if_due(self, mcp_client, instance_id: str):
+        """Refresh windows of an instance when the cached copy is older than the interval."""
+        refreshed_at = self._refreshed_at.get(instance_id)
+        if refreshed_at is not None and time.monotonic() - refreshed_at < self.refresh_interval:
+            return
+        await self.refresh(mcp_client, instance_id)
+
+    async def refresh(self, mcp_client, instance_id: str):
+        """Fetch maintenance windows and expand host group windows to their hosts."""
+        now = int(time.time())
+        result = await mcp_client.get_maintenances(
+            instance_id,
+            output="extend",
+            selectHosts=["hostid", "host", "name"],
+            selectHostGroups=["groupid", "name"],
+            selectTimeperiods="extend"
+        )
+        if not result.get('success'):
+            logger.error(f"Failed to get maintenance windows from {instance_id}: {result.get('error')}")
+            return
+
+        # Expired windows can never become active again
+        windows = [w for w in result.get('data', []) if int(w.get('active_till', 0)) > now]
+
+        group_ids = sorted({g['groupid'] for w in windows for g in w.get('hostgroups') or []})
+        group_hosts: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        if group_ids:
+            hosts_result = await mcp_client.get_hosts(
+                instance_id,
+                groupids=group_ids,
+                output=["hostid", "host", "name"],
+                selectHostGroups=["groupid"]
+            )
+            for host in hosts_result.get('data', []) if hosts_result.get('success') else []:
+                for group in host.get('hostgroups') or []:
+                    group_hosts[group['groupid']].append(host)
+
+        by_host: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        by_group: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for window in windows:
+            hosts = list(window.get('hosts') or [])
+            for group in window.get('hostgroups') or []:
+                by_group[group['groupid']].append(window)
+                hosts.extend(group_hosts.get(group['groupid'], []))
+            for key in {name.lower() for host in hosts for name in (host.get('host'), host.get('name')) if name}:
+                by_host[key].append(window)
+
+        self.windows[instance_id] = windows
+        self.by_host[instance_id] = dict(by_host)
+        self.by_group[instance_id] = dict(by_group)
+        self._refreshed_at[instance_id] = time.monotonic()
+        logger.info(f"Loaded {len(windows)} maintenance windows for {instance_id}")
+
+    def active_for_host(self, instance_id: str, host: str, now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """Get the maintenance window currently covering a host."""
+        now = now or datetime.now()
+        for window in self.by_host.get(instance_id, {}).get((host or '').lower(), []):
+            if window_active(window, now):
+                return window
+        return None
+
+    def active_for_group(self, instance_id: str, group_id: str, now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """Get the maintenance window currently covering a host group."""
+        now = now or datetime.now()
+        for window in self.by_group.get(instance_id, {}).get(group_id, []):
+            if window_active(window, now):
+                return window
+        return None
+
+    def annotate(self, instance_id: str, alarms: List[Dict[str, Any]]):
+        """Mark alarms on hosts under active maintenance."""
+        now = datetime.now()
+        for alarm in alarms:
+            window = self.active_for_host(instance_id, alarm.get('host'), now)
+            for group_id in alarm.get('host_groups') or []:
+                window = window or self.active_for_group(instance_id, group_id, now)
+            alarm['in_maintenance'] = window is not None or alarm.get('in_maintenance', False)
+            alarm['maintenance'] = {
+                "id": window['maintenanceid'],
+                "name": window.get('name'),
+                "active_till": datetime.fromtimestamp(int(window['active_till'])).isoformat(),
+                "collect_data": str(window.get('maintenance_type', '0')) == '0'
+            } if window is not None else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get index statistics."""
+        now = datetime.now()
+        return {
+            instance_id: {
+                "windows": len(windows),
+                "active": sum(1 for w in windows if window_active(w, now))
+            }
+            for instance_id, windows in self.windows.items()
+        }
+
+# Global maintenance index
+maintenance_index = MaintenanceIndex()
@@ -77,3 +77,7 @@ class MCPClient:
     async def get_triggers(self, instance_id: str, **params) -> Dict[str, Any]:
         """Get triggers from Zabbix instance."""
         return await self.invoke_tool("trigger_get", instance_id, params)
+    
+    async def get_maintenances(self, instance_id: str, **params) -> Dict[str, Any]:
+        """Get maintenance windows from Zabbix instance."""
+        return await self.invoke_tool("maintenance_get", instance_id, params)
@@ -0,0 +1,79 @@
+"""Route investigations to a fast or strong model tier."""
+from typing import Dict, Any, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+FAST = "fast"
+STRONG = "strong"
+
+class RouteDecision:
+    """Selected model tier and why it was chosen."""
+
+    def __init__(self, tier: str, reason: str):
+        self.tier = tier
+        self.reason = reason
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"model_tier": self.tier, "routing_reason": self.reason}
+
+class ModelRouter:
+    """Pick a model tier from alarm severity, prior knowledge and history.
+
+    Routine alarms (low severity, or mid severity with a matching runbook or
+    a very similar solved case) go to the fast tier. Disaster/high alarms and
+    unresolved cases (a refresh was requested or an earlier run failed) go to
+    the strong tier.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        escalate_severities: Optional[List[str]] = None,
+        fast_severities: Optional[List[str]] = None,
+        well_known_similarity: float = 0.8,
+        failure_lookback_hours: int = 24
+    ):
+        self.enabled = enabled
+        self.escalate_severities = escalate_severities or ["disaster", "high"]
+        self.fast_severities = fast_severities or ["not_classified", "information", "warning"]
+        self.well_known_similarity = well_known_similarity
+        self.failure_lookback_hours = failure_lookback_hours
+
+    def _is_well_known(self, context: Dict[str, Any]) -> Optional[str]:
+        if context.get('runbook'):
+            return f"runbook match ({context['runbook']['runbook']})"
+        cases = context.get('similar_cases') or []
+        if cases and cases[0].get('similarity', 0) >= self.well_known_similarity:
+            return f"similar past case ({cases[0]['similarity']:.2f})"
+        return None
+
+    def select(
+        self,
+        alarm: Dict[str, Any],
+        context: Dict[str, Any],
+        refresh: bool = False,
+        prior_failures: int = 0
+    ) -> RouteDecision:
+        """Select model tier for an investigation."""
+        if not self.enabled:
+            return RouteDecision(FAST, "routing disabled")
+
+        if refresh:
+            return RouteDecision(STRONG, "refresh of previous analysis requested")
+        if prior_failures:
+            return RouteDecision(STRONG, f"{prior_failures} recent failed investigation(s)")
+
+        severity = alarm.get('severity', 'not_classified')
+        if severity in self.escalate_severities:
+            return RouteDecision(STRONG, f"{severity} severity")
+        if severity in self.fast_severities:
+            return RouteDecision(FAST, f"{severity} severity")
+
+        well_known = self._is_well_known(context)
+        if well_known:
+            return RouteDecision(FAST, well_known)
+        return RouteDecision(STRONG, f"{severity} severity without known resolution")
+
+# Global model router
+model_router = ModelRouter()
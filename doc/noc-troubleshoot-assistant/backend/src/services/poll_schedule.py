@@ -0,0 +1,84 @@
+"""Adaptive per-instance polling intervals."""
+from typing import Dict, Any, Iterable, List, Optional
+import time
+
+class AdaptiveInterval:
+    """Poll interval of one instance, adapted to problem churn and response time.
+
+    Any change in the problem list drops the interval to the floor so the
+    follow-up of a state change is seen quickly; every poll without changes
+    backs off by a factor up to the ceiling. A slow instance is never polled
+    more often than a multiple of its response time, so polling it takes at
+    most a fixed fraction of wall time.
+    """
+
+    def __init__(self, base: float, floor: float, ceiling: float, backoff: float = 1.5, slow_factor: float = 10):
+        self.floor = floor
+        self.ceiling = ceiling
+        self.backoff = backoff
+        self.slow_factor = slow_factor
+        self.interval = min(max(base, floor), ceiling)
+        self.next_due = 0.0
+        self.last_changes = 0
+        self.last_latency = 0.0
+
+    def record(self, changes: int, latency: float, now: Optional[float] = None) -> float:
+        """Update the interval after a poll and schedule the next one."""
+        now = time.monotonic() if now is None else now
+        if changes:
+            self.interval = self.floor
+        else:
+            self.interval *= self.backoff
+        self.interval = max(self.interval, latency * self.slow_factor)
+        self.interval = min(max(self.interval, self.floor), self.ceiling)
+        self.last_changes = changes
+        self.last_latency = latency
+        self.next_due = now + self.interval
+        return self.interval
+
+class PollSchedule:
+    """Adaptive intervals of all polled instances."""
+
+    def __init__(self, base: float = 30, floor: float = 10, ceiling: float = 120):
+        self.base = base
+        self.floor = floor
+        self.ceiling = ceiling
+        self.intervals: Dict[str, AdaptiveInterval] = {}
+
+    def _interval(self, instance_id: str) -> AdaptiveInterval:
+        if instance_id not in self.intervals:
+            self.intervals[instance_id] = AdaptiveInterval(self.base, self.floor, self.ceiling)
+        return self.intervals[instance_id]
+
+    def due(self, instance_ids: Iterable[str], now: Optional[float] = None) -> List[str]:
+        """Get instances whose next poll is due (unknown instances are due at once)."""
+        now = time.monotonic() if now is None else now
+        return [i for i in instance_ids if i not in self.intervals or self.intervals[i].next_due <= now]
+
+    def record(self, instance_id: str, changes: int, latency: float, now: Optional[float] = None) -> float:
+        """Record a poll result for an instance."""
+        return self._interval(instance_id).record(changes, latency, now)
+
+    def forget(self, keep: Iterable[str]):
+        """Drop instances that are no longer polled."""
+        keep = set(keep)
+        for instance_id in [i for i in self.intervals if i not in keep]:
+            del self.intervals[instance_id]
+
+    def seconds_until_due(self, now: Optional[float] = None) -> float:
+        """Get seconds until the next instance is due (zero before the first poll)."""
+        if not self.intervals:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        return max(0.0, min(i.next_due for i in self.intervals.values()) - now)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get current interval of each instance."""
+        return {
+            instance_id: {
+                "interval_seconds": round(interval.interval, 1),
+                "last_changes": interval.last_changes,
+                "last_latency_ms": int(interval.last_latency * 1000)
+            }
+            for instance_id, interval in self.intervals.items()
+        }
@@ -0,0 +1,198 @@
+"""Background pre-investigation of new high-severity alarms."""
+import asyncio
+from collections import deque
+from typing import Dict, Any, List, Set, Tuple
+from uuid import UUID
+import logging
+import time
+
+from models import async_session
+from .investigation_service import InvestigationService
+from .investigation_stream import stream_registry
+from .investigation_runner import run_investigation, new_response_buffer, claim_run
+from .analysis_cache import analysis_cache
+from .incident_correlator import incident_correlator
+from .alarm_state import alarm_state
+
+logger = logging.getLogger(__name__)
+
+AlarmKey = Tuple[str, str]
+
+class PreInvestigator:
+    """Start investigations for severe alarms before an operator opens them.
+
+    New alarms at or above the severity threshold are queued (highest
+    severity first) and started with bounded concurrency and an hourly
+    budget of model runs. Results are stored like any other investigation,
+    so opening the alarm attaches to the running stream or shows the
+    completed analysis.
+    """
+
+    def __init__(
+        self,
+        mcp_client,
+        alarm_aggregator,
+        min_severity_code: int = 4,
+        max_concurrent: int = 2,
+        max_per_hour: int = 20,
+        check_interval: int = 10
+    ):
+        self.mcp_client = mcp_client
+        self.alarm_aggregator = alarm_aggregator
+        self.min_severity_code = min_severity_code
+        self.max_concurrent = max_concurrent
+        self.max_per_hour = max_per_hour
+        self.check_interval = check_interval
+        self.seen: Set[AlarmKey] = set()
+        self.pending: Dict[AlarmKey, Dict[str, Any]] = {}
+        self.active: Dict[AlarmKey, asyncio.Task] = {}
+        self.started_at: deque = deque()
+        self.stats = {"started": 0, "skipped_existing": 0, "deferred_budget": 0}
+        self.running = False
+        self.task = None
+
+    async def start(self):
+        """Start watch loop."""
+        if self.running:
+            return
+
+        self.running = True
+        self.task = asyncio.create_task(self._watch_loop())
+        logger.info(
+            f"Pre-investigator started (severity >= {self.min_severity_code}, "
+            f"{self.max_concurrent} concurrent, {self.max_per_hour}/hour)"
+        )
+
+    async def stop(self):
+        """Stop watch loop."""
+        self.running = False
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        logger.info("Pre-investigator stopped")
+
+    async def _watch_loop(self):
+        """Main watch loop."""
+        while self.running:
+            try:
+                await self.check_alarms()
+            except Exception as e:
+                logger.error(f"Error in pre-investigation loop: {e}")
+
+            await asyncio.sleep(self.check_interval)
+
+    def _budget_left(self) -> int:
+        """Get runs left in the sliding one-hour budget."""
+        cutoff = time.monotonic() - 3600
+        while self.started_at and self.started_at[0] < cutoff:
+            self.started_at.popleft()
+        return self.max_per_hour - len(self.started_at)
+
+    @staticmethod
+    def _is_incident_root(alarm: Dict[str, Any]) -> bool:
+        """Check alarm is not a symptom of a firing upstream trigger or correlated incident."""
+        if alarm.get('is_dependent'):
+            return False
+        incident = incident_correlator.get_incident_for_alarm(alarm['id'], alarm['instance_id'])
+        return incident is None or len(incident) == 1 or incident_correlator.root_alarm(incident)['id'] == alarm['id']
+
+    async def check_alarms(self) -> List[AlarmKey]:
+        """Queue new severe alarms and start as many as limits allow.
+
+        Returns:
+            Keys of alarms whose investigation was started
+        """
+        # Every replica sees the same alarms; only the polling leader acts on them
+        if not alarm_state.is_leader:
+            return []
+
+        alarms = {
+            (alarm['instance_id'], alarm['id']): alarm
+            for alarm in self.alarm_aggregator.get_all_alarms()
+            # Synthetic alarms describe unreachable instances the agent cannot query
+            if not alarm.get('is_synthetic') and alarm.get('severity_code', 0) >= self.min_severity_code
+            # Planned maintenance explains the alarm; do not spend a model run on it
+            and not alarm.get('in_maintenance')
+            and self._is_incident_root(alarm)
+        }
+
+        # Forget alarms that cleared, queue ones not seen before
+        self.seen &= set(alarms)
+        for key in list(self.pending):
+            if key not in alarms:
+                del self.pending[key]
+        for key, alarm in alarms.items():
+            if key not in self.seen:
+                self.seen.add(key)
+                self.pending[key] = alarm
+
+        for key in [key for key, task in self.active.items() if task.done()]:
+            del self.active[key]
+
+        started = []
+        queue = sorted(self.pending.values(), key=lambda a: (-a.get('severity_code', 0), a.get('started_at') or ''))
+        for alarm in queue:
+            if len(self.active) >= self.max_concurrent:
+                break
+            if self._budget_left() <= 0:
+                self.stats["deferred_budget"] += 1
+                break
+
+            key = (alarm['instance_id'], alarm['id'])
+            del self.pending[key]
+            if await self._start(key, alarm):
+                started.append(key)
+        return started
+
+    async def _start(self, key: AlarmKey, alarm: Dict[str, Any]) -> bool:
+        """Create the investigation and start its background run."""
+        db = async_session()
+        try:
+            inv_service = InvestigationService(db)
+            if await inv_service.find_investigation_for_alarm(alarm) is not None or await analysis_cache.lookup(db, alarm):
+                self.stats["skipped_existing"] += 1
+                return False
+
+            inv_uuid = UUID(await inv_service.create_investigation(
+                alarm,
+                origin="auto",
+                system_message=f"Automatic investigation for: {alarm['description']}"
+            ))
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Failed to create pre-investigation for alarm {alarm['id']}: {e}")
+            return False
+        finally:
+            await db.close()
+
+        # Claim the fresh row so operators attaching through another replica follow this run
+        try:
+            claimed = await claim_run(inv_uuid)
+        except Exception as e:
+            logger.error(f"Failed to claim pre-investigation {inv_uuid}: {e}")
+            claimed = False
+        if not claimed:
+            return False
+
+        stream = stream_registry.start(
+            inv_uuid,
+            lambda s: run_investigation(s, alarm, self.mcp_client),
+            new_response_buffer()
+        )
+        self.active[key] = stream.task
+        self.started_at.append(time.monotonic())
+        self.stats["started"] += 1
+        logger.info(f"Pre-investigating {alarm['severity']} alarm {alarm['id']} on {alarm['instance_id']}")
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pre-investigation statistics."""
+        return {
+            **self.stats,
+            "running": sum(1 for task in self.active.values() if not task.done()),
+            "pending": len(self.pending),
+            "budget_left": self._budget_left()
+        }
@@ -0,0 +1,319 @@
+"""Runbook loading, chunking and BM25 retrieval."""
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+import asyncio
+import logging
+import math
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(r'[a-z0-9][a-z0-9_\-\.]*')
+_HEADING_PATTERN = re.compile(r'^(#{1,3})\s+(.*)$')
+
+# Words that carry no signal in alarm descriptions or runbook text
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "if", "in", "is",
+    "it", "of", "on", "or", "the", "to", "with"
+}
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase search terms."""
+    return [t.strip('.-') for t in _TOKEN_PATTERN.findall(text.lower()) if t not in _STOPWORDS]
+
+class RunbookChunk:
+    """Section of a runbook addressed by its heading path."""
+
+    __slots__ = ("runbook", "title", "path", "section", "text", "length")
+
+    def __init__(self, runbook: str, title: str, path: str, section: str, text: str):
+        self.runbook = runbook
+        self.title = title
+        self.path = path
+        self.section = section
+        self.text = text
+        self.length = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "runbook": self.runbook,
+            "title": self.title,
+            "section": self.section,
+            "path": self.path,
+            "text": self.text
+        }
+
+def parse_runbook(path: Path, root: Path) -> List[RunbookChunk]:
+    """Split a markdown runbook into heading-level chunks.
+
+    Lines starting with '#' inside fenced code blocks are shell comments,
+    not headings, so fences are tracked while scanning.
+    """
+    relative = str(path.relative_to(root))
+    runbook = path.stem
+    title = runbook
+    chunks = []
+    headings: List[str] = []
+    lines: List[str] = []
+    in_code = False
+
+    def flush():
+        text = "\n".join(lines).strip()
+        if text:
+            section = " > ".join(headings[1:]) or title
+            chunks.append(RunbookChunk(runbook, title, relative, section, text))
+        lines.clear()
+
+    for line in path.read_text(encoding='utf-8').splitlines():
+        if line.strip().startswith("```"):
+            in_code = not in_code
+            lines.append(line)
+            continue
+
+        match = None if in_code else _HEADING_PATTERN.match(line)
+        if match is None:
+            lines.append(line)
+            continue
+
+        flush()
+        level = len(match.group(1))
+        heading = match.group(2).strip()
+        if level == 1:
+            title = heading
+            headings = [heading]
+        else:
+            headings = headings[:level - 1] + [heading]
+
+    flush()
+    for chunk in chunks:
+        chunk.title = title
+    return chunks
+
+class _IndexSnapshot:
+    """Result of one index build; reloads swap in a whole new snapshot."""
+
+    __slots__ = ("chunks", "postings", "idf", "avg_length", "profiles", "profile_idf", "signature")
+
+    def __init__(self):
+        self.chunks: List[RunbookChunk] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.idf: Dict[str, float] = {}
+        self.avg_length = 0.0
+        self.profiles: Dict[str, Dict[str, int]] = {}
+        self.profile_idf: Dict[str, float] = {}
+        self.signature = None
+
+class RunbookIndex:
+    """In-memory BM25 index over runbook sections with hot reload.
+
+    A background task checks the files for changes and rebuilds the index
+    in a thread; readers take the current snapshot once, so a search never
+    sees a half-built index and never waits for a reload.
+    """
+
+    def __init__(self, path: Optional[str] = None, reload_interval: float = 10.0, k1: float = 1.2, b: float = 0.75):
+        self.path = Path(path) if path else None
+        self.reload_interval = reload_interval
+        self.k1 = k1
+        self.b = b
+        self.prefetch_min_score = 2.5
+        self._snapshot = _IndexSnapshot()
+        self.loaded_at: Optional[float] = None
+        self.running = False
+        self.task = None
+
+    def _files(self) -> List[Path]:
+        if self.path is None or not self.path.is_dir():
+            return []
+        # Skip hidden entries such as the ..data links of mounted ConfigMaps
+        return sorted(
+            p for p in self.path.rglob("*.md")
+            if not any(part.startswith('.') for part in p.relative_to(self.path).parts)
+        )
+
+    def _current_signature(self, files: List[Path]):
+        signature = []
+        for p in files:
+            stat = p.stat()
+            signature.append((str(p), stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def load(self, path: Optional[str] = None) -> int:
+        """Parse all runbooks and rebuild the index."""
+        if path is not None:
+            self.path = Path(path)
+
+        files = self._files()
+        chunks = []
+        for file_path in files:
+            try:
+                chunks.extend(parse_runbook(file_path, self.path))
+            except Exception as e:
+                logger.error(f"Failed to parse runbook {file_path}: {e}")
+
+        snapshot = self._build(chunks)
+        snapshot.signature = self._current_signature(files)
+        self._snapshot = snapshot
+        self.loaded_at = time.time()
+        logger.info(f"Loaded {len(files)} runbooks ({len(chunks)} sections) from {self.path}")
+        return len(files)
+
+    def _build(self, chunks: List[RunbookChunk]) -> _IndexSnapshot:
+        postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        profiles: Dict[str, List[str]] = defaultdict(list)
+        total_length = 0
+        for index, chunk in enumerate(chunks):
+            # Title and section headings are repeated so they weigh more than body text
+            terms = tokenize(chunk.title) * 2 + tokenize(chunk.section) * 2 + tokenize(chunk.text)
+            chunk.length = len(terms)
+            total_length += chunk.length
+            counts: Dict[str, int] = defaultdict(int)
+            for term in terms:
+                counts[term] += 1
+            for term, count in counts.items():
+                postings[term].append((index, count))
+
+            # Runbook profile (title + problem description) is what alarms are matched against
+            if chunk.path not in profiles:
+                profiles[chunk.path] = tokenize(chunk.title) * 2
+            if "problem" in chunk.section.lower():
+                profiles[chunk.path].extend(tokenize(chunk.text))
+
+        count = len(chunks)
+        snapshot = _IndexSnapshot()
+        snapshot.chunks = chunks
+        snapshot.postings = dict(postings)
+        snapshot.idf = self._idf(count, {term: len(docs) for term, docs in snapshot.postings.items()})
+        snapshot.avg_length = total_length / count if count else 0.0
+
+        document_frequency: Dict[str, int] = defaultdict(int)
+        for path, terms in profiles.items():
+            counts = defaultdict(int)
+            for term in terms:
+                counts[term] += 1
+            snapshot.profiles[path] = dict(counts)
+            for term in counts:
+                document_frequency[term] += 1
+        snapshot.profile_idf = self._idf(len(profiles), document_frequency)
+        return snapshot
+
+    @staticmethod
+    def _idf(count: int, document_frequency: Dict[str, int]) -> Dict[str, float]:
+        return {
+            term: math.log(1 + (count - df + 0.5) / (df + 0.5))
+            for term, df in document_frequency.items()
+        }
+
+    def reload_if_changed(self) -> bool:
+        """Reload when runbook files changed (blocking, run off the event loop)."""
+        if self.path is None:
+            return False
+        if self._current_signature(self._files()) == self._snapshot.signature:
+            return False
+        logger.info("Runbooks changed on disk, reloading")
+        self.load()
+        return True
+
+    async def start(self):
+        """Start checking runbooks for changes."""
+        if self.running or self.path is None:
+            return
+
+        self.running = True
+        self.task = asyncio.create_task(self._run_loop())
+        logger.info(f"Runbook reload started (interval: {self.reload_interval}s)")
+
+    async def stop(self):
+        """Stop checking runbooks for changes."""
+        self.running = False
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        logger.info("Runbook reload stopped")
+
+    async def _run_loop(self):
+        """Main reload loop."""
+        while self.running:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                await asyncio.to_thread(self.reload_if_changed)
+            except Exception as e:
+                logger.error(f"Failed to check runbooks for changes: {e}")
+
+    def _score(self, snapshot: _IndexSnapshot, query: str) -> Dict[int, float]:
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            docs = snapshot.postings.get(term)
+            if not docs:
+                continue
+            idf = snapshot.idf[term]
+            for index, tf in docs:
+                length_norm = 1 - self.b + self.b * snapshot.chunks[index].length / (snapshot.avg_length or 1)
+                scores[index] += idf * tf * (self.k1 + 1) / (tf + self.k1 * length_norm)
+        return scores
+
+    def search(self, query: str, limit: int = 3) -> List[Dict[str, Any]]:
+        """Get best matching runbook sections for a query."""
+        snapshot = self._snapshot
+        scores = self._score(snapshot, query)
+        ranked = sorted(scores.items(), key=lambda item: -item[1])[:limit]
+        return [{**snapshot.chunks[index].to_dict(), "score": round(score, 3)} for index, score in ranked]
+
+    def match_alarm(self, alarm: Dict[str, Any], max_chars: int = 3000) -> Optional[Dict[str, Any]]:
+        """Find the runbook matching an alarm and return its key sections.
+
+        The alarm description is scored against each runbook's title and
+        problem description rather than all of its sections, so incidental
+        mentions deep in an unrelated runbook do not win.
+        """
+        snapshot = self._snapshot
+        terms = set(tokenize(alarm.get('description', '')))
+        best_path, best_score = None, 0.0
+        for path, counts in snapshot.profiles.items():
+            score = sum(
+                snapshot.profile_idf[term] * counts[term] * (self.k1 + 1) / (counts[term] + self.k1)
+                for term in terms if term in counts
+            )
+            if score > best_score:
+                best_path, best_score = path, score
+        if best_path is None or best_score < self.prefetch_min_score:
+            return None
+
+        sections = []
+        used = 0
+        for chunk in snapshot.chunks:
+            if chunk.path != best_path:
+                continue
+            if not any(key in chunk.section.lower() for key in ("diagnostic", "resolution", "escalation criteria")):
+                continue
+            if used + len(chunk.text) > max_chars:
+                break
+            sections.append({"section": chunk.section, "text": chunk.text})
+            used += len(chunk.text)
+
+        first = next(chunk for chunk in snapshot.chunks if chunk.path == best_path)
+        return {
+            "runbook": first.runbook,
+            "title": first.title,
+            "path": best_path,
+            "score": round(best_score, 3),
+            "sections": sections
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get index statistics."""
+        snapshot = self._snapshot
+        return {
+            "path": str(self.path) if self.path else None,
+            "runbooks": len({chunk.path for chunk in snapshot.chunks}),
+            "sections": len(snapshot.chunks),
+            "terms": len(snapshot.postings)
+        }
+
+# Global runbook index
+runbook_index = RunbookIndex()
@@ -0,0 +1,147 @@
+"""Buffered recording of agent tool calls."""
+import asyncio
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+from uuid import UUID
+import logging
+
+from models import async_session
+from .investigation_service import InvestigationService
+
+logger = logging.getLogger(__name__)
+
+# Investigation the current agent run belongs to. Strands runs sync tools with
+# asyncio.to_thread, which copies the context, so tools see the caller's value.
+current_investigation: ContextVar[Optional[UUID]] = ContextVar("current_investigation", default=None)
+
+class ToolCallRecorder:
+    """Capture agent tool calls in memory and write them in batches.
+
+    Tools only append to a buffer, so recording adds no database round trip
+    to a tool hop. The buffer is written to tool_calls in one transaction
+    every flush_interval seconds, as soon as max_batch_size calls are
+    pending, and when an investigation ends. Beyond max_pending buffered
+    calls (database down) the oldest are dropped.
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = 2.0,
+        max_batch_size: int = 200,
+        max_pending: int = 10000,
+        session_factory=async_session
+    ):
+        self.flush_interval = flush_interval
+        self.max_batch_size = max_batch_size
+        self.max_pending = max_pending
+        self.session_factory = session_factory
+        self.pending: deque = deque()
+        self.running = False
+        self.task = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._flush_lock = asyncio.Lock()
+        self.stats = {"recorded": 0, "written": 0, "batches": 0, "dropped": 0, "errors": 0}
+
+    @contextmanager
+    def investigation(self, investigation_id: UUID):
+        """Attribute tool calls made inside the block to an investigation."""
+        token = current_investigation.set(investigation_id)
+        try:
+            yield
+        finally:
+            current_investigation.reset(token)
+
+    def record(self, tool_name: str, parameters: Dict[str, Any], result: Dict[str, Any], duration_ms: int):
+        """Buffer a tool call of the current investigation (safe from worker threads)."""
+        investigation_id = current_investigation.get()
+        if investigation_id is None:
+            return
+        if len(self.pending) >= self.max_pending:
+            self.pending.popleft()
+            self.stats["dropped"] += 1
+        self.pending.append({
+            "investigation_id": investigation_id,
+            "tool_name": tool_name,
+            "parameters": parameters,
+            "result": result,
+            "duration_ms": duration_ms,
+            "timestamp": datetime.now(timezone.utc)
+        })
+        self.stats["recorded"] += 1
+        if len(self.pending) >= self.max_batch_size and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def flush(self) -> int:
+        """Write all buffered tool calls.
+
+        Returns:
+            Number of tool calls written
+        """
+        async with self._flush_lock:
+            written = 0
+            while self.pending:
+                batch: List[Dict[str, Any]] = []
+                while self.pending and len(batch) < self.max_batch_size:
+                    batch.append(self.pending.popleft())
+                db = self.session_factory()
+                try:
+                    written += await InvestigationService(db).add_tool_calls(batch)
+                    self.stats["batches"] += 1
+                except Exception as e:
+                    # The audit trail must never fail an investigation; the batch is lost
+                    await db.rollback()
+                    self.stats["errors"] += 1
+                    self.stats["dropped"] += len(batch)
+                    logger.error(f"Failed to write {len(batch)} tool calls: {e}")
+                finally:
+                    await db.close()
+            self.stats["written"] += written
+            return written
+
+    async def start(self):
+        """Start the periodic flush loop."""
+        if self.running:
+            return
+
+        self.running = True
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self.task = asyncio.create_task(self._run_loop())
+        logger.info(f"Tool call recorder started (flush every {self.flush_interval}s)")
+
+    async def stop(self):
+        """Stop the flush loop and write what is left."""
+        self.running = False
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        self._loop = None
+        await self.flush()
+        logger.info("Tool call recorder stopped")
+
+    async def _run_loop(self):
+        """Main flush loop."""
+        while self.running:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get recorder statistics."""
+        return {
+            **self.stats,
+            "pending": len(self.pending)
+        }
+
+# Global tool call recorder
+tool_call_recorder = ToolCallRecorder()
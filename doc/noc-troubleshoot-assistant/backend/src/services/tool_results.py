@@ -0,0 +1,201 @@
+"""Content-addressed, compressed storage of tool call results."""
+from datetime import timedelta
+from typing import Dict, Any, Iterable, List, Tuple
+import hashlib
+import json
+import logging
+import zlib
+
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import ToolResult
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Reuse of a stored payload refreshes last_used_at at most this often
+TOUCH_INTERVAL = timedelta(days=1)
+
+def canonical_json(value: Any) -> bytes:
+    """Serialize a result so equal payloads give identical bytes."""
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str).encode('utf-8')
+
+def summarize(result: Any, size_bytes: int) -> Dict[str, Any]:
+    """Describe a result without its content (kept inline on the tool call)."""
+    summary: Dict[str, Any] = {"bytes": size_bytes}
+    data = result
+    if isinstance(result, dict):
+        if 'success' in result:
+            summary["success"] = result['success']
+        if result.get('error'):
+            summary["error"] = str(result['error'])[:200]
+        data = result.get('data', result)
+    if isinstance(data, list):
+        summary["items"] = len(data)
+        if data and isinstance(data[0], dict):
+            summary["fields"] = sorted(data[0])[:20]
+    elif isinstance(data, dict):
+        summary["fields"] = sorted(data)[:20]
+    return summary
+
+def truncate(result: Any, max_bytes: int) -> Tuple[Any, bool]:
+    """Cut a result down to about max_bytes of canonical JSON.
+
+    Item lists (the result itself or its 'data' field) keep their leading
+    items; other oversized results are replaced by a text preview.
+
+    Returns:
+        Tuple of (result to store, whether it was truncated)
+    """
+    encoded = canonical_json(result)
+    if len(encoded) <= max_bytes:
+        return result, False
+
+    items = result if isinstance(result, list) else result.get('data') if isinstance(result, dict) else None
+    if isinstance(items, list):
+        kept, size = [], 0
+        for item in items:
+            size += len(canonical_json(item)) + 1
+            if size > max_bytes:
+                break
+            kept.append(item)
+        marker = {"kept_items": len(kept), "total_items": len(items), "original_bytes": len(encoded)}
+        if isinstance(result, list):
+            return {"data": kept, "_truncated": marker}, True
+        return {**result, "data": kept, "_truncated": marker}, True
+
+    preview = encoded[:max_bytes].decode('utf-8', errors='ignore')
+    return {"preview": preview, "_truncated": {"original_bytes": len(encoded)}}, True
+
+class ToolResultStore:
+    """Store each distinct tool result once, compressed, keyed by its hash.
+
+    The same host, trigger and problem payloads come back across many
+    investigations; tool calls keep only the hash and a small summary.
+    Results above max_result_bytes are truncated before hashing. zstd is
+    used when the zstandard package is installed, zlib otherwise; the
+    codec is recorded per payload.
+    """
+
+    def __init__(self, max_result_bytes: int = 262144, compression: str = "zstd", level: int = 3):
+        self.max_result_bytes = max_result_bytes
+        self.compression = compression
+        self.level = level
+        self.stats = {"stored": 0, "deduplicated": 0, "truncated": 0, "raw_bytes": 0, "stored_bytes": 0}
+
+    @property
+    def encoding(self) -> str:
+        """Get codec used for new payloads."""
+        return "zstd" if self.compression == "zstd" and zstandard is not None else "zlib"
+
+    def compress(self, data: bytes) -> Tuple[str, bytes]:
+        """Compress payload bytes. Returns (encoding, compressed bytes)."""
+        if self.encoding == "zstd":
+            return "zstd", zstandard.ZstdCompressor(level=self.level).compress(data)
+        return "zlib", zlib.compress(data, min(self.level * 2, 9))
+
+    @staticmethod
+    def decompress(encoding: str, data: bytes) -> bytes:
+        """Decompress payload bytes stored with an encoding."""
+        if encoding == "zstd":
+            if zstandard is None:
+                raise RuntimeError("zstandard package is required to read zstd tool results")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return zlib.decompress(data)
+
+    def prepare(self, result: Any) -> Dict[str, Any]:
+        """Truncate, hash, summarize and compress a result for storage."""
+        original = canonical_json(result)
+        stored, truncated = truncate(result, self.max_result_bytes)
+        canonical = canonical_json(stored) if truncated else original
+        encoding, payload = self.compress(canonical)
+        summary = summarize(result, len(original))
+        if truncated:
+            summary["truncated"] = True
+        return {
+            "hash": hashlib.sha256(canonical).hexdigest(),
+            "encoding": encoding,
+            "payload": payload,
+            "size_bytes": len(canonical),
+            "truncated": truncated,
+            "summary": summary
+        }
+
+    async def save(self, db: AsyncSession, result: Any) -> Tuple[str, Dict[str, Any]]:
+        """Store a result unless an identical one exists (without committing).
+
+        Returns:
+            Tuple of (result hash, summary)
+        """
+        return (await self.save_many(db, [result]))[0]
+
+    async def save_many(self, db: AsyncSession, results: List[Any]) -> List[Tuple[str, Dict[str, Any]]]:
+        """Store several results with one multi-row insert (without committing).
+
+        Returns:
+            (result hash, summary) of each result, in order
+        """
+        prepared = [self.prepare(result) for result in results]
+        summaries = [(p["hash"], p.pop("summary")) for p in prepared]
+        # A statement may not insert the same key twice
+        unique = list({p["hash"]: p for p in prepared}.values())
+
+        existing = set((await db.scalars(
+            select(ToolResult.hash).where(ToolResult.hash.in_([p["hash"] for p in unique]))
+        )).all())
+        insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+        stmt = insert(ToolResult).values(unique)
+        # Known payloads only refresh last_used_at (for retention), and only once a day
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ToolResult.hash],
+            set_={"last_used_at": func.now()},
+            where=ToolResult.last_used_at < func.now() - TOUCH_INTERVAL
+        )
+        await db.execute(stmt)
+
+        new = [p for p in unique if p["hash"] not in existing]
+        self.stats["stored"] += len(new)
+        self.stats["deduplicated"] += len(prepared) - len(new)
+        self.stats["truncated"] += sum(int(p["truncated"]) for p in prepared)
+        self.stats["raw_bytes"] += sum(summary["bytes"] for _, summary in summaries)
+        self.stats["stored_bytes"] += sum(len(p["payload"]) for p in new)
+        return summaries
+
+    async def load(self, db: AsyncSession, hashes: Iterable[str]) -> Dict[str, Any]:
+        """Load and decompress results by hash in one query."""
+        hashes = {h for h in hashes if h}
+        if not hashes:
+            return {}
+        rows = await db.execute(
+            select(ToolResult.hash, ToolResult.encoding, ToolResult.payload).where(ToolResult.hash.in_(hashes))
+        )
+        return {
+            result_hash: json.loads(self.decompress(encoding, payload))
+            for result_hash, encoding, payload in rows
+        }
+
+    async def results_for(self, db: AsyncSession, tool_calls: List[Any]) -> Dict[Any, Any]:
+        """Get result of each tool call by id (inline results of older rows are kept as is)."""
+        stored = await self.load(db, (tc.result_hash for tc in tool_calls if tc.result is None))
+        return {
+            tc.id: tc.result if tc.result is not None else stored.get(tc.result_hash)
+            for tc in tool_calls
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get storage statistics."""
+        return {
+            **self.stats,
+            "encoding": self.encoding,
+            "max_result_bytes": self.max_result_bytes
+        }
+
+# Global tool result store
+tool_result_store = ToolResultStore()
@@ -0,0 +1,134 @@
+"""Cached Zabbix trigger dependency graph and trigger hosts."""
+from typing import Dict, Any, Iterable, List, Set, Tuple
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class TriggerDependencyCache:
+    """Per-instance cache of trigger dependencies and hosts.
+
+    Dependencies are used to find root alarms; the hosts and host groups
+    of each trigger give problems their real host without a lookup per
+    poll. Only triggers missing from the cache or older than the TTL are
+    fetched, in one batched trigger.get, so a steady alarm list costs no API
+    calls between refreshes. Upstream triggers are followed transitively
+    because Zabbix dependency chains (access switch -> distribution -> core)
+    can skip triggers that are not firing.
+    """
+
+    def __init__(self, ttl_seconds: int = 600, max_depth: int = 5):
+        self.ttl_seconds = ttl_seconds
+        self.max_depth = max_depth
+        # instance_id -> trigger_id -> (direct dependency trigger ids, fetched_at)
+        self.graph: Dict[str, Dict[str, Tuple[List[str], float]]] = {}
+        # instance_id -> trigger_id -> hosts ({hostid, host, name}) and host group ids
+        self.hosts: Dict[str, Dict[str, List[Dict[str, str]]]] = {}
+        self.groups: Dict[str, Dict[str, List[str]]] = {}
+        self.stats = {"fetched": 0, "api_calls": 0}
+
+    def _stale(self, instance_id: str, trigger_ids: Iterable[str]) -> List[str]:
+        cached = self.graph.get(instance_id, {})
+        cutoff = time.monotonic() - self.ttl_seconds
+        return [t for t in trigger_ids if t not in cached or cached[t][1] < cutoff]
+
+    async def refresh(self, mcp_client, instance_id: str, trigger_ids: Iterable[str]):
+        """Fetch dependencies of uncached or stale triggers and their upstream triggers."""
+        cached = self.graph.setdefault(instance_id, {})
+        hosts = self.hosts.setdefault(instance_id, {})
+        groups = self.groups.setdefault(instance_id, {})
+        pending = set(self._stale(instance_id, {t for t in trigger_ids if t}))
+        depth = 0
+        while pending and depth < self.max_depth:
+            result = await mcp_client.get_triggers(
+                instance_id,
+                triggerids=sorted(pending),
+                output=["triggerid"],
+                selectDependencies=["triggerid"],
+                selectHosts=["hostid", "host", "name"],
+                selectHostGroups=["groupid"]
+            )
+            self.stats["api_calls"] += 1
+            if not result.get('success'):
+                logger.error(f"Failed to get trigger dependencies from {instance_id}: {result.get('error')}")
+                return
+
+            now = time.monotonic()
+            upstream: Set[str] = set()
+            for trigger in result.get('data', []):
+                dependencies = [d['triggerid'] for d in trigger.get('dependencies') or []]
+                cached[trigger['triggerid']] = (dependencies, now)
+                hosts[trigger['triggerid']] = trigger.get('hosts') or []
+                groups[trigger['triggerid']] = [g['groupid'] for g in trigger.get('hostgroups') or []]
+                upstream.update(dependencies)
+            # Triggers no longer returned (deleted or disabled) have no dependencies
+            for trigger_id in pending:
+                if trigger_id not in cached or cached[trigger_id][1] < now:
+                    cached[trigger_id] = ([], now)
+            self.stats["fetched"] += len(pending)
+
+            pending = set(self._stale(instance_id, upstream))
+            depth += 1
+
+        # Forget triggers nobody asked about for a long time
+        cutoff = time.monotonic() - 3 * self.ttl_seconds
+        for trigger_id in [t for t, (_, fetched_at) in cached.items() if fetched_at < cutoff]:
+            del cached[trigger_id]
+            hosts.pop(trigger_id, None)
+            groups.pop(trigger_id, None)
+
+    def hosts_for(self, instance_id: str, trigger_id: str) -> List[Dict[str, str]]:
+        """Get cached hosts of a trigger."""
+        return self.hosts.get(instance_id, {}).get(trigger_id, [])
+
+    def groups_for(self, instance_id: str, trigger_id: str) -> List[str]:
+        """Get cached host group ids of a trigger."""
+        return self.groups.get(instance_id, {}).get(trigger_id, [])
+
+    def upstream(self, instance_id: str, trigger_id: str) -> Set[str]:
+        """Get all triggers a trigger depends on, directly or transitively."""
+        cached = self.graph.get(instance_id, {})
+        seen: Set[str] = set()
+        stack = list(cached.get(trigger_id, ([], 0))[0])
+        while stack:
+            current = stack.pop()
+            if current in seen or current == trigger_id:
+                continue
+            seen.add(current)
+            stack.extend(cached.get(current, ([], 0))[0])
+        return seen
+
+    def annotate(self, instance_id: str, alarms: List[Dict[str, Any]]):
+        """Mark alarms whose upstream trigger is also firing as dependent.
+
+        Sets 'depends_on' (upstream trigger ids), 'is_dependent' and
+        'root_alarm_id' (the firing upstream alarm that is itself a root).
+        """
+        firing = {alarm['trigger_id']: alarm for alarm in alarms if alarm.get('trigger_id')}
+        upstream_by_alarm = {}
+        for alarm in alarms:
+            upstream = self.upstream(instance_id, alarm['trigger_id']) if alarm.get('trigger_id') else set()
+            upstream_by_alarm[alarm['id']] = upstream
+            alarm['depends_on'] = sorted(upstream)
+            alarm['is_dependent'] = any(t in firing for t in upstream)
+
+        for alarm in alarms:
+            alarm['root_alarm_id'] = None
+            if not alarm['is_dependent']:
+                continue
+            roots = [
+                firing[t] for t in upstream_by_alarm[alarm['id']]
+                if t in firing and not firing[t]['is_dependent']
+            ]
+            if roots:
+                alarm['root_alarm_id'] = min(roots, key=lambda a: a.get('started_at') or '')['id']
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        return {
+            **self.stats,
+            "cached_triggers": {instance_id: len(graph) for instance_id, graph in self.graph.items()}
+        }
+
+# Global trigger dependency cache
+trigger_dependencies = TriggerDependencyCache()
@@ -0,0 +1,94 @@
+"""Ingestion of Zabbix webhook events as alarm deltas."""
+from collections import OrderedDict
+from typing import Dict, Any, Tuple
+import logging
+import time
+
+from .alarm_record import AlarmRecord
+
+logger = logging.getLogger(__name__)
+
+EventKey = Tuple[str, str, int, bool]
+
+class WebhookIngestor:
+    """Apply pushed problem and recovery events to the poller's alarm lists.
+
+    Zabbix retries webhooks that time out and sends one message per action
+    operation, so the same event can arrive several times; events are
+    deduplicated by instance, event id, value and acknowledgement state. A
+    recovery also blocks a late-arriving problem message for the same event.
+    """
+
+    def __init__(self, dedupe_seconds: int = 3600, max_seen: int = 100000):
+        self.dedupe_seconds = dedupe_seconds
+        self.max_seen = max_seen
+        self.poller = None
+        self.seen: "OrderedDict[EventKey, float]" = OrderedDict()
+        self.stats = {"received": 0, "duplicates": 0, "applied": 0, "ignored": 0}
+
+    @staticmethod
+    def _key(event: Dict[str, Any]) -> EventKey:
+        is_problem = event['event_value'] == 1
+        return (event['instance_id'], event['event_id'], event['event_value'], is_problem and bool(event.get('acknowledged')))
+
+    def is_duplicate(self, event: Dict[str, Any]) -> bool:
+        """Check and remember an event; True when it was already received."""
+        self.stats["received"] += 1
+        now = time.monotonic()
+        while self.seen and (
+            len(self.seen) > self.max_seen
+            or next(iter(self.seen.values())) < now - self.dedupe_seconds
+        ):
+            self.seen.popitem(last=False)
+
+        key = self._key(event)
+        recovered = (event['instance_id'], event['event_id'], 0, False)
+        if key in self.seen or recovered in self.seen:
+            self.stats["duplicates"] += 1
+            return True
+        self.seen[key] = now
+        return False
+
+    def forget(self, event: Dict[str, Any]):
+        """Forget an event that could not be processed, so the Zabbix retry is applied."""
+        self.seen.pop(self._key(event), None)
+
+    @staticmethod
+    def to_record(event: Dict[str, Any]) -> AlarmRecord:
+        """Build an alarm record from a problem event."""
+        record = AlarmRecord(
+            event_id=event['event_id'],
+            instance_id=event['instance_id'],
+            instance_name=event['instance_id'],
+            host=event.get('host') or '',
+            description=event.get('name') or 'Unknown problem',
+            severity_code=event.get('severity', 0),
+            clock=int(event.get('clock') or time.time()),
+            acknowledged=bool(event.get('acknowledged')),
+            trigger_id=event.get('trigger_id')
+        )
+        if event.get('host_id'):
+            record.hostids = [event['host_id']]
+        return record
+
+    async def apply(self, event: Dict[str, Any]) -> bool:
+        """Apply an event to the alarm list.
+
+        Returns:
+            Whether the alarm list changed
+        """
+        if self.poller is None:
+            self.stats["ignored"] += 1
+            return False
+
+        record = self.to_record(event) if event['event_value'] == 1 else None
+        changed = await self.poller.apply_push(event['instance_id'], event['event_id'], record)
+        self.stats["applied" if changed else "ignored"] += 1
+        return changed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get ingestion statistics."""
+        return {**self.stats, "tracked_events": len(self.seen)}
+
+# Global webhook ingestor
+webhook_ingestor = WebhookIngestor()
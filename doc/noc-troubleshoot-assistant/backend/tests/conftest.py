@@ -0,0 +1,45 @@
+"""Shared fixtures for the backend unit tests."""
+import pytest
+import pytest_asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from models import Base
+from sqlalchemy import JSON, create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.dialects.postgresql import JSONB
+
+def _use_json_columns():
+    """Store JSONB columns as JSON, which SQLite supports."""
+    for table in Base.metadata.tables.values():
+        for column in table.columns:
+            if isinstance(column.type, JSONB):
+                column.type = JSON()
+
+@pytest.fixture
+def sync_engine():
+    """Create in-memory SQLite database with the application schema."""
+    _use_json_columns()
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+@pytest_asyncio.fixture
+async def async_engine():
+    """Create in-memory aiosqlite database with the application schema."""
+    pytest.importorskip("aiosqlite")
+    _use_json_columns()
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+@pytest_asyncio.fixture
+async def db_session(async_engine):
+    """Open async session on the in-memory database."""
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
@@ -0,0 +1,65 @@
+"""Unit tests for compact alarm records."""
+import pytest
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from services.alarm_record import AlarmRecord, alarm_to_dict, format_duration
+
+PROBLEM = {
+    "eventid": "1001",
+    "objectid": "13501",
+    "name": "Interface Gi0/1 down",
+    "severity": "4",
+    "clock": "1700000000",
+    "acknowledged": "0",
+    "suppressed": "0"
+}
+
+@pytest.fixture
+def record():
+    """Record built from a problem.get row."""
+    return AlarmRecord.from_problem(PROBLEM, "zabbix-1", "Backbone", "router-01")
+
+def test_record_fields(record):
+    """Test problem fields are mapped with severity names."""
+    assert record["id"] == record.event_id == "1001"
+    assert record["host"] == "router-01"
+    assert record["severity"] == "high" and record["severity_code"] == 4
+    assert record["trigger_id"] == "13501"
+    assert record.get("missing", "default") == "default"
+
+def test_record_is_compact(record):
+    """Test records use slots instead of a per-instance dict."""
+    assert not hasattr(record, "__dict__")
+    with pytest.raises(KeyError):
+        record["unknown_field"] = 1
+
+def test_duration_computed_when_read(record):
+    """Test duration reflects the current time, not the poll time."""
+    record.clock = int(time.time()) - 90
+    assert record["duration"] == "1m"
+    record.clock = int(time.time()) - 2 * 3600
+    assert record.to_dict()["duration"] == "2h 0m"
+
+def test_annotations_and_serialization(record):
+    """Test annotation fields can be set and are serialized."""
+    record["incident_id"] = "inc-zabbix-1-1001"
+    data = alarm_to_dict(record)
+
+    assert data["incident_id"] == "inc-zabbix-1-1001"
+    assert data["is_synthetic"] is False
+    assert data["started_at"].startswith("2023-11-1")
+    assert set(dict(record)) == set(data)
+
+def test_synthetic_dicts_pass_through():
+    """Test synthetic alarm dicts are serialized unchanged."""
+    synthetic = {"id": "synthetic-zabbix-1-down", "is_synthetic": True}
+    assert alarm_to_dict(synthetic) is synthetic
+
+def test_format_duration():
+    """Test human-readable durations."""
+    assert format_duration(42) == "42s"
+    assert format_duration(3 * 86400 + 5 * 3600) == "3d 5h"
@@ -0,0 +1,83 @@
+"""Unit tests for shared alarm state and leader-elected polling."""
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from services.alarm_state import AlarmState, MemoryAlarmStore, POLLER_LEASE
+from services.alarm_aggregator import AlarmAggregator
+from services.alarm_record import AlarmRecord
+
+class FakePoller:
+    """Poller publishing a fixed alarm list to its aggregator."""
+
+    poll_interval = 30
+
+    def __init__(self, alarm_aggregator):
+        self.alarm_aggregator = alarm_aggregator
+        self.polls = 0
+
+    def is_due(self):
+        return True
+
+    async def poll_all_instances(self, force=False):
+        self.polls += 1
+        record = AlarmRecord("100", "zabbix-1", "Backbone", "core-rtr-1", "Interface down", 4, 1700000000)
+        record.hostids = ["10"]
+        self.alarm_aggregator.set_zabbix_alarms([record])
+        return 1
+
+def replica(store, name):
+    state = AlarmState(store, lease_seconds=90)
+    state.holder = name
+    state.alarm_aggregator = AlarmAggregator()
+    state.poller = FakePoller(state.alarm_aggregator)
+    return state
+
+@pytest.mark.asyncio
+async def test_only_leader_polls():
+    """Test the second replica loads the leader's alarms instead of polling."""
+    store = MemoryAlarmStore()
+    leader, follower = replica(store, "a"), replica(store, "b")
+
+    await leader.tick()
+    await follower.tick()
+
+    assert leader.is_leader is True and leader.poller.polls == 1
+    assert follower.is_leader is False and follower.poller.polls == 0
+    loaded = follower.alarm_aggregator.get_alarm_by_id("100", "zabbix-1")
+    assert loaded["host"] == "core-rtr-1"
+    assert loaded["hostids"] == ["10"]
+
+@pytest.mark.asyncio
+async def test_follower_takes_over_released_lease():
+    """Test another replica becomes leader once the lease is released."""
+    store = MemoryAlarmStore()
+    leader, follower = replica(store, "a"), replica(store, "b")
+    await leader.tick()
+
+    store.release_lease(POLLER_LEASE, "a")
+    await follower.tick()
+
+    assert follower.is_leader is True and follower.poller.polls == 1
+
+def test_stale_leader_cannot_publish():
+    """Test a replica that lost its lease cannot overwrite the snapshot."""
+    store = MemoryAlarmStore()
+    assert store.acquire_lease(POLLER_LEASE, "a", 0)
+    assert store.acquire_lease(POLLER_LEASE, "b", 90)
+
+    assert store.save([], "a") is None
+    assert store.save([], "b") == 1
+
+def test_record_state_round_trip():
+    """Test records rebuilt from shared state keep annotations and raw clock."""
+    record = AlarmRecord("1", "zabbix-1", "Backbone", "sw-1", "Link down", 5, 1700000000, trigger_id="7")
+    record.in_maintenance = True
+    record.depends_on = ["3"]
+
+    restored = AlarmRecord.from_state(record.to_state())
+
+    assert restored.to_dict() == record.to_dict()
+    assert restored.clock == 1700000000
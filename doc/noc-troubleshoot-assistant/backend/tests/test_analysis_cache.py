@@ -0,0 +1,100 @@
+"""Unit tests for the analysis cache."""
+import pytest
+import sys
+from pathlib import Path
+from datetime import datetime, timedelta
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from models import Investigation, ChatMessage
+from services.analysis_cache import AnalysisCache, normalize_description, alarm_fingerprint
+from services.investigation_service import InvestigationService
+
+pytest.importorskip("aiosqlite")
+
+@pytest.fixture
+def alarm():
+    """Sample recurring alarm."""
+    return {
+        "id": "100",
+        "instance_id": "zabbix-backbone",
+        "host": "router-01",
+        "description": "High CPU utilization (over 90% for 5m)",
+        "severity": "high"
+    }
+
+async def _completed_investigation(db_session, alarm, content, ended_at):
+    investigation = Investigation(
+        alarm_id=alarm['id'],
+        alarm_description=alarm['description'],
+        alarm_severity=alarm['severity'],
+        host_name=alarm['host'],
+        instance_id=alarm['instance_id'],
+        alarm_fingerprint=alarm_fingerprint(alarm),
+        status="completed",
+        ended_at=ended_at
+    )
+    db_session.add(investigation)
+    await db_session.flush()
+    db_session.add(ChatMessage(investigation_id=investigation.id, role="assistant", content=content))
+    await db_session.commit()
+    return investigation
+
+def test_normalize_description_ignores_numbers_and_case():
+    """Test recurring descriptions normalize to the same key."""
+    assert normalize_description("High CPU  utilization (over 90% for 5m)") == \
+        normalize_description("high cpu utilization (over 95.5% for 15m)")
+
+def test_fingerprint_depends_on_host_and_instance(alarm):
+    """Test fingerprint separates hosts and instances."""
+    other_host = {**alarm, "host": "router-02"}
+    other_instance = {**alarm, "instance_id": "zabbix-5gcore"}
+    repeated = {**alarm, "id": "101", "description": "High CPU utilization (over 80% for 5m)"}
+
+    assert alarm_fingerprint(alarm) == alarm_fingerprint(repeated)
+    assert alarm_fingerprint(alarm) != alarm_fingerprint(other_host)
+    assert alarm_fingerprint(alarm) != alarm_fingerprint(other_instance)
+
+@pytest.mark.asyncio
+async def test_lookup_returns_fresh_analysis(db_session, alarm):
+    """Test completed analysis within freshness window is returned."""
+    investigation = await _completed_investigation(db_session, alarm, "Root cause: BGP flap", datetime.utcnow())
+    cache = AnalysisCache(freshness_minutes=60)
+
+    cached = await cache.lookup(db_session, {**alarm, "id": "101"})
+    assert cached is not None
+    assert cached.investigation_id == investigation.id
+    assert cached.content == "Root cause: BGP flap"
+
+@pytest.mark.asyncio
+async def test_lookup_ignores_stale_analysis(db_session, alarm):
+    """Test analyses older than the freshness window are not reused."""
+    await _completed_investigation(db_session, alarm, "Old analysis", datetime.utcnow() - timedelta(hours=3))
+    cache = AnalysisCache(freshness_minutes=60)
+
+    assert await cache.lookup(db_session, alarm) is None
+    assert cache.get_stats()["misses"] == 1
+
+@pytest.mark.asyncio
+async def test_store_and_invalidate(db_session, alarm):
+    """Test in-memory entries are served and can be invalidated."""
+    cache = AnalysisCache()
+    await _completed_investigation(db_session, alarm, "Persisted", datetime.utcnow() - timedelta(hours=3))
+    cache.store(alarm, "inv-1", "Fresh analysis")
+
+    assert (await cache.lookup(db_session, alarm)).content == "Fresh analysis"
+
+    cache.invalidate(alarm)
+    assert await cache.lookup(db_session, alarm) is None
+
+@pytest.mark.asyncio
+async def test_reuse_does_not_extend_freshness(db_session, alarm):
+    """Test copies created on cache hits keep the source's completion time."""
+    source = await _completed_investigation(
+        db_session, alarm, "Root cause: BGP flap", datetime.utcnow() - timedelta(minutes=50)
+    )
+    cached = await AnalysisCache(freshness_minutes=60).lookup(db_session, alarm)
+    await InvestigationService(db_session).create_from_cache(alarm, cached)
+
+    assert (await AnalysisCache(freshness_minutes=60).lookup(db_session, alarm)).investigation_id == source.id
+    assert await AnalysisCache(freshness_minutes=40).lookup(db_session, alarm) is None
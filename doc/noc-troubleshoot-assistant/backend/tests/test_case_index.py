@@ -0,0 +1,114 @@
+"""Unit tests for the similar-case index."""
+import pytest
+import sys
+from pathlib import Path
+from datetime import datetime
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from models import Investigation, ChatMessage
+from services.case_index import CaseIndex, HashingEmbedder, summarize_answer
+from sqlalchemy.orm import Session
+
+@pytest.fixture
+def index():
+    """Index with a few solved cases."""
+    index = CaseIndex(dimensions=256)
+    index.min_score = 0.1
+    index.add_case(
+        "inv-1", "High CPU utilization on router", "router-01", "zabbix-backbone",
+        "**Analysis**: bgpd at 95%\n**Root Cause**: BGP session flapping with peer\n**Recommended Actions**: dampen"
+    )
+    index.add_case(
+        "inv-2", "Interface eth0 down", "switch-02", "zabbix-backbone",
+        "**Root Cause**: Fiber cut on uplink\n**Recommended Actions**: dispatch field team"
+    )
+    index.add_case(
+        "inv-3", "Zabbix agent is not available", "amf-01", "zabbix-5gcore",
+        "**Root Cause**: Agent process crashed after upgrade"
+    )
+    return index
+
+def test_embedder_is_deterministic_and_normalized():
+    """Test embeddings are stable unit vectors."""
+    embedder = HashingEmbedder(128)
+    first = embedder.embed("Interface eth0 down on switch")
+    second = embedder.embed("Interface eth0 down on switch")
+
+    assert (first == second).all()
+    assert abs(float((first * first).sum()) - 1.0) < 1e-5
+
+def test_search_ranks_most_similar_case_first(index):
+    """Test the matching past case is ranked first."""
+    results = index.search({"description": "Interface eth1 down", "host": "switch-02"})
+
+    assert results[0]["investigation_id"] == "inv-2"
+    assert results[0]["summary"].startswith("Fiber cut on uplink")
+    assert results == sorted(results, key=lambda r: -r["similarity"])
+
+def test_search_respects_min_score(index):
+    """Test unrelated alarms return no cases."""
+    index.min_score = 0.9
+    assert index.search({"description": "Disk full on /var", "host": "db-01"}) == []
+
+def test_duplicate_answers_indexed_once(index):
+    """Test answers copied from the analysis cache are not indexed twice."""
+    added = index.add_case(
+        "inv-4", "Interface eth0 down", "switch-02", "zabbix-backbone",
+        "**Root Cause**: Fiber cut on uplink\n**Recommended Actions**: dispatch field team"
+    )
+    assert added is False
+    assert len(index) == 3
+
+def test_matrix_grows_incrementally():
+    """Test many additions keep all rows searchable."""
+    index = CaseIndex(dimensions=64)
+    for i in range(150):
+        index.add_case(f"inv-{i}", f"Alarm number {i}", f"host-{i}", "zabbix-1", f"answer {i}")
+
+    assert len(index) == 150
+    assert index.search({"description": "Alarm number", "host": "host-149"}, top_k=5)
+
+def test_save_and_load_roundtrip(index, tmp_path):
+    """Test index persists compactly and reloads."""
+    index.index_path = tmp_path / "case_index.npz"
+    index.last_indexed_at = datetime(2024, 1, 1, 10, 0)
+    index.save()
+
+    loaded = CaseIndex(dimensions=256, index_path=str(index.index_path))
+    loaded.min_score = 0.1
+    assert loaded.load() is True
+    assert len(loaded) == 3
+    assert loaded.last_indexed_at == datetime(2024, 1, 1, 10, 0)
+    assert loaded.search({"description": "Interface eth0 down", "host": "switch-02"})[0]["investigation_id"] == "inv-2"
+
+def test_summarize_answer_falls_back_to_start():
+    """Test summaries without a root cause section use the answer start."""
+    assert summarize_answer("Plain answer text", max_chars=5) == "Plain"
+
+def test_sync_drops_cases_of_deleted_investigations(sync_engine):
+    """Test investigations removed from the database are dropped from the index on sync."""
+    with Session(sync_engine) as db:
+        investigations = []
+        for number, answer in enumerate(["**Root Cause**: BGP flap", "**Root Cause**: Fiber cut"]):
+            investigation = Investigation(
+                alarm_id=str(number), alarm_description="Interface down", alarm_severity="high",
+                host_name="router-01", instance_id="zabbix-backbone", status="completed",
+                started_at=datetime(2026, 1, 1), ended_at=datetime(2026, 1, 1, number)
+            )
+            db.add(investigation)
+            db.flush()
+            db.add(ChatMessage(investigation_id=investigation.id, role="assistant", content=answer))
+            investigations.append(investigation)
+        db.commit()
+
+        index = CaseIndex(dimensions=64)
+        assert index.sync(db) == 2
+
+        db.delete(investigations[0])
+        db.commit()
+        index.sync(db)
+
+        assert index.case_ids == [str(investigations[1].id)]
+        assert len(index) == 1
+        assert [case['summary'] for case in index.cases] == ["Fiber cut"]
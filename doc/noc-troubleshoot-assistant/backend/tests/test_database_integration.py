@@ -8,13 +8,14 @@ from sqlalchemy import text
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
-from models import Investigation, ChatMessage, ToolCall, Base, engine, SessionLocal
+from models import Investigation, ChatMessage, ToolCall, Base, SessionLocal, get_engine
 
 @pytest.fixture(scope="module")
 def db_connection():
     """Test database connection."""
     # This will use the actual PostgreSQL from docker-compose
     try:
+        engine = get_engine()
         with engine.connect() as conn:
             conn.execute(text("SELECT 1"))
         yield engine
@@ -0,0 +1,69 @@
+"""Unit tests for the streamed investigation history export."""
+import pytest
+import sys
+from pathlib import Path
+from datetime import datetime, timedelta
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from models import Investigation, ChatMessage, ToolCall
+from api.routes.history import export_records
+from sqlalchemy import event
+
+pytest.importorskip("aiosqlite")
+
+@pytest.fixture
+def db_session(db_session, async_engine):
+    """Session on the in-memory database that counts executed statements."""
+    db_session.statements = []
+    event.listen(
+        async_engine.sync_engine, "before_cursor_execute",
+        lambda conn, cursor, statement, *args: db_session.statements.append(statement)
+    )
+    return db_session
+
+async def _add_investigations(db_session, count):
+    now = datetime.utcnow()
+    for i in range(count):
+        investigation = Investigation(
+            alarm_id=str(i),
+            alarm_description=f"Problem {i}",
+            alarm_severity="high",
+            host_name="router-01",
+            instance_id="zabbix-1",
+            started_at=now - timedelta(minutes=i)
+        )
+        db_session.add(investigation)
+        await db_session.flush()
+        db_session.add_all([
+            ChatMessage(investigation_id=investigation.id, role="system", content=f"Start {i}", timestamp=now),
+            ChatMessage(investigation_id=investigation.id, role="assistant", content=f"Answer {i}",
+                        timestamp=now + timedelta(seconds=1)),
+            ToolCall(investigation_id=investigation.id, tool_name="get_hosts", parameters={}, result={}, duration_ms=5)
+        ])
+    await db_session.commit()
+
+@pytest.mark.asyncio
+async def test_export_loads_children_per_batch(db_session):
+    """Test children are loaded with one query per table and batch, not per investigation."""
+    await _add_investigations(db_session, 7)
+    db_session.statements.clear()
+
+    records = [record async for record in export_records(db_session, batch_size=3)]
+
+    assert [r["alarm"]["id"] for r in records] == [str(i) for i in range(7)]
+    assert all([m["role"] for m in r["messages"]] == ["system", "assistant"] for r in records)
+    assert all(len(r["tool_calls"]) == 1 for r in records)
+    # One cursor over investigations plus two child queries for each of the 3 batches
+    child_queries = [s for s in db_session.statements if "IN" in s]
+    assert len(child_queries) == 6
+
+@pytest.mark.asyncio
+async def test_export_filters_by_date(db_session):
+    """Test the date range limits exported investigations."""
+    await _add_investigations(db_session, 5)
+
+    since = datetime.utcnow() - timedelta(minutes=1, seconds=30)
+    records = [record async for record in export_records(db_session, from_date=since)]
+
+    assert [r["alarm"]["id"] for r in records] == ["0", "1"]
@@ -0,0 +1,84 @@
+"""Unit tests for keyset pagination of the investigation history."""
+import pytest
+import pytest_asyncio
+import sys
+from pathlib import Path
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from models import Investigation
+from api.routes import history
+from api.routes.history import list_investigations
+from services.history_pagination import HistoryCounts, encode_cursor, decode_cursor
+from sqlalchemy import select
+
+pytest.importorskip("aiosqlite")
+
+@pytest_asyncio.fixture
+async def db_session(db_session):
+    """Session on the in-memory database with investigations sharing start times."""
+    now = datetime(2026, 10, 1, 12, 0)
+    for i in range(7):
+        db_session.add(Investigation(
+            alarm_id=str(i),
+            alarm_description=f"Problem {i}",
+            alarm_severity="high" if i % 2 else "average",
+            host_name="router-01",
+            instance_id="zabbix-1",
+            # Pairs of investigations start in the same second
+            started_at=now - timedelta(seconds=i // 2)
+        ))
+    await db_session.commit()
+    return db_session
+
+@pytest.fixture
+def counts(monkeypatch):
+    """Fresh count cache used by the history route."""
+    counts = HistoryCounts()
+    monkeypatch.setattr(history, "history_counts", counts)
+    return counts
+
+async def list_page(db_session, cursor=None, severity=None, count="exact"):
+    return await list_investigations(
+        search=None, instance_id=None, severity=severity, from_date=None, to_date=None,
+        cursor=cursor, page=1, limit=3, count=count, sort=None, db=db_session
+    )
+
+def test_cursor_round_trip():
+    """Test cursors decode to the encoded sort key and bad cursors are rejected."""
+    started_at, investigation_id = datetime(2026, 10, 1, 12, 0, 0, 123456), uuid4()
+    assert decode_cursor(encode_cursor(started_at, investigation_id)) == (started_at, investigation_id)
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+@pytest.mark.asyncio
+async def test_cursor_pages_cover_all_rows_once(db_session, counts):
+    """Test following next_cursor visits every investigation once in order, ties included."""
+    seen, cursor = [], None
+    while True:
+        page = await list_page(db_session, cursor)
+        seen.extend(inv["id"] for inv in page["investigations"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    ordered = (await db_session.scalars(
+        select(Investigation.id).order_by(Investigation.started_at.desc(), Investigation.id.desc())
+    )).all()
+    assert seen == list(ordered)
+    assert page["total"] == 7
+
+@pytest.mark.asyncio
+async def test_counts_cached_per_filter(db_session, counts):
+    """Test totals are cached per filter and can be skipped."""
+    assert (await list_page(db_session, severity=["high"]))["total"] == 3
+    assert (await list_page(db_session, severity=["high"]))["total"] == 3
+    assert (await list_page(db_session))["total"] == 7
+    assert counts.get_stats()["hits"] == 1
+    assert counts.get_stats()["misses"] == 2
+
+    page = await list_page(db_session, count="none")
+    assert page["total"] is None
+    assert len(page["investigations"]) == 3
@@ -0,0 +1,124 @@
+"""Unit tests for history partition management and retention."""
+import pytest
+import sys
+from pathlib import Path
+from datetime import date, datetime
+from uuid import uuid4
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from models import ToolCall, ToolResult
+from services.history_retention import (
+    HistoryRetention, add_months, partition_name, parse_partition, expired_partitions
+)
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+class FakeResult:
+    """Result of a fake statement."""
+
+    def __init__(self, rows=(), rowcount=0):
+        self.rows = list(rows)
+        self.rowcount = rowcount
+
+    def __iter__(self):
+        return iter(self.rows)
+
+class FakeSession:
+    """Session recording executed SQL; partition listing returns existing names."""
+
+    def __init__(self, partitions):
+        self.partitions = partitions
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        self.statements.append(sql)
+        if "pg_inherits" in sql:
+            return FakeResult((name,) for name in self.partitions)
+        return FakeResult()
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+def test_month_arithmetic_and_names():
+    """Test month stepping across years and partition name round trip."""
+    assert add_months(date(2026, 11, 15), 2) == date(2027, 1, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    assert partition_name("tool_calls", date(2026, 3, 1)) == "tool_calls_p202603"
+    assert parse_partition("tool_calls_p202603") == ("tool_calls", date(2026, 3, 1))
+    assert parse_partition("tool_calls_default") is None
+
+def test_only_whole_months_past_retention_expire():
+    """Test a month expires once its last day is older than the retention window."""
+    names = ["investigations_p202606", "chat_messages_p202607", "investigations_p202608",
+             "investigations_default", "tool_calls_p202605"]
+
+    assert expired_partitions(names, 90, date(2026, 10, 19)) == [
+        "tool_calls_p202605", "investigations_p202606"
+    ]
+    assert expired_partitions(names, 90, date(2026, 10, 30)) == [
+        "tool_calls_p202605", "investigations_p202606", "chat_messages_p202607"
+    ]
+
+def test_ensure_creates_missing_partitions_ahead():
+    """Test partitions are created for the current and upcoming months only when missing."""
+    session = FakeSession(["investigations_p202610", "chat_messages_p202610", "tool_calls_p202610"])
+    retention = HistoryRetention(months_ahead=1, session_factory=lambda: session)
+
+    created = retention.ensure_partitions(date(2026, 10, 19))
+
+    assert created == ["investigations_p202611", "chat_messages_p202611", "tool_calls_p202611"]
+    assert any(
+        "PARTITION OF investigations FOR VALUES FROM ('2026-11-01 00:00:00+00') TO ('2026-12-01 00:00:00+00')" in sql
+        for sql in session.statements
+    )
+
+@pytest.mark.asyncio
+async def test_follower_creates_current_partitions_at_startup(monkeypatch):
+    """Test every replica creates this and next month's partitions before serving traffic."""
+    from services.alarm_state import alarm_state
+    monkeypatch.setattr(alarm_state, "is_leader", False)
+    session = FakeSession([])
+    retention = HistoryRetention(months_ahead=1, check_interval=3600, session_factory=lambda: session)
+
+    await retention.start()
+    await retention.stop()
+
+    month = date.today().replace(day=1)
+    created = [sql for sql in session.statements if "CREATE TABLE" in sql]
+    assert len(created) == 6
+    assert any(partition_name("investigations", month) in sql for sql in created)
+    assert any(partition_name("tool_calls", add_months(month, 1)) in sql for sql in created)
+
+def test_expire_drops_partitions_and_purges_defaults():
+    """Test expired partitions are dropped whole and default partitions purged by row."""
+    session = FakeSession(["investigations_p202606", "investigations_p202610"])
+    retention = HistoryRetention(retention_days=90, session_factory=lambda: session)
+
+    assert retention.expire(date(2026, 10, 19)) == ["investigations_p202606"]
+    assert "DROP TABLE IF EXISTS investigations_p202606" in session.statements
+    assert not any("investigations_p202610" in sql for sql in session.statements if "DROP" in sql)
+    assert sum(1 for sql in session.statements if sql.startswith("DELETE FROM") and "_default" in sql) == 3
+
+def test_purge_keeps_results_of_partially_expired_month(sync_engine):
+    """Test results used only before the cutoff survive while a kept tool call references them."""
+    old = datetime(2026, 1, 3)
+    with Session(sync_engine) as db:
+        for result_hash in ("referenced", "orphaned"):
+            db.add(ToolResult(
+                hash=result_hash, encoding="zlib", payload=b"", size_bytes=0, created_at=old, last_used_at=old
+            ))
+        # tool_calls_p202601 is kept on Apr 15 with 90 days retention (cutoff Jan 15)
+        db.add(ToolCall(investigation_id=uuid4(), tool_name="host_get", result_hash="referenced", timestamp=old))
+        db.commit()
+
+        retention = HistoryRetention(retention_days=90)
+        assert retention.purge_tool_results(db, datetime(2026, 1, 15)) == 1
+        assert db.scalars(select(ToolResult.hash)).all() == ["referenced"]
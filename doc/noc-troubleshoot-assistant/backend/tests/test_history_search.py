@@ -0,0 +1,61 @@
+"""Unit tests for investigation history search."""
+import pytest
+import pytest_asyncio
+import sys
+from pathlib import Path
+from datetime import datetime, timedelta
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from models import Investigation, ChatMessage
+from api.routes.history import list_investigations
+from services.history_search import HistorySearch
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+pytest.importorskip("aiosqlite")
+
+@pytest_asyncio.fixture
+async def db_session(db_session):
+    """Session on the in-memory database with answered investigations."""
+    now = datetime.utcnow()
+    for i, (host, description, answer) in enumerate([
+        ("core-rtr-01", "BGP session down", "Peer reset after hold timer expired"),
+        ("edge-sw-02", "Interface eth0 down", "Link flap caused by a faulty optic"),
+        ("amf-01", "High CPU utilization", "Registration storm after BGP outage"),
+    ]):
+        investigation = Investigation(
+            alarm_id=str(i), alarm_description=description, alarm_severity="high",
+            host_name=host, instance_id="zabbix-1", started_at=now - timedelta(minutes=i)
+        )
+        db_session.add(investigation)
+        await db_session.flush()
+        db_session.add(ChatMessage(investigation_id=investigation.id, role="assistant", content=answer))
+    await db_session.commit()
+    return db_session
+
+async def search(db_session, text):
+    page = await list_investigations(
+        search=text, instance_id=None, severity=None, from_date=None, to_date=None,
+        cursor=None, page=1, limit=20, count="exact", sort=None, db=db_session
+    )
+    return [inv["host_name"] for inv in page["investigations"]]
+
+@pytest.mark.asyncio
+async def test_search_matches_alarm_host_and_answer(db_session):
+    """Test search finds investigations by description, partial host name and answer text."""
+    assert await search(db_session, "BGP") == ["core-rtr-01", "amf-01"]
+    assert await search(db_session, "sw-0") == ["edge-sw-02"]
+    assert await search(db_session, "optic") == ["edge-sw-02"]
+    assert await search(db_session, "  ") == ["core-rtr-01", "edge-sw-02", "amf-01"]
+
+def test_postgres_search_uses_indexed_expressions():
+    """Test the PostgreSQL query repeats the indexed expressions with an inline text search config."""
+    searcher = HistorySearch("bgp flap", "postgresql")
+    sql = str(select(Investigation.id).where(Investigation.id.in_(searcher.matching_ids())).compile(
+        dialect=postgresql.dialect()
+    ))
+
+    assert "to_tsvector('english'::regconfig, chat_messages.content) @@ websearch_to_tsquery(" in sql
+    assert "investigations.search_vector @@ websearch_to_tsquery('english'::regconfig" in sql
+    assert "investigations.host_name ILIKE" in sql
@@ -0,0 +1,110 @@
+"""Unit tests for alarm storm correlation."""
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from services.incident_correlator import IncidentCorrelator, alarm_signature
+
+def alarm(alarm_id, host, description, started_at="2024-01-01T10:00:00", instance_id="zabbix-1", **extra):
+    return {
+        "id": alarm_id,
+        "instance_id": instance_id,
+        "host": host,
+        "description": f"{host}: {description}",
+        "severity": "high",
+        "severity_code": 4,
+        "started_at": started_at,
+        **extra
+    }
+
+@pytest.fixture
+def correlator():
+    """Correlator with a five minute window."""
+    return IncidentCorrelator(time_window_seconds=300)
+
+def test_signature_strips_host_and_numbers():
+    """Test the same symptom on different hosts compares equal."""
+    first = alarm("1", "router-01", "Interface Gi0/1 down, 95% loss")
+    second = alarm("2", "router-02", "Interface Gi0/1 down, 40% loss")
+
+    assert alarm_signature(first) == alarm_signature(second)
+
+def test_storm_grouped_by_similar_description(correlator):
+    """Test the same symptom across hosts within the window forms one incident."""
+    alarms = [alarm(str(i), f"switch-{i:02d}", "Uplink port down") for i in range(10)]
+    correlator.update(alarms)
+
+    incidents = correlator.get_incidents()
+    assert len(incidents) == 1
+    assert incidents[0]["alarm_count"] == 10
+    assert all(a["incident_size"] == 10 for a in alarms)
+
+def test_same_host_alarms_grouped(correlator):
+    """Test different symptoms on one host are grouped."""
+    correlator.update([
+        alarm("1", "router-01", "BGP peer down"),
+        alarm("2", "router-01", "High CPU utilization", started_at="2024-01-01T10:02:00"),
+    ])
+
+    assert len(correlator.get_incidents()) == 1
+
+def test_time_window_and_instances_separate(correlator):
+    """Test alarms far apart in time or on other instances stay separate."""
+    correlator.update([
+        alarm("1", "router-01", "BGP peer down"),
+        alarm("2", "router-01", "High CPU utilization", started_at="2024-01-01T12:00:00"),
+        alarm("3", "router-01", "BGP peer down", instance_id="zabbix-2"),
+    ])
+
+    assert correlator.get_incidents() == []
+    assert correlator.get_stats()["incidents"] == 3
+
+def test_shared_host_group_does_not_link(correlator):
+    """Test unrelated alarms on hosts of one broad group stay separate."""
+    correlator.update([
+        alarm("1", "web-01", "Disk space low", host_groups=["2"]),
+        alarm("2", "db-04", "Replication lag high", host_groups=["2"]),
+    ])
+
+    assert correlator.get_incidents() == []
+
+def test_trigger_dependency_links_and_picks_root(correlator):
+    """Test dependent alarms join the upstream alarm, which becomes the root."""
+    core = alarm("1", "core-01", "Link to PE down", started_at="2024-01-01T10:01:00", trigger_id="100")
+    edge = alarm("2", "pe-07", "Host unreachable", trigger_id="200", depends_on=["100"])
+    correlator.update([core, edge])
+
+    incident = correlator.get_incident_for_alarm("2", "zabbix-1")
+    assert len(incident) == 2
+    assert correlator.root_alarm(incident)["id"] == "1"
+
+def test_incremental_updates_keep_incident(correlator):
+    """Test incidents persist across polls and shrink as alarms clear."""
+    first = [alarm("1", "sw-01", "Uplink port down"), alarm("2", "sw-02", "Uplink port down")]
+    correlator.update(first)
+    incident_id = first[0]["incident_id"]
+
+    second = first + [alarm("3", "sw-03", "Uplink port down", started_at="2024-01-01T10:03:00")]
+    correlator.update(second)
+    assert second[2]["incident_id"] == incident_id
+
+    correlator.update(second[1:])
+    assert correlator.incidents[incident_id].alarm_keys == [("zabbix-1", "2"), ("zabbix-1", "3")]
+
+def test_new_alarm_bridging_incidents_merges_them(correlator):
+    """Test an alarm related to two incidents merges them."""
+    correlator.update([
+        alarm("1", "pe-01", "BGP peer down"),
+        alarm("2", "pe-02", "High memory usage"),
+    ])
+    assert correlator.get_stats()["incidents"] == 2
+
+    correlator.update([
+        alarm("1", "pe-01", "BGP peer down"),
+        alarm("2", "pe-02", "High memory usage"),
+        alarm("3", "pe-02", "BGP peer down", started_at="2024-01-01T10:01:00"),
+    ])
+    assert correlator.get_stats()["incidents"] == 1
+    assert correlator.get_incidents()[0]["alarm_count"] == 3
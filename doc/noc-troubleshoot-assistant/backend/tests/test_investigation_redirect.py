@@ -0,0 +1,41 @@
+"""Unit tests for investigating dependent alarms through their root alarm."""
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from api.routes import chat
+from schemas import InvestigateRequest
+from services.alarm_aggregator import AlarmAggregator
+from services.incident_correlator import IncidentCorrelator
+
+pytest.importorskip("aiosqlite")
+
+@pytest.fixture
+def alarms(monkeypatch):
+    """Upstream link alarm and a BGP alarm depending on it."""
+    aggregator = AlarmAggregator()
+    aggregator.set_zabbix_alarms([
+        {"id": "1", "instance_id": "zabbix-1", "host": "router-01", "description": "Link down",
+         "severity": "high", "root_alarm_id": None},
+        {"id": "2", "instance_id": "zabbix-1", "host": "router-02", "description": "BGP peer down",
+         "severity": "average", "root_alarm_id": "1"},
+    ])
+    monkeypatch.setattr(chat, "alarm_aggregator", aggregator)
+    monkeypatch.setattr(chat, "incident_correlator", IncidentCorrelator())
+    return aggregator
+
+@pytest.mark.asyncio
+async def test_redirect_to_root_alarm_reported(db_session, alarms):
+    """Test the clicked alarm is returned when its root alarm is investigated instead."""
+    result = await chat.create_investigation(InvestigateRequest(alarm_id="2", instance_id="zabbix-1"), db=db_session)
+    assert result["alarm"]["id"] == "1"
+    assert result["redirected_from"]["id"] == "2"
+    assert result["redirect_reason"] == "dependency"
+
+    # The root alarm itself is investigated without a redirect, sharing the run
+    result = await chat.create_investigation(InvestigateRequest(alarm_id="1", instance_id="zabbix-1"), db=db_session)
+    assert result["alarm"]["id"] == "1"
+    assert result["redirected_from"] is None
+    assert result["deduplicated"]
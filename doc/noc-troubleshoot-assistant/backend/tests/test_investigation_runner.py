@@ -0,0 +1,163 @@
+"""Unit tests for background investigation runs."""
+import pytest
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+from types import SimpleNamespace
+from uuid import UUID
+import json
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from config import ConfigLoader
+from api.routes import chat
+from services import investigation_runner
+from services.investigation_runner import run_investigation
+from services.analysis_cache import AnalysisCache
+from services.bedrock_agent import NetworkTroubleshootAgent
+from services.investigation_scheduler import InvestigationScheduler
+from services.investigation_scheduler import SchedulerBusy
+from services.investigation_service import InvestigationService
+from services.investigation_stream import InvestigationStream, ResponseBuffer, stream_registry
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+pytest.importorskip("aiosqlite")
+
+@pytest.fixture
+def session_factory(async_engine, monkeypatch):
+    """Route the runner's sessions to the in-memory database."""
+    factory = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(investigation_runner, "async_session", factory)
+    return factory
+
+@pytest.fixture
+def alarm():
+    """Sample alarm."""
+    return {
+        "id": "100",
+        "instance_id": "zabbix-backbone",
+        "host": "router-01",
+        "description": "Interface down",
+        "severity": "high"
+    }
+
+class FullScheduler:
+    """Scheduler whose queue is always full."""
+
+    @asynccontextmanager
+    async def slot(self, alarm, stream=None, origin="operator"):
+        raise SchedulerBusy("Investigation queue is full (0 waiting)")
+        yield
+
+@pytest.mark.asyncio
+async def test_rejected_run_cancels_investigation(session_factory, alarm, monkeypatch):
+    """Test a run rejected by the scheduler is neither left in progress nor counted as a failure."""
+    monkeypatch.setattr(investigation_runner, "investigation_scheduler", FullScheduler())
+
+    async with session_factory() as db:
+        inv_id = UUID(await InvestigationService(db).create_investigation(alarm))
+
+    stream = InvestigationStream(inv_id, ResponseBuffer())
+    await run_investigation(stream, alarm, mcp_client=None)
+
+    assert stream.status == "failed"
+    async with session_factory() as db:
+        inv_service = InvestigationService(db)
+        investigation = await inv_service.get_investigation(inv_id)
+        assert investigation.status == "cancelled"
+        assert await inv_service.find_running_investigation(alarm) is None
+        assert await inv_service.count_recent_failures(investigation.alarm_fingerprint) == 0
+
+def _payload(event: str):
+    """Decode the data line of a server-sent event."""
+    return json.loads(event.split("data: ", 1)[1])
+
+@pytest.mark.asyncio
+async def test_stream_relays_run_claimed_by_another_replica(session_factory, alarm, monkeypatch):
+    """Test a replica without the run claim follows checkpoints instead of running the model again."""
+    monkeypatch.setattr(chat, "async_session", session_factory)
+    monkeypatch.setattr(ConfigLoader, "stream_checkpoint_seconds", property(lambda self: 0))
+
+    async with session_factory() as db:
+        inv_service = InvestigationService(db)
+        inv_id = UUID(await inv_service.create_investigation(alarm))
+        assert await inv_service.claim_run(inv_id, "backend-other", 60)
+        message = await inv_service.add_message(inv_id, "assistant", "Link flap")
+
+    events = chat._follow_checkpoints(inv_id, alarm, 0, mcp_client=None)
+    assert _payload(await anext(events)) == {"type": "content", "text": "Link flap"}
+
+    async with session_factory() as db:
+        inv_service = InvestigationService(db)
+        await inv_service.update_message_content(message.id, "Link flap on ge-0/0/1")
+        await inv_service.complete_investigation(inv_id)
+
+    assert [_payload(event) async for event in events] == [
+        {"type": "content", "text": " on ge-0/0/1"},
+        {"type": "done"}
+    ]
+    assert stream_registry.get(inv_id) is None
+
+class FakeStrandsAgent:
+    """Strands agent streaming a fixed answer and usage event."""
+
+    def __init__(self, usage):
+        self.usage = usage
+
+    async def stream_async(self, prompt):
+        yield {"data": "Root cause: "}
+        yield {"data": "link flap"}
+        metrics = SimpleNamespace(accumulated_usage=self.usage, cycle_count=2)
+        yield {"result": SimpleNamespace(metrics=metrics)}
+
+class RecordingCaseIndex:
+    """Case index recording indexed investigations."""
+
+    def __init__(self):
+        self.cases = []
+
+    def add_case(self, investigation_id, *args):
+        self.cases.append(investigation_id)
+
+@pytest.mark.asyncio
+async def test_usage_metrics_saved_with_investigation(session_factory, alarm, monkeypatch):
+    """Test token usage and prompt cache hit rate of a run end up in investigations.metrics."""
+    agent = NetworkTroubleshootAgent.__new__(NetworkTroubleshootAgent)
+    agent.model_ids = {"fast": "fast-model", "strong": "strong-model"}
+    agent._new_agent = lambda tier: FakeStrandsAgent({
+        "inputTokens": 300, "outputTokens": 120,
+        "cacheReadInputTokens": 600, "cacheWriteInputTokens": 100
+    })
+
+    async def context_only(alarm, mcp_client):
+        return {"alarm": alarm}
+
+    monkeypatch.setattr(ConfigLoader, "mcp_server_url", property(lambda self: "http://mcp"))
+    monkeypatch.setattr(investigation_runner, "get_agent", lambda url: agent)
+    monkeypatch.setattr(investigation_runner, "build_context", context_only)
+    monkeypatch.setattr(investigation_runner, "investigation_scheduler", InvestigationScheduler())
+    monkeypatch.setattr(investigation_runner, "analysis_cache", AnalysisCache())
+    monkeypatch.setattr(investigation_runner, "case_index", RecordingCaseIndex())
+
+    async with session_factory() as db:
+        inv_id = UUID(await InvestigationService(db).create_investigation(alarm))
+
+    stream = InvestigationStream(inv_id, ResponseBuffer())
+    await run_investigation(stream, alarm, mcp_client=None)
+
+    assert stream.status == "completed"
+    async with session_factory() as db:
+        investigation = await InvestigationService(db).get_investigation(inv_id)
+    assert investigation.status == "completed"
+    assert {key: investigation.metrics[key] for key in (
+        "input_tokens", "output_tokens", "cache_read_tokens", "cache_write_tokens", "cache_hit_rate", "cycles", "model_tier", "model_id"
+    )} == {
+        "input_tokens": 300,
+        "output_tokens": 120,
+        "cache_read_tokens": 600,
+        "cache_write_tokens": 100,
+        "cache_hit_rate": 0.6,
+        "cycles": 2,
+        "model_tier": "strong",
+        "model_id": "strong-model"
+    }
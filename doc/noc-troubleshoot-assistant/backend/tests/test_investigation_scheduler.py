@@ -0,0 +1,141 @@
+"""Unit tests for the investigation scheduler."""
+import pytest
+import asyncio
+import sys
+from pathlib import Path
+from uuid import uuid4
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from services.investigation_scheduler import InvestigationScheduler, SchedulerBusy
+from services.investigation_stream import InvestigationStream, ResponseBuffer
+from services.alarm_record import alarm_from_investigation
+from models import Investigation
+
+def alarm(instance_id="zabbix-1", severity_code=3):
+    return {"instance_id": instance_id, "severity_code": severity_code}
+
+async def hold(scheduler, order, name, release, **kwargs):
+    """Run a fake investigation that holds its slot until released."""
+    async with scheduler.slot(**kwargs):
+        order.append(name)
+        await release.wait()
+
+@pytest.mark.asyncio
+async def test_global_limit_and_severity_priority():
+    """Test queued runs start by severity, operator requests first."""
+    scheduler = InvestigationScheduler(max_concurrent=1, max_per_instance=5)
+    order, release = [], asyncio.Event()
+
+    first = asyncio.create_task(hold(scheduler, order, "first", release, alarm=alarm()))
+    await asyncio.sleep(0)
+    tasks = [
+        asyncio.create_task(hold(scheduler, order, "warning", release, alarm=alarm(severity_code=2))),
+        asyncio.create_task(hold(scheduler, order, "disaster-auto", release, alarm=alarm(severity_code=5), origin="auto")),
+        asyncio.create_task(hold(scheduler, order, "disaster", release, alarm=alarm(severity_code=5))),
+    ]
+    await asyncio.sleep(0)
+    assert order == ["first"]
+    assert scheduler.get_stats()["waiting"] == 3
+
+    release.set()
+    await asyncio.gather(first, *tasks)
+    assert order == ["first", "disaster", "disaster-auto", "warning"]
+    assert scheduler.get_stats()["running"] == 0
+
+@pytest.mark.asyncio
+async def test_resumed_operator_run_ahead_of_queued_auto_run():
+    """Test an operator run rebuilt from its stored investigation keeps its severity priority."""
+    scheduler = InvestigationScheduler(max_concurrent=1, max_per_instance=5)
+    order, release = [], asyncio.Event()
+    stored = Investigation(
+        alarm_id="100", alarm_description="Link down", alarm_severity="disaster",
+        host_name="router-01", instance_id="zabbix-1"
+    )
+
+    first = asyncio.create_task(hold(scheduler, order, "first", release, alarm=alarm()))
+    await asyncio.sleep(0)
+    tasks = [
+        asyncio.create_task(hold(scheduler, order, "auto", release, alarm=alarm(severity_code=5), origin="auto")),
+        asyncio.create_task(hold(scheduler, order, "operator", release, alarm=alarm_from_investigation(stored))),
+    ]
+    await asyncio.sleep(0)
+
+    release.set()
+    await asyncio.gather(first, *tasks)
+    assert order == ["first", "operator", "auto"]
+
+@pytest.mark.asyncio
+async def test_per_instance_limit_does_not_block_other_instances():
+    """Test an instance at its cap does not hold up other instances."""
+    scheduler = InvestigationScheduler(max_concurrent=3, max_per_instance=1)
+    order, release = [], asyncio.Event()
+
+    tasks = [
+        asyncio.create_task(hold(scheduler, order, "a1", release, alarm=alarm("a"))),
+        asyncio.create_task(hold(scheduler, order, "a2", release, alarm=alarm("a"))),
+        asyncio.create_task(hold(scheduler, order, "b1", release, alarm=alarm("b"))),
+    ]
+    await asyncio.sleep(0)
+    assert order == ["a1", "b1"]
+    assert scheduler.get_stats()["running_by_instance"] == {"a": 1, "b": 1}
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert order == ["a1", "b1", "a2"]
+
+@pytest.mark.asyncio
+async def test_queue_position_reported_to_stream():
+    """Test waiting streams learn their position and are cleared on start."""
+    scheduler = InvestigationScheduler(max_concurrent=1)
+    order, release = [], asyncio.Event()
+    stream = InvestigationStream(uuid4(), ResponseBuffer())
+
+    first = asyncio.create_task(hold(scheduler, order, "first", release, alarm=alarm()))
+    await asyncio.sleep(0)
+    queued = asyncio.create_task(hold(scheduler, order, "queued", release, alarm=alarm(), stream=stream))
+    await asyncio.sleep(0)
+
+    positions = stream.follow_queue()
+    assert await positions.__anext__() == 1
+    release.set()
+    await asyncio.gather(first, queued)
+    assert stream.queue_position is None
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects():
+    """Test runs beyond the queue size are rejected instead of waiting."""
+    scheduler = InvestigationScheduler(max_concurrent=1, max_queue=1)
+    order, release = [], asyncio.Event()
+
+    tasks = [asyncio.create_task(hold(scheduler, order, str(i), release, alarm=alarm())) for i in range(2)]
+    await asyncio.sleep(0)
+    assert not scheduler.has_capacity()
+
+    with pytest.raises(SchedulerBusy):
+        async with scheduler.slot(alarm()):
+            pass
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert scheduler.get_stats()["rejected"] == 1
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_leaves_queue():
+    """Test a cancelled queued run frees its place."""
+    scheduler = InvestigationScheduler(max_concurrent=1)
+    order, release = [], asyncio.Event()
+
+    first = asyncio.create_task(hold(scheduler, order, "first", release, alarm=alarm()))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(hold(scheduler, order, "waiter", release, alarm=alarm()))
+    await asyncio.sleep(0)
+
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert scheduler.get_stats()["waiting"] == 0
+
+    release.set()
+    await first
+    assert scheduler.get_stats()["running"] == 0
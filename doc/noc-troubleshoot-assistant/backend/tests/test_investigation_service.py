@@ -0,0 +1,104 @@
+"""Unit tests for the async investigation service."""
+import pytest
+import sys
+from pathlib import Path
+from uuid import UUID
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from services.investigation_service import InvestigationService
+from sqlalchemy import event
+
+pytest.importorskip("aiosqlite")
+
+@pytest.fixture
+def inv_service(db_session):
+    """Create service on the in-memory database."""
+    return InvestigationService(db_session)
+
+@pytest.fixture
+def alarm():
+    """Sample alarm."""
+    return {
+        "id": "100",
+        "instance_id": "zabbix-backbone",
+        "host": "router-01",
+        "description": "Interface down",
+        "severity": "high"
+    }
+
+@pytest.mark.asyncio
+async def test_create_and_checkpoint_investigation(inv_service, alarm):
+    """Test an investigation is created, its answer checkpointed and completed."""
+    inv_id = await inv_service.create_investigation(alarm)
+    investigation = await inv_service.find_running_investigation(alarm)
+    assert str(investigation.id) == inv_id
+
+    message = await inv_service.add_message(investigation.id, "assistant", "")
+    await inv_service.update_message_content(message.id, "Root cause: link flap")
+    await inv_service.save_metrics(investigation.id, {"model_tier": "fast"})
+    await inv_service.complete_investigation(investigation.id)
+
+    last = await inv_service.get_last_message(investigation.id, "assistant")
+    assert last.content == "Root cause: link flap"
+    investigation = await inv_service.get_investigation(investigation.id)
+    assert investigation.status == "completed"
+    assert investigation.metrics == {"model_tier": "fast"}
+    assert await inv_service.find_running_investigation(alarm) is None
+
+@pytest.mark.asyncio
+async def test_failed_investigations_counted(inv_service, alarm):
+    """Test failures are counted per alarm fingerprint."""
+    for _ in range(2):
+        await inv_service.create_investigation(alarm, origin="auto")
+        investigation = await inv_service.find_investigation_for_alarm(alarm, origin="auto")
+        await inv_service.fail_investigation(investigation.id)
+
+    investigation = await inv_service.get_investigation(investigation.id)
+    assert investigation.status == "failed"
+    assert await inv_service.find_investigation_for_alarm(alarm) is None
+    assert await inv_service.count_recent_failures(investigation.alarm_fingerprint) == 2
+
+@pytest.mark.asyncio
+async def test_create_with_system_message_in_one_transaction(inv_service, alarm):
+    """Test the investigation and its system message are written with a single commit."""
+    commits = []
+    event.listen(inv_service.db.get_bind(), "commit", commits.append)
+
+    inv_id = await inv_service.create_investigation(alarm, system_message="Starting investigation for: Interface down")
+
+    assert len(commits) == 1
+    investigation = await inv_service.get_investigation(UUID(inv_id))
+    assert investigation.status == "in_progress"
+    assert investigation.origin == "operator"
+    message = await inv_service.get_last_message(investigation.id, "system")
+    assert message.content == "Starting investigation for: Interface down"
+
+@pytest.mark.asyncio
+async def test_run_claimed_by_one_replica(inv_service, alarm):
+    """Test only one replica holds a run until its claim lapses or the run ends."""
+    inv_id = UUID(await inv_service.create_investigation(alarm))
+
+    assert await inv_service.claim_run(inv_id, "backend-a", 60)
+    assert not await inv_service.claim_run(inv_id, "backend-b", 60)
+    assert await inv_service.claim_run(inv_id, "backend-a", 60)
+
+    # An unrenewed claim is taken over
+    assert await inv_service.claim_run(inv_id, "backend-a", -1)
+    assert await inv_service.claim_run(inv_id, "backend-b", 60)
+
+    await inv_service.complete_investigation(inv_id)
+    assert not await inv_service.claim_run(inv_id, "backend-b", 60)
+
+@pytest.mark.asyncio
+async def test_refresh_request_survives_metrics(inv_service, alarm):
+    """Test the refresh flag is kept when the run stores its metrics."""
+    inv_id = UUID(await inv_service.create_investigation(alarm, refresh=True))
+    await inv_service.save_metrics(inv_id, {"model_tier": "strong"})
+
+    investigation = await inv_service.get_investigation(inv_id)
+    assert investigation.refresh_requested
+    assert investigation.metrics == {"model_tier": "strong"}
+
+    other_id = UUID(await inv_service.create_investigation(alarm))
+    assert not (await inv_service.get_investigation(other_id)).refresh_requested
@@ -0,0 +1,93 @@
+"""Unit tests for investigation streaming buffers."""
+import pytest
+import asyncio
+import sys
+from pathlib import Path
+from uuid import uuid4
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from services.investigation_stream import ResponseBuffer, InvestigationStream, StreamRegistry
+
+def test_buffer_accumulates_chunks():
+    """Test buffer joins chunks and tracks length."""
+    buffer = ResponseBuffer()
+    for chunk in ["Root ", "cause: ", "", "link down"]:
+        buffer.append(chunk)
+
+    assert len(buffer) == len("Root cause: link down")
+    assert buffer.text() == "Root cause: link down"
+
+def test_buffer_text_from_offset():
+    """Test slicing from offsets inside and across chunks."""
+    buffer = ResponseBuffer()
+    for chunk in ["abc", "def", "ghi"]:
+        buffer.append(chunk)
+
+    assert buffer.text_from(0) == "abcdefghi"
+    assert buffer.text_from(3) == "defghi"
+    assert buffer.text_from(4) == "efghi"
+    assert buffer.text_from(9) == ""
+    assert buffer.text_from(20) == ""
+
+def test_buffer_checkpoint_by_size():
+    """Test checkpoint triggers after enough new characters."""
+    buffer = ResponseBuffer(checkpoint_chars=5, checkpoint_seconds=3600)
+    assert buffer.needs_checkpoint() is False
+
+    buffer.append("abc")
+    assert buffer.needs_checkpoint() is False
+
+    buffer.append("def")
+    assert buffer.needs_checkpoint() is True
+
+    buffer.mark_checkpoint()
+    assert buffer.persisted_offset == 6
+    assert buffer.needs_checkpoint() is False
+
+def test_buffer_checkpoint_by_time():
+    """Test checkpoint triggers on interval when content is pending."""
+    buffer = ResponseBuffer(checkpoint_chars=1000, checkpoint_seconds=0)
+    assert buffer.needs_checkpoint() is False
+
+    buffer.append("x")
+    assert buffer.needs_checkpoint() is True
+
+@pytest.mark.asyncio
+async def test_stream_follow_resumes_from_offset():
+    """Test subscribers receive live output from their offset."""
+    stream = InvestigationStream(uuid4(), ResponseBuffer())
+    stream.append("hello ")
+
+    async def produce():
+        await asyncio.sleep(0)
+        stream.append("world")
+        stream.complete()
+
+    task = asyncio.create_task(produce())
+    pieces = [piece async for piece in stream.follow(3)]
+    await task
+
+    assert "".join(text for _, text in pieces) == "lo world"
+    assert pieces[-1][0] == len("hello world")
+    assert stream.status == "completed"
+
+@pytest.mark.asyncio
+async def test_registry_reuses_running_stream():
+    """Test a second start attaches to the existing run."""
+    registry = StreamRegistry()
+    investigation_id = uuid4()
+    started = []
+
+    async def producer(stream):
+        started.append(stream)
+        stream.append("done")
+        stream.complete()
+
+    first = registry.start(investigation_id, producer, ResponseBuffer())
+    second = registry.start(investigation_id, producer, ResponseBuffer())
+    await first.task
+
+    assert first is second
+    assert len(started) == 1
+    assert registry.get_stats()["running"] == 0
@@ -0,0 +1,94 @@
+"""Unit tests for maintenance window awareness."""
+import pytest
+import sys
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from services.maintenance_index import MaintenanceIndex, window_active
+
+def ts(value: str) -> str:
+    return str(int(datetime.fromisoformat(value).timestamp()))
+
+def window(timeperiods, maintenanceid="1", **extra):
+    return {
+        "maintenanceid": maintenanceid,
+        "name": "Core upgrade",
+        "maintenance_type": "0",
+        "active_since": ts("2024-01-01T00:00:00"),
+        "active_till": ts("2030-01-01T00:00:00"),
+        "timeperiods": timeperiods,
+        **extra
+    }
+
+class FakeMCPClient:
+    """MCP client returning fixed maintenance windows and group members."""
+
+    def __init__(self, windows, hosts=None):
+        self.windows = windows
+        self.hosts = hosts or []
+        self.calls = 0
+
+    async def get_maintenances(self, instance_id, **params):
+        self.calls += 1
+        return {"success": True, "data": self.windows}
+
+    async def get_hosts(self, instance_id, **params):
+        return {"success": True, "data": self.hosts}
+
+def test_one_time_period():
+    """Test a one-time window is active only within its period."""
+    w = window([{"timeperiod_type": "0", "start_date": ts("2024-03-01T22:00:00"), "period": "7200"}])
+
+    assert window_active(w, datetime(2024, 3, 1, 23, 0))
+    assert not window_active(w, datetime(2024, 3, 2, 0, 30))
+
+def test_weekly_period_crossing_midnight():
+    """Test a weekly Sunday 23:00 window still applies after midnight."""
+    # dayofweek bit 6 = Sunday; 2024-03-03 is a Sunday
+    w = window([{"timeperiod_type": "3", "every": "1", "dayofweek": str(1 << 6), "start_time": str(23 * 3600), "period": "7200"}])
+
+    assert window_active(w, datetime(2024, 3, 4, 0, 30))
+    assert not window_active(w, datetime(2024, 3, 4, 2, 30))
+    assert not window_active(w, datetime(2024, 3, 5, 0, 30))
+
+def test_monthly_last_weekday():
+    """Test monthly windows on the last given weekday of the month."""
+    # Every month, last Friday (bit 4) at 02:00 for one hour; 2024-03-29 is the last Friday
+    w = window([{"timeperiod_type": "4", "every": "5", "month": "4095", "dayofweek": str(1 << 4), "day": "0",
+                 "start_time": str(2 * 3600), "period": "3600"}])
+
+    assert window_active(w, datetime(2024, 3, 29, 2, 30))
+    assert not window_active(w, datetime(2024, 3, 22, 2, 30))
+
+@pytest.mark.asyncio
+async def test_annotate_hosts_and_group_members():
+    """Test alarms on hosts in a window, directly or via host group, are flagged."""
+    always = [{"timeperiod_type": "0", "start_date": ts("2024-01-01T00:00:00"), "period": str(10 * 365 * 86400)}]
+    client = FakeMCPClient(
+        [
+            window(always, "1", hosts=[{"hostid": "10", "host": "router-01", "name": "Router 01"}]),
+            window(always, "2", hostgroups=[{"groupid": "7", "name": "Access"}]),
+        ],
+        hosts=[{"hostid": "20", "host": "sw-09", "name": "sw-09", "hostgroups": [{"groupid": "7"}]}]
+    )
+    index = MaintenanceIndex()
+    await index.refresh(client, "zabbix-1")
+
+    alarms = [{"host": "router-01"}, {"host": "SW-09"}, {"host": "pe-01"}]
+    index.annotate("zabbix-1", alarms)
+
+    assert alarms[0]["in_maintenance"] and alarms[0]["maintenance"]["id"] == "1"
+    assert alarms[1]["maintenance"]["id"] == "2"
+    assert not alarms[2]["in_maintenance"] and alarms[2]["maintenance"] is None
+
+@pytest.mark.asyncio
+async def test_refresh_if_due_uses_cache():
+    """Test windows are fetched once per refresh interval."""
+    client = FakeMCPClient([])
+    index = MaintenanceIndex(refresh_interval=300)
+
+    await index.refresh_if_due(client, "zabbix-1")
+    await index.refresh_if_due(client, "zabbix-1")
+    assert client.calls == 1
@@ -0,0 +1,57 @@
+"""Unit tests for model tier routing."""
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from services.model_router import ModelRouter, FAST, STRONG
+
+RUNBOOK = {"runbook": "interface-down", "title": "Interface Down", "path": "by-trigger/interface-down.md"}
+
+@pytest.fixture
+def router():
+    """Router with default severity policy."""
+    return ModelRouter()
+
+@pytest.mark.parametrize("severity,tier", [
+    ("disaster", STRONG),
+    ("high", STRONG),
+    ("warning", FAST),
+    ("information", FAST),
+])
+def test_severity_routing(router, severity, tier):
+    """Test disaster/high escalate and low severities stay on the fast model."""
+    assert router.select({"severity": severity}, {}).tier == tier
+
+def test_average_alarm_with_runbook_uses_fast_model(router):
+    """Test well-known mid-severity alarms go to the fast model."""
+    decision = router.select({"severity": "average"}, {"runbook": RUNBOOK})
+
+    assert decision.tier == FAST
+    assert "interface-down" in decision.reason
+
+def test_average_alarm_with_similar_case_uses_fast_model(router):
+    """Test a close past case counts as well known."""
+    context = {"similar_cases": [{"similarity": 0.92}]}
+    assert router.select({"severity": "average"}, context).tier == FAST
+
+def test_unknown_average_alarm_escalates(router):
+    """Test mid-severity alarms without prior knowledge use the strong model."""
+    context = {"runbook": None, "similar_cases": [{"similarity": 0.5}]}
+    assert router.select({"severity": "average"}, context).tier == STRONG
+
+def test_unresolved_cases_escalate(router):
+    """Test refreshes and recent failures override a low severity."""
+    alarm = {"severity": "warning"}
+
+    assert router.select(alarm, {}, refresh=True).tier == STRONG
+    assert router.select(alarm, {}, prior_failures=2).tier == STRONG
+
+def test_routing_disabled(router):
+    """Test disabled routing always uses the fast tier."""
+    router.enabled = False
+    assert router.select({"severity": "disaster"}, {}).to_dict() == {
+        "model_tier": FAST,
+        "routing_reason": "routing disabled"
+    }
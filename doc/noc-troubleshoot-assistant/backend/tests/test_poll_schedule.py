@@ -0,0 +1,70 @@
+"""Unit tests for adaptive polling intervals."""
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from services.poll_schedule import AdaptiveInterval, PollSchedule
+from services.alarm_poller import AlarmPoller
+from services.alarm_aggregator import AlarmAggregator
+
+def test_backs_off_while_stable():
+    """Test the interval grows without changes and stops at the ceiling."""
+    interval = AdaptiveInterval(base=30, floor=10, ceiling=120)
+
+    intervals = [interval.record(changes=0, latency=0.1, now=0) for _ in range(6)]
+
+    assert intervals[0] == 45
+    assert intervals == sorted(intervals)
+    assert intervals[-1] == 120
+
+def test_change_drops_to_floor():
+    """Test a problem change brings polling back to the floor."""
+    interval = AdaptiveInterval(base=30, floor=10, ceiling=120)
+    interval.record(changes=0, latency=0.1, now=0)
+
+    assert interval.record(changes=3, latency=0.1, now=100) == 10
+    assert interval.next_due == 110
+
+def test_slow_instance_polled_less_often():
+    """Test a slow instance is not polled faster than its response time allows."""
+    interval = AdaptiveInterval(base=30, floor=10, ceiling=120)
+
+    assert interval.record(changes=5, latency=4.0, now=0) == 40
+
+def test_unknown_instances_due_immediately():
+    """Test new instances are polled at once and known ones only when due."""
+    schedule = PollSchedule(base=30, floor=10, ceiling=120)
+    schedule.record("backbone", changes=0, latency=0.1, now=0)
+
+    assert schedule.due(["backbone", "5gcore"], now=10) == ["5gcore"]
+    assert schedule.due(["backbone", "5gcore"], now=45) == ["backbone", "5gcore"]
+
+class FakeMCPClient:
+    """MCP client with two connected instances and no problems."""
+
+    def __init__(self):
+        self.polled = []
+
+    async def get_instances(self):
+        return [{"id": "backbone", "name": "Backbone", "status": "connected"},
+                {"id": "5gcore", "name": "5G Core", "status": "connected"}]
+
+    async def get_problems(self, instance_id, **params):
+        self.polled.append(instance_id)
+        return {"success": True, "data": []}
+
+    async def get_maintenances(self, instance_id, **params):
+        return {"success": True, "data": []}
+
+@pytest.mark.asyncio
+async def test_poller_skips_instances_not_due():
+    """Test a second poll right away only happens when forced."""
+    client = FakeMCPClient()
+    poller = AlarmPoller(client, AlarmAggregator(), 30, min_interval=10, max_interval=120)
+
+    assert await poller.poll_all_instances() == 2
+    assert await poller.poll_all_instances() == 0
+    assert await poller.poll_all_instances(force=True) == 2
+    assert client.polled == ["backbone", "5gcore", "backbone", "5gcore"]
@@ -0,0 +1,76 @@
+"""Unit tests for connection pool metrics and cached liveness."""
+import time
+import pytest
+import pytest_asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from models import database
+from models.pool_metrics import PoolMetrics, InstrumentedQueuePool
+from sqlalchemy import create_engine, text, exc
+from sqlalchemy.ext.asyncio import create_async_engine
+
+@pytest.fixture
+def engine(tmp_path):
+    """SQLite engine with a one-connection instrumented pool."""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=1,
+        pool_timeout=0.1,
+        pool_pre_ping=True
+    )
+    metrics = PoolMetrics("test")
+    metrics.attach(engine)
+    yield engine, metrics
+    engine.dispose()
+
+def test_pool_usage_and_timeouts_counted(engine):
+    """Test checkouts, overflow and checkout timeouts are reported."""
+    engine, metrics = engine
+    with engine.connect() as first, engine.connect() as second:
+        first.execute(text("SELECT 1"))
+        assert metrics.get_stats()["checked_out"] == 2
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+    stats = metrics.get_stats()
+    assert stats["checkouts"] == 2
+    assert stats["checked_out"] == 0
+    assert stats["overflow_peak"] == 1
+    assert stats["timeouts"] == 1
+    assert stats["wait_ms_max"] >= 100
+
+    # Metrics follow the pool replaced by dispose()
+    engine.dispose()
+    with engine.connect():
+        pass
+    assert metrics.get_stats()["checkouts"] == 3
+
+@pytest_asyncio.fixture
+async def liveness_engine(monkeypatch):
+    """Route liveness checks to an in-memory SQLite engine."""
+    pytest.importorskip("aiosqlite")
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    checks = []
+    monkeypatch.setattr(database, "get_async_engine", lambda: checks.append(1) or engine)
+    monkeypatch.setattr(database, "_last_liveness", None)
+    monkeypatch.setattr(database, "_liveness_lock", None)
+    monkeypatch.setattr(database, "pool_metrics", {"async": PoolMetrics("async")})
+    yield checks
+    await engine.dispose()
+
+@pytest.mark.asyncio
+async def test_liveness_cached_between_probes(liveness_engine):
+    """Test probes share one SELECT 1 per TTL and recent pool activity skips it."""
+    assert await database.check_liveness()
+    assert await database.check_liveness()
+    assert len(liveness_engine) == 1
+
+    database._last_liveness = (time.monotonic() - database.liveness_ttl - 1, True)
+    database.pool_metrics["async"].last_checkout = time.monotonic()
+    assert await database.check_liveness()
+    assert len(liveness_engine) == 1
@@ -0,0 +1,167 @@
+"""Unit tests for background pre-investigation scheduling."""
+import asyncio
+import pytest
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from models import Investigation
+from services import pre_investigator, investigation_runner
+from services.pre_investigator import PreInvestigator
+from services.alarm_state import alarm_state
+from services.investigation_scheduler import InvestigationScheduler
+from services.investigation_service import InvestigationService
+from services.investigation_stream import ResponseBuffer, StreamRegistry
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+class FakeAggregator:
+    """Aggregator returning a fixed alarm list."""
+
+    def __init__(self, alarms):
+        self.alarms = alarms
+
+    def get_all_alarms(self):
+        return self.alarms
+
+class FakeTask:
+    """Task stand-in that can be marked finished."""
+
+    def __init__(self):
+        self.finished = False
+
+    def done(self):
+        return self.finished
+
+def alarm(alarm_id, severity_code, synthetic=False):
+    return {
+        "id": alarm_id,
+        "instance_id": "zabbix-1",
+        "description": f"Problem {alarm_id}",
+        "severity": "x",
+        "severity_code": severity_code,
+        "is_synthetic": synthetic
+    }
+
+@pytest.fixture
+def make_investigator():
+    """Build pre-investigator whose runs are recorded instead of started."""
+    def make(alarms, **kwargs):
+        investigator = PreInvestigator(None, FakeAggregator(alarms), **kwargs)
+        investigator.launched = []
+
+        async def fake_start(key, alarm):
+            investigator.launched.append(key)
+            investigator.active[key] = FakeTask()
+            investigator.started_at.append(time.monotonic())
+            return True
+
+        investigator._start = fake_start
+        return investigator
+    return make
+
+@pytest.mark.asyncio
+async def test_only_severe_zabbix_alarms_are_started(make_investigator):
+    """Test threshold and synthetic filtering with highest severity first."""
+    investigator = make_investigator(
+        [alarm("1", 4), alarm("2", 2), alarm("3", 5), alarm("4", 5, synthetic=True)],
+        max_concurrent=5
+    )
+
+    assert await investigator.check_alarms() == [("zabbix-1", "3"), ("zabbix-1", "1")]
+
+@pytest.mark.asyncio
+async def test_concurrency_limit_defers_alarms(make_investigator):
+    """Test queued alarms start when running investigations finish."""
+    investigator = make_investigator([alarm("1", 5), alarm("2", 4), alarm("3", 4)], max_concurrent=1)
+
+    assert await investigator.check_alarms() == [("zabbix-1", "1")]
+    assert await investigator.check_alarms() == []
+    assert investigator.get_stats()["pending"] == 2
+
+    investigator.active[("zabbix-1", "1")].finished = True
+    assert await investigator.check_alarms() == [("zabbix-1", "2")]
+
+@pytest.mark.asyncio
+async def test_hourly_budget(make_investigator):
+    """Test the rate budget caps runs per hour."""
+    investigator = make_investigator([alarm(str(i), 5) for i in range(5)], max_concurrent=10, max_per_hour=3)
+
+    assert len(await investigator.check_alarms()) == 3
+    assert investigator.get_stats()["budget_left"] == 0
+    assert investigator.get_stats()["deferred_budget"] == 1
+
+@pytest.mark.asyncio
+async def test_alarms_are_started_once(make_investigator):
+    """Test an alarm seen in several polls is only investigated once."""
+    investigator = make_investigator([alarm("1", 5)])
+
+    await investigator.check_alarms()
+    investigator.active[("zabbix-1", "1")].finished = True
+    assert await investigator.check_alarms() == []
+    assert investigator.launched == [("zabbix-1", "1")]
+
+@pytest.mark.asyncio
+async def test_cleared_alarms_leave_queue(make_investigator):
+    """Test pending alarms that clear are not investigated."""
+    aggregator_alarms = [alarm("1", 5), alarm("2", 5)]
+    investigator = make_investigator(aggregator_alarms, max_concurrent=1)
+    await investigator.check_alarms()
+
+    aggregator_alarms.pop()
+    investigator.active[("zabbix-1", "1")].finished = True
+    assert await investigator.check_alarms() == []
+    assert investigator.get_stats()["pending"] == 0
+
+@pytest.fixture
+def session_factory(async_engine, monkeypatch):
+    """Route pre-investigation and runner sessions to the in-memory database."""
+    factory = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(pre_investigator, "async_session", factory)
+    monkeypatch.setattr(investigation_runner, "async_session", factory)
+    return factory
+
+@pytest.mark.asyncio
+async def test_start_runs_investigation_in_scheduler_slot(session_factory, monkeypatch):
+    """Test the real start creates an auto investigation and runs it through the scheduler."""
+    scheduler = InvestigationScheduler(max_concurrent=1)
+    registry = StreamRegistry()
+    monkeypatch.setattr(investigation_runner, "investigation_scheduler", scheduler)
+    monkeypatch.setattr(pre_investigator, "stream_registry", registry)
+    monkeypatch.setattr(pre_investigator, "new_response_buffer", ResponseBuffer)
+
+    # Hold the run inside its slot, then fail it instead of calling the model
+    entered, release = asyncio.Event(), asyncio.Event()
+    async def blocked_context(alarm, mcp_client):
+        entered.set()
+        await release.wait()
+        raise RuntimeError("no model in tests")
+    monkeypatch.setattr(investigation_runner, "build_context", blocked_context)
+
+    severe = {**alarm("1", 5), "host": "router-01", "severity": "disaster"}
+    investigator = PreInvestigator(None, FakeAggregator([severe]))
+    key = ("zabbix-1", "1")
+    assert await investigator._start(key, severe)
+    await asyncio.wait_for(entered.wait(), timeout=5)
+
+    async with session_factory() as db:
+        investigation = (await db.scalars(select(Investigation))).one()
+        messages = await InvestigationService(db).get_messages(investigation.id)
+    assert investigation.origin == "auto"
+    assert investigation.status == "in_progress"
+    assert investigation.run_holder == alarm_state.holder
+    assert messages[0].content == "Automatic investigation for: Problem 1"
+    assert registry.get(investigation.id).task is investigator.active[key]
+    assert scheduler.get_stats()["running"] == 1
+
+    # A second start for the same alarm finds the running investigation
+    assert not await investigator._start(key, severe)
+    assert investigator.get_stats()["skipped_existing"] == 1
+
+    release.set()
+    await investigator.active[key]
+    assert scheduler.get_stats()["running"] == 0
+    async with session_factory() as db:
+        assert (await InvestigationService(db).get_investigation(investigation.id)).status == "failed"
@@ -0,0 +1,134 @@
+"""Unit tests for the runbook index."""
+import asyncio
+import pytest
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from services.runbook_index import RunbookIndex, parse_runbook
+
+INTERFACE_RUNBOOK = """# Interface Down - Network Link Failure
+
+## Problem Description
+Network interface is down, causing loss of connectivity.
+
+## Diagnostic Steps
+
+### 1. Check Interface Status
+```bash
+# FRRouting
+vtysh -c "show interface eth0"
+```
+
+### 2. Check Physical Layer
+Inspect cabling and optics.
+
+## Resolution Steps
+
+### If Interface Administratively Down
+Bring the interface up.
+
+## Prevention
+Monitor optics levels.
+"""
+
+CPU_RUNBOOK = """# High CPU Usage - Network Device
+
+## Problem Description
+Network device is experiencing high CPU utilization above threshold.
+
+## Diagnostic Steps
+
+### 1. Identify Top Processes
+```bash
+ps aux --sort=-%cpu | head -10
+```
+"""
+
+@pytest.fixture
+def runbook_dir(tmp_path):
+    """Create runbook directory layout."""
+    (tmp_path / "by-trigger").mkdir()
+    (tmp_path / "by-trigger" / "interface-down.md").write_text(INTERFACE_RUNBOOK)
+    (tmp_path / "by-trigger" / "high-cpu-usage.md").write_text(CPU_RUNBOOK)
+    return tmp_path
+
+@pytest.fixture
+def index(runbook_dir):
+    """Loaded runbook index."""
+    index = RunbookIndex(reload_interval=0)
+    index.load(str(runbook_dir))
+    return index
+
+def test_parse_ignores_comments_in_code_blocks(runbook_dir):
+    """Test shell comments inside fences are not treated as headings."""
+    chunks = parse_runbook(runbook_dir / "by-trigger" / "interface-down.md", runbook_dir)
+    sections = [chunk.section for chunk in chunks]
+
+    assert "Diagnostic Steps > 1. Check Interface Status" in sections
+    assert not any("FRRouting" in section for section in sections)
+    assert all(chunk.title == "Interface Down - Network Link Failure" for chunk in chunks)
+
+def test_search_ranks_relevant_section(index):
+    """Test BM25 search returns the best matching section."""
+    results = index.search("top processes cpu", limit=2)
+
+    assert results[0]["runbook"] == "high-cpu-usage"
+    assert results[0]["section"] == "Diagnostic Steps > 1. Identify Top Processes"
+
+def test_match_alarm_returns_diagnostic_sections(index):
+    """Test alarm prefetch selects runbook and key sections."""
+    match = index.match_alarm({"description": "Interface Gi0/1: Link down"})
+
+    assert match["runbook"] == "interface-down"
+    sections = [s["section"] for s in match["sections"]]
+    assert "Diagnostic Steps > 2. Check Physical Layer" in sections
+    assert "Prevention" not in sections
+
+def test_match_alarm_without_runbook(index):
+    """Test unrelated alarms get no runbook."""
+    assert index.match_alarm({"description": "Disk space is low on /var"}) is None
+
+def test_hot_reload_on_file_change(index, runbook_dir):
+    """Test new and changed runbooks are picked up by the reload check, not by searches."""
+    path = runbook_dir / "by-trigger" / "disk-space.md"
+    path.write_text("# Low Disk Space\n\n## Problem Description\nFilesystem disk space is low.\n")
+    os.utime(path, None)
+
+    assert index.match_alarm({"description": "Disk space is low on /var"}) is None
+    assert index.reload_if_changed() is True
+    assert index.reload_if_changed() is False
+
+    match = index.match_alarm({"description": "Disk space is low on /var"})
+    assert match is not None
+    assert match["runbook"] == "disk-space"
+    assert index.get_stats()["runbooks"] == 3
+
+@pytest.mark.asyncio
+async def test_background_reload_swaps_index(index, runbook_dir):
+    """Test the reload loop rebuilds the index in the background."""
+    (runbook_dir / "by-trigger" / "disk-space.md").write_text(
+        "# Low Disk Space\n\n## Problem Description\nFilesystem disk space is low.\n"
+    )
+    index.reload_interval = 0.01
+    await index.start()
+    try:
+        for _ in range(200):
+            if index.get_stats()["runbooks"] == 3:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        await index.stop()
+
+    assert index.match_alarm({"description": "Disk space is low on /var"})["runbook"] == "disk-space"
+
+def test_hidden_directories_skipped(runbook_dir):
+    """Test ConfigMap style hidden directories are not indexed twice."""
+    hidden = runbook_dir / "..2024_01_01"
+    hidden.mkdir()
+    (hidden / "interface-down.md").write_text(INTERFACE_RUNBOOK)
+
+    index = RunbookIndex()
+    assert index.load(str(runbook_dir)) == 2
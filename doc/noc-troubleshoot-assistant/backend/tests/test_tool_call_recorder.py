@@ -0,0 +1,65 @@
+"""Unit tests for buffered tool call recording."""
+import asyncio
+import pytest
+import sys
+from pathlib import Path
+from uuid import uuid4
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from models import ToolCall, ToolResult
+from services.tool_call_recorder import ToolCallRecorder
+from services.tool_results import ToolResultStore
+from sqlalchemy import select, func, event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+pytest.importorskip("aiosqlite")
+
+@pytest.fixture
+def engine(async_engine):
+    """In-memory database that counts commits."""
+    async_engine.sync_engine.commits = 0
+    def count_commit(conn):
+        async_engine.sync_engine.commits += 1
+    event.listen(async_engine.sync_engine, "commit", count_commit)
+    return async_engine
+
+@pytest.fixture
+def recorder(engine, monkeypatch):
+    """Recorder writing to the test database."""
+    monkeypatch.setattr("services.investigation_service.tool_result_store", ToolResultStore())
+    return ToolCallRecorder(max_batch_size=50, session_factory=lambda: AsyncSession(engine, expire_on_commit=False))
+
+@pytest.mark.asyncio
+async def test_calls_buffered_and_written_in_one_batch(engine, recorder):
+    """Test tool calls made from worker threads are attributed and written with one commit."""
+    investigation_id = uuid4()
+    with recorder.investigation(investigation_id):
+        for hostid in ("1", "2", "1"):
+            # Strands runs sync tools with asyncio.to_thread
+            await asyncio.to_thread(
+                recorder.record, "host_get", {"hostids": [hostid]}, {"success": True, "data": [{"hostid": hostid}]}, 7
+            )
+    recorder.record("host_get", {}, {"success": True}, 1)
+
+    assert engine.sync_engine.commits == 0
+    assert recorder.get_stats()["pending"] == 3
+    assert await recorder.flush() == 3
+    assert engine.sync_engine.commits == 1
+
+    async with AsyncSession(engine) as db:
+        tool_calls = (await db.scalars(select(ToolCall))).all()
+        assert {tc.investigation_id for tc in tool_calls} == {investigation_id}
+        assert [tc.parameters for tc in tool_calls] == [{"hostids": ["1"]}, {"hostids": ["2"]}, {"hostids": ["1"]}]
+        assert await db.scalar(select(func.count()).select_from(ToolResult)) == 2
+
+@pytest.mark.asyncio
+async def test_oldest_calls_dropped_when_buffer_full(recorder):
+    """Test the buffer stays bounded while nothing is flushed."""
+    recorder.max_pending = 2
+    with recorder.investigation(uuid4()):
+        for i in range(3):
+            recorder.record("problem_get", {"limit": i}, {"success": True}, 1)
+
+    assert [call["parameters"] for call in recorder.pending] == [{"limit": 1}, {"limit": 2}]
+    assert recorder.get_stats()["dropped"] == 1
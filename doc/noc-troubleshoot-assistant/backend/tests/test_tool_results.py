@@ -0,0 +1,70 @@
+"""Unit tests for deduplicated tool result storage."""
+import pytest
+import sys
+from pathlib import Path
+from uuid import uuid4
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from models import ToolCall, ToolResult
+from services.investigation_service import InvestigationService
+from services.tool_results import ToolResultStore, truncate, canonical_json
+from sqlalchemy import select, func
+
+pytest.importorskip("aiosqlite")
+
+HOST_RESULT = {"success": True, "data": [{"hostid": "10084", "host": "core-rtr-01", "status": "0"}]}
+
+@pytest.fixture
+def store(monkeypatch):
+    """Fresh result store used by the investigation service."""
+    store = ToolResultStore(max_result_bytes=1024)
+    monkeypatch.setattr("services.investigation_service.tool_result_store", store)
+    return store
+
+@pytest.mark.asyncio
+async def test_identical_results_stored_once(db_session, store):
+    """Test repeated results share one compressed payload and round-trip unchanged."""
+    service = InvestigationService(db_session)
+    investigation_id = uuid4()
+    for _ in range(3):
+        await service.add_tool_call(investigation_id, "get_host", {"host": "core-rtr-01"}, dict(HOST_RESULT), 12)
+    await service.add_tool_call(investigation_id, "get_problems", {}, {"success": True, "data": []}, 8)
+
+    assert await db_session.scalar(select(func.count()).select_from(ToolResult)) == 2
+    tool_calls = (await db_session.scalars(select(ToolCall).order_by(ToolCall.duration_ms.desc()))).all()
+    assert tool_calls[0].result is None
+    assert tool_calls[0].result_summary == {
+        "bytes": len(canonical_json(HOST_RESULT)), "success": True, "items": 1, "fields": ["host", "hostid", "status"]
+    }
+
+    results = await store.results_for(db_session, tool_calls)
+    assert results[tool_calls[0].id] == HOST_RESULT
+    assert results[tool_calls[-1].id] == {"success": True, "data": []}
+    assert store.get_stats()["stored"] == 2
+    assert store.get_stats()["deduplicated"] == 2
+
+@pytest.mark.asyncio
+async def test_inline_results_of_older_rows_kept(db_session, store):
+    """Test tool calls recorded with an inline result are returned as is."""
+    tool_call = ToolCall(investigation_id=uuid4(), tool_name="get_host", result=HOST_RESULT, duration_ms=5)
+    db_session.add(tool_call)
+    await db_session.commit()
+
+    assert await store.results_for(db_session, [tool_call]) == {tool_call.id: HOST_RESULT}
+
+def test_large_results_truncated():
+    """Test oversized item lists keep leading items and other results become a preview."""
+    items = [{"eventid": str(i), "name": "Interface down" * 5} for i in range(100)]
+    stored, truncated = truncate({"success": True, "data": items}, 1024)
+
+    assert truncated
+    assert stored["success"] is True
+    assert stored["data"] == items[:len(stored["data"])]
+    assert stored["_truncated"]["total_items"] == 100
+    assert len(canonical_json(stored)) < 1300
+
+    stored, truncated = truncate({"text": "x" * 5000}, 1024)
+    assert truncated and len(stored["preview"]) == 1024
+
+    assert truncate(HOST_RESULT, 1024) == (HOST_RESULT, False)
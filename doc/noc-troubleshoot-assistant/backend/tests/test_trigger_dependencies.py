@@ -0,0 +1,97 @@
+"""Unit tests for trigger dependency resolution."""
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from services.trigger_dependencies import TriggerDependencyCache
+
+# access (30) -> distribution (20) -> core (10)
+DEPENDENCIES = {"30": ["20"], "20": ["10"], "10": [], "40": []}
+HOSTS = {"30": ("301", "access-sw-1"), "20": ("201", "dist-sw-1"), "10": ("101", "core-rtr-1"), "40": ("401", "server-1")}
+
+class FakeMCPClient:
+    """MCP client answering trigger.get from a static graph."""
+
+    def __init__(self):
+        self.requests = []
+
+    async def get_triggers(self, instance_id, triggerids, **params):
+        self.requests.append(list(triggerids))
+        return {
+            "success": True,
+            "data": [
+                {
+                    "triggerid": t,
+                    "dependencies": [{"triggerid": d} for d in DEPENDENCIES[t]],
+                    "hosts": [{"hostid": HOSTS[t][0], "host": HOSTS[t][1], "name": HOSTS[t][1]}],
+                    "hostgroups": [{"groupid": "7"}]
+                }
+                for t in triggerids if t in DEPENDENCIES
+            ]
+        }
+
+def alarm(alarm_id, trigger_id, started_at="2024-01-01T10:00:00"):
+    return {"id": alarm_id, "trigger_id": trigger_id, "started_at": started_at}
+
+@pytest.mark.asyncio
+async def test_transitive_dependency_marks_dependent():
+    """Test an alarm is dependent when a non-adjacent upstream trigger fires."""
+    cache = TriggerDependencyCache()
+    client = FakeMCPClient()
+    alarms = [alarm("a", "30"), alarm("c", "10"), alarm("x", "40")]
+
+    await cache.refresh(client, "zabbix-1", [a["trigger_id"] for a in alarms])
+    cache.annotate("zabbix-1", alarms)
+
+    access, core, other = alarms
+    assert access["depends_on"] == ["10", "20"]
+    assert access["is_dependent"] is True
+    assert access["root_alarm_id"] == "c"
+    assert core["is_dependent"] is False
+    assert other["is_dependent"] is False and other["root_alarm_id"] is None
+
+@pytest.mark.asyncio
+async def test_refresh_is_incremental():
+    """Test cached triggers are not fetched again within the TTL."""
+    cache = TriggerDependencyCache(ttl_seconds=600)
+    client = FakeMCPClient()
+
+    await cache.refresh(client, "zabbix-1", ["30"])
+    assert client.requests == [["30"], ["20"], ["10"]]
+
+    await cache.refresh(client, "zabbix-1", ["30", "40"])
+    assert client.requests[-1] == ["40"]
+    assert len(client.requests) == 4
+
+@pytest.mark.asyncio
+async def test_stale_entries_refetched():
+    """Test entries older than the TTL are refreshed."""
+    cache = TriggerDependencyCache(ttl_seconds=0)
+    client = FakeMCPClient()
+
+    await cache.refresh(client, "zabbix-1", ["40"])
+    await cache.refresh(client, "zabbix-1", ["40"])
+    assert client.requests == [["40"], ["40"]]
+
+def test_dependency_cycle_terminates():
+    """Test cyclic dependencies do not loop forever."""
+    cache = TriggerDependencyCache()
+    cache.graph["zabbix-1"] = {"1": (["2"], 0), "2": (["1"], 0)}
+
+    assert cache.upstream("zabbix-1", "1") == {"2"}
+
+@pytest.mark.asyncio
+async def test_trigger_hosts_cached():
+    """Test trigger hosts and groups come from the same batched trigger.get."""
+    cache = TriggerDependencyCache()
+    client = FakeMCPClient()
+
+    await cache.refresh(client, "zabbix-1", ["40"])
+    await cache.refresh(client, "zabbix-1", ["40"])
+
+    assert client.requests == [["40"]]
+    assert cache.hosts_for("zabbix-1", "40") == [{"hostid": "401", "host": "server-1", "name": "server-1"}]
+    assert cache.groups_for("zabbix-1", "40") == ["7"]
+    assert cache.hosts_for("zabbix-1", "99") == []
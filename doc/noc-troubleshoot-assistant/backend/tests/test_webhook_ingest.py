@@ -0,0 +1,159 @@
+"""Unit tests for Zabbix webhook ingestion."""
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from services.webhook_ingest import WebhookIngestor
+from services.alarm_poller import AlarmPoller
+from services.alarm_aggregator import AlarmAggregator
+from services.alarm_state import AlarmState, MemoryAlarmStore
+from api.routes import webhooks
+from schemas import ZabbixWebhookEvent
+from config import ConfigLoader
+from fastapi import HTTPException
+
+class FakeMCPClient:
+    """MCP client with one connected instance whose problem list is settable."""
+
+    def __init__(self):
+        self.problems = []
+
+    async def get_instances(self):
+        return [{"id": "backbone", "name": "Backbone", "status": "connected"}]
+
+    async def get_problems(self, instance_id, **params):
+        return {"success": True, "data": self.problems}
+
+    async def get_triggers(self, instance_id, triggerids, **params):
+        return {
+            "success": True,
+            "data": [{"triggerid": t, "dependencies": [], "hosts": [{"hostid": "10", "host": "rtr-1", "name": "Router 1"}]}
+                     for t in triggerids]
+        }
+
+    async def get_maintenances(self, instance_id, **params):
+        return {"success": True, "data": []}
+
+def event(event_id="500", value=1, **fields):
+    return {"instance_id": "backbone", "event_id": event_id, "event_value": value,
+            "trigger_id": "77", "name": "Router 1: Interface down", "severity": 4, **fields}
+
+async def make_ingestor():
+    aggregator = AlarmAggregator()
+    poller = AlarmPoller(FakeMCPClient(), aggregator, 30, min_interval=300, max_interval=300)
+    await poller.poll_all_instances()
+    ingestor = WebhookIngestor()
+    ingestor.poller = poller
+    return ingestor
+
+@pytest.mark.asyncio
+async def test_problem_and_recovery_applied():
+    """Test a pushed problem appears at once and its recovery removes it."""
+    ingestor = await make_ingestor()
+    aggregator = ingestor.poller.alarm_aggregator
+
+    assert await ingestor.apply(event()) is True
+    alarm = aggregator.get_alarm_by_id("500", "backbone")
+    assert alarm["host"] == "Router 1"
+    assert alarm["hostids"] == ["10"]
+    assert alarm["instance_name"] == "Backbone"
+
+    assert await ingestor.apply(event(value=0)) is True
+    assert aggregator.get_alarm_by_id("500", "backbone") is None
+
+def test_duplicates_and_late_problems_dropped():
+    """Test repeated events and problems arriving after their recovery are dropped."""
+    ingestor = WebhookIngestor()
+
+    assert ingestor.is_duplicate(event()) is False
+    assert ingestor.is_duplicate(event()) is True
+    assert ingestor.is_duplicate(event(acknowledged=True)) is False
+    assert ingestor.is_duplicate(event(value=0)) is False
+    assert ingestor.is_duplicate(event(acknowledged=False, severity=5)) is True
+
+@pytest.mark.asyncio
+async def test_unknown_instance_ignored():
+    """Test events for instances the poller does not know are ignored."""
+    ingestor = await make_ingestor()
+    assert await ingestor.apply({**event(), "instance_id": "unknown"}) is False
+
+@pytest.mark.asyncio
+async def test_push_survives_older_poll():
+    """Test a poll that started before a push does not drop the pushed alarm."""
+    ingestor = await make_ingestor()
+    poller = ingestor.poller
+    await ingestor.apply(event())
+
+    # Mark the push as newer than the reconciliation poll, whose result lacks it
+    _, event_id, record = poller.pushed["backbone"][0]
+    poller.pushed["backbone"] = [(float("inf"), event_id, record)]
+    await poller.poll_all_instances(force=True)
+
+    assert poller.alarm_aggregator.get_alarm_by_id("500", "backbone") is not None
+
+@pytest.mark.asyncio
+async def test_follower_forwards_to_leader():
+    """Test an event queued by a follower is applied by the leader's next tick."""
+    ingestor = await make_ingestor()
+    store = MemoryAlarmStore()
+    leader = AlarmState(store)
+    leader.holder = "leader"
+    leader.poller = ingestor.poller
+    leader.alarm_aggregator = ingestor.poller.alarm_aggregator
+    leader.event_handler = ingestor.apply
+    await leader.tick()
+
+    follower = AlarmState(store)
+    await follower.forward_event(event())
+    await leader.tick()
+
+    assert leader.alarm_aggregator.get_alarm_by_id("500", "backbone") is not None
+    assert store.load(0)[1][0]["id"] == "500"
+
+@pytest.mark.asyncio
+async def test_endpoint_refuses_events_without_configured_token(monkeypatch):
+    """Test enabled ingestion fails closed when no token is configured."""
+    settings = {"enabled": True, "token": ""}
+    monkeypatch.setattr(ConfigLoader, "webhook_config", property(lambda self: settings))
+
+    with pytest.raises(HTTPException) as error:
+        await webhooks.receive_zabbix_event(ZabbixWebhookEvent(**event()), x_webhook_token=None)
+    assert error.value.status_code == 503
+
+    settings["token"] = "secret"
+    with pytest.raises(HTTPException) as error:
+        await webhooks.receive_zabbix_event(ZabbixWebhookEvent(**event()), x_webhook_token="wrong")
+    assert error.value.status_code == 401
+
+class FlakyFollower:
+    """Follower state whose first forward fails."""
+
+    is_leader = False
+
+    def __init__(self):
+        self.forwarded = []
+
+    async def forward_event(self, data):
+        if not self.forwarded:
+            self.forwarded.append(None)
+            raise ConnectionError("database unavailable")
+        self.forwarded.append(data)
+
+@pytest.mark.asyncio
+async def test_failed_event_not_deduplicated_on_retry(monkeypatch):
+    """Test an event that failed to forward is processed when Zabbix retries it."""
+    monkeypatch.setattr(ConfigLoader, "webhook_config", property(lambda self: {"enabled": True, "token": "secret"}))
+    monkeypatch.setattr(webhooks, "webhook_ingestor", WebhookIngestor())
+    follower = FlakyFollower()
+    monkeypatch.setattr(webhooks, "alarm_state", follower)
+
+    with pytest.raises(ConnectionError):
+        await webhooks.receive_zabbix_event(ZabbixWebhookEvent(**event()), x_webhook_token="secret")
+    result = await webhooks.receive_zabbix_event(ZabbixWebhookEvent(**event()), x_webhook_token="secret")
+
+    assert result == {"status": "forwarded"}
+    assert follower.forwarded[-1]["event_id"] == "500"
+    result = await webhooks.receive_zabbix_event(ZabbixWebhookEvent(**event()), x_webhook_token="secret")
+    assert result == {"status": "duplicate"}
@@ -28,15 +28,14 @@ import {
 import { useEffect, useState } from 'react';
 import { useAlarmStore } from '@/stores/alarmStore';
 import { useInstanceStore } from '@/stores/instanceStore';
-import { useChatStore } from '@/stores/chatStore';
 import { api } from '@/services/api';
+import { startInvestigation } from '@/services/investigation';
 import { severityColors } from '@/theme/darkTheme';
 import { Alarm } from '@/types';
 
 export default function AlarmTable() {
   const { alarms, setAlarms, updateLastPollTime } = useAlarmStore();
   const { selectedInstanceId, setSelectedInstance, instances } = useInstanceStore();
-  const { setInvestigationId, addMessage, appendToLastMessage, setStreaming, clearChat } = useChatStore();
   const [searchText, setSearchText] = useState('');
   const [severityFilter, setSeverityFilter] = useState<string[]>([]);
 
@@ -89,50 +88,7 @@ export default function AlarmTable() {
     }
   };
 
-  const handleInvestigate = async (alarm: Alarm) => {
-    try {
-      clearChat();
-      
-      const result = await api.createInvestigation(alarm.id, alarm.instance_id);
-      setInvestigationId(result.investigation_id);
-      
-      addMessage({
-        role: 'system',
-        content: `Starting investigation for: ${alarm.description}`,
-        timestamp: new Date()
-      });
-      
-      setStreaming(true);
-      addMessage({ role: 'assistant', content: '', timestamp: new Date() });
-      
-      const eventSource = api.streamInvestigation(result.investigation_id);
-      
-      eventSource.onmessage = (event) => {
-        const data = JSON.parse(event.data);
-        if (data.type === 'content') {
-          appendToLastMessage(data.text);
-        } else if (data.type === 'done') {
-          setStreaming(false);
-          eventSource.close();
-        } else if (data.type === 'error') {
-          setStreaming(false);
-          appendToLastMessage(`\n\n**Error:** ${data.message}`);
-          eventSource.close();
-        }
-      };
-      
-      eventSource.onerror = () => {
-        setStreaming(false);
-        appendToLastMessage('\n\n**Error:** Connection lost');
-        eventSource.close();
-      };
-      
-    } catch (error) {
-      console.error('Failed to start investigation:', error);
-      alert('Failed to start investigation');
-      setStreaming(false);
-    }
-  };
+  const handleInvestigate = (alarm: Alarm) => startInvestigation(alarm);
 
   const criticalCount = Array.isArray(alarms) ? alarms.filter(a => ['disaster', 'high'].includes(a.severity)).length : 0;
   const unacknowledgedCount = Array.isArray(alarms) ? alarms.filter(a => !a.acknowledged).length : 0;
@@ -292,7 +248,9 @@ export default function AlarmTable() {
                   </TableCell>
                   <TableCell align="center">
                     <Box sx={{ display: 'flex', gap: 0.5, justifyContent: 'center' }}>
-                      <Tooltip title="Investigate with AI">
+                      <Tooltip title={alarm.root_alarm_id || (alarm.incident_size ?? 0) > 1
+                        ? 'Investigate root alarm with AI'
+                        : 'Investigate with AI'}>
                         <IconButton 
                           size="small" 
                           color="primary"
@@ -1,11 +1,12 @@
-import { Box, Paper, Typography, Divider, CircularProgress, Alert } from '@mui/material';
-import { Psychology } from '@mui/icons-material';
+import { Box, Paper, Typography, Divider, CircularProgress, Alert, Button } from '@mui/material';
+import { Psychology, Refresh } from '@mui/icons-material';
 import { useChatStore } from '@/stores/chatStore';
+import { startInvestigation } from '@/services/investigation';
 import { useEffect, useRef } from 'react';
 import ReactMarkdown from 'react-markdown';
 
 export default function ChatInterface() {
-  const { messages, isStreaming, investigationId } = useChatStore();
+  const { messages, isStreaming, investigationId, alarm, cachedFrom, redirectedFrom, redirectReason } = useChatStore();
   const messagesEndRef = useRef<HTMLDivElement>(null);
 
   useEffect(() => {
@@ -133,6 +134,36 @@ export default function ChatInterface() {
         )}
       </Box>
       
+      {redirectedFrom && alarm && (
+        <Alert severity="info" sx={{ mx: 2, mt: 2 }}>
+          {redirectReason === 'dependency'
+            ? <>Investigating <strong>{alarm.description}</strong> on {alarm.host}, which{' '}
+                <strong>{redirectedFrom.description}</strong> on {redirectedFrom.host} depends on</>
+            : <>Investigating <strong>{alarm.description}</strong> on {alarm.host}, the root alarm of the{' '}
+                incident including <strong>{redirectedFrom.description}</strong> on {redirectedFrom.host}</>}
+        </Alert>
+      )}
+      
+      {cachedFrom && alarm && (
+        <Alert
+          severity="warning"
+          sx={{ mx: 2, mt: 2 }}
+          action={
+            <Button
+              color="inherit"
+              size="small"
+              startIcon={<Refresh />}
+              disabled={isStreaming}
+              onClick={() => startInvestigation(redirectedFrom ?? alarm, true)}
+            >
+              Re-run analysis
+            </Button>
+          }
+        >
+          Reused analysis from investigation {cachedFrom}
+        </Alert>
+      )}
+      
       {investigationId && (
         <Alert severity="info" sx={{ m: 2 }}>
           Investigation ID: {investigationId}
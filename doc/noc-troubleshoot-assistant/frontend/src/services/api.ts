@@ -1,4 +1,4 @@
-import { Instance, Alarm, AlarmStats, HealthStatus } from '@/types';
+import { Instance, Alarm, AlarmStats, HealthStatus, RedirectReason } from '@/types';
 
 const API_BASE = '';
 
@@ -61,11 +61,22 @@ class ApiService {
   }
 
   // Chat / Investigation
-  async createInvestigation(alarmId: string, instanceId: string): Promise<{ investigation_id: string; alarm: any }> {
+  async createInvestigation(
+    alarmId: string,
+    instanceId: string,
+    refresh: boolean = false
+  ): Promise<{
+    investigation_id: string;
+    alarm: Alarm;
+    redirected_from?: Alarm | null;
+    redirect_reason?: RedirectReason | null;
+    cached?: boolean;
+    cached_from?: string;
+  }> {
     const response = await fetch(`${API_BASE}/api/chat/investigation/create`, {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({ alarm_id: alarmId, instance_id: instanceId }),
+      body: JSON.stringify({ alarm_id: alarmId, instance_id: instanceId, refresh }),
     });
     if (!response.ok) {
       const error = await response.json();
@@ -0,0 +1,83 @@
+import { api } from '@/services/api';
+import { useChatStore } from '@/stores/chatStore';
+import { Alarm } from '@/types';
+
+// Start (or attach to) an investigation of an alarm and stream its answer into the chat.
+// With refresh, a cached analysis is bypassed and the model runs again.
+export async function startInvestigation(alarm: Alarm, refresh: boolean = false) {
+  const {
+    setInvestigationId,
+    setInvestigationContext,
+    addMessage,
+    appendToLastMessage,
+    setLastMessageContent,
+    setStreaming,
+    clearChat,
+  } = useChatStore.getState();
+
+  try {
+    clearChat();
+
+    const result = await api.createInvestigation(alarm.id, alarm.instance_id, refresh);
+    // Dependent or correlated alarms are investigated through their root alarm
+    const target = result.alarm ?? alarm;
+    const redirectedFrom = result.redirected_from ?? null;
+    setInvestigationId(result.investigation_id);
+    setInvestigationContext({
+      alarm: target,
+      cachedFrom: result.cached ? result.cached_from ?? null : null,
+      redirectedFrom,
+      redirectReason: redirectedFrom ? result.redirect_reason ?? null : null,
+    });
+
+    addMessage({
+      role: 'system',
+      content: result.cached
+        ? `Reusing a recent analysis for: ${target.description}`
+        : `Starting investigation for: ${target.description}`,
+      timestamp: new Date()
+    });
+
+    setStreaming(true);
+    addMessage({ role: 'assistant', content: '', timestamp: new Date() });
+
+    const eventSource = api.streamInvestigation(result.investigation_id);
+
+    eventSource.onmessage = (event) => {
+      const data = JSON.parse(event.data);
+      if (data.type === 'reset') {
+        // Server restarted the run; drop partial output from the old one
+        setLastMessageContent('');
+      } else if (data.type === 'queued') {
+        // Waiting for a free model slot during heavy load
+        setLastMessageContent(`_Queued for analysis (position ${data.position})..._`);
+      } else if (data.type === 'started') {
+        setLastMessageContent('');
+      } else if (data.type === 'content') {
+        appendToLastMessage(data.text);
+      } else if (data.type === 'done') {
+        setStreaming(false);
+        eventSource.close();
+      } else if (data.type === 'error') {
+        setStreaming(false);
+        appendToLastMessage(`\n\n**Error:** ${data.message}`);
+        eventSource.close();
+      }
+    };
+
+    eventSource.onerror = () => {
+      // EventSource reconnects with Last-Event-ID and the backend resumes the stream
+      if (eventSource.readyState === EventSource.CONNECTING) {
+        return;
+      }
+      setStreaming(false);
+      appendToLastMessage('\n\n**Error:** Connection lost');
+      eventSource.close();
+    };
+
+  } catch (error) {
+    console.error('Failed to start investigation:', error);
+    alert(error instanceof Error ? error.message : 'Failed to start investigation');
+    setStreaming(false);
+  }
+}
@@ -1,4 +1,5 @@
 import { create } from 'zustand';
+import { Alarm, RedirectReason } from '@/types';
 
 interface Message {
   role: 'user' | 'assistant' | 'system';
@@ -6,24 +7,45 @@ interface Message {
   timestamp: Date;
 }
 
+interface InvestigationContext {
+  alarm: Alarm;
+  cachedFrom: string | null;
+  redirectedFrom: Alarm | null;
+  redirectReason: RedirectReason | null;
+}
+
 interface ChatState {
   investigationId: string | null;
+  // Alarm under investigation and, for a reused analysis, the investigation it came from
+  alarm: Alarm | null;
+  cachedFrom: string | null;
+  // Alarm the operator clicked when the backend investigates its root alarm instead
+  redirectedFrom: Alarm | null;
+  redirectReason: RedirectReason | null;
   messages: Message[];
   isStreaming: boolean;
   setInvestigationId: (id: string | null) => void;
+  setInvestigationContext: (context: InvestigationContext) => void;
   addMessage: (message: Message) => void;
   appendToLastMessage: (text: string) => void;
+  setLastMessageContent: (content: string) => void;
   setStreaming: (streaming: boolean) => void;
   clearChat: () => void;
 }
 
 export const useChatStore = create<ChatState>((set) => ({
   investigationId: null,
+  alarm: null,
+  cachedFrom: null,
+  redirectedFrom: null,
+  redirectReason: null,
   messages: [],
   isStreaming: false,
   
   setInvestigationId: (id) => set({ investigationId: id }),
   
+  setInvestigationContext: (context) => set(context),
+  
   addMessage: (message) => set((state) => ({
     messages: [...state.messages, message]
   })),
@@ -37,10 +59,22 @@ export const useChatStore = create<ChatState>((set) => ({
     return { messages };
   }),
   
+  setLastMessageContent: (content) => set((state) => {
+    const messages = [...state.messages];
+    if (messages.length > 0) {
+      messages[messages.length - 1].content = content;
+    }
+    return { messages };
+  }),
+  
   setStreaming: (streaming) => set({ isStreaming: streaming }),
   
   clearChat: () => set({ 
     investigationId: null, 
+    alarm: null,
+    cachedFrom: null,
+    redirectedFrom: null,
+    redirectReason: null,
     messages: [], 
     isStreaming: false 
   }),
@@ -21,6 +21,7 @@ export interface Alarm {
   instance_id: string;
   instance_name: string;
   host: string;
+  hostids?: string[];
   description: string;
   severity: 'disaster' | 'high' | 'average' | 'warning' | 'information' | 'not_classified';
   severity_code: number;
@@ -29,8 +30,19 @@ export interface Alarm {
   event_id: string;
   is_synthetic: boolean;
   started_at?: string;
+  trigger_id?: string;
+  depends_on?: string[];
+  is_dependent?: boolean;
+  root_alarm_id?: string | null;
+  in_maintenance?: boolean;
+  maintenance?: { id: string; name: string; active_till: string; collect_data: boolean } | null;
+  incident_id?: string;
+  incident_size?: number;
 }
 
+// Why an investigation targets another alarm than the one clicked
+export type RedirectReason = 'dependency' | 'incident';
+
 export interface AlarmStats {
   total: number;
   by_severity: {
@@ -42,6 +54,8 @@ export interface AlarmStats {
     not_classified: number;
   };
   synthetic: number;
+  dependent?: number;
+  in_maintenance?: number;
   zabbix: number;
   last_poll: string | null;
 }